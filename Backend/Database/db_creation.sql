@@ -30,7 +30,8 @@ CREATE TABLE Admin (
     LastLogin         TIMESTAMP NULL,
     CreatedDate       TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     LastUpdateDate    TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    Status            ENUM('Active', 'Deactivated') DEFAULT 'Active'
+    Status            ENUM('Active', 'Deactivated') DEFAULT 'Active',
+    UNIQUE INDEX uq_admin_email (Email)  -- login / register probe by email
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- 2.2 StoreStaff
@@ -54,7 +55,8 @@ CREATE TABLE StoreStaff (
     HiredDate           DATE,
     Status            ENUM('Active', 'Deactivated') DEFAULT 'Active',
     Salary              DECIMAL(15,2),
-    BankAccountNumber   VARCHAR(30)
+    BankAccountNumber   VARCHAR(30),
+    UNIQUE INDEX uq_staff_email (Email)  -- login / register probe by email
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- 2.3 SystemModificationActivities
@@ -95,7 +97,8 @@ CREATE TABLE Customer (
     IdentityCardNum VARCHAR(20),
     LastLogin       TIMESTAMP NULL,
     CreatedDate     TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    LastUpdateDate  TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    LastUpdateDate  TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE INDEX uq_customer_email (Email)  -- login / register probe by email
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- 2.6 Cart
@@ -104,6 +107,7 @@ CREATE TABLE Cart (
     CartId            INT AUTO_INCREMENT PRIMARY KEY,
     CustomerId        INT NOT NULL,
     LatestModifiedTime TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    Version           INT NOT NULL DEFAULT 0,  -- bumped by every line change, keys cached summaries
     CONSTRAINT fk_cart_customer
         FOREIGN KEY (CustomerId) REFERENCES Customer(Id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -120,7 +124,12 @@ CREATE TABLE Product (
     Specification   TEXT,
     WarrantyPeriod  INT,       -- months
     ReleaseDate     DATE,
-    Status          ENUM('Active', 'Deactivated') DEFAULT 'Active'
+    Status          ENUM('Active', 'Deactivated') DEFAULT 'Active',
+    UpdatedAt       TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    INDEX idx_product_status_release (Status, ReleaseDate DESC, ProductName, ProductId),  -- buyer listing keyset
+    INDEX idx_product_name (ProductName, ProductId),  -- staff listing keyset
+    INDEX idx_product_updated (UpdatedAt),  -- search index sync across workers
+    FULLTEXT INDEX ft_product_search (ProductId, ProductName, Brand, Specification)  -- SEARCH_BACKEND=fulltext
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- 2.8 Order (use backticks because ORDER is reserved)
@@ -135,6 +144,8 @@ CREATE TABLE `Order` (
     RecipientContact	TEXT,
     ShipmentAddress     VARCHAR(255),
     Status              VARCHAR(50),
+    Total               DECIMAL(15,2),  -- after discount, filled at checkout
+    INDEX idx_order_customer_date (CustomerId, OrderDate DESC, OrderId DESC, Status, Total),  -- order history (covering)
     CONSTRAINT fk_order_customer
         FOREIGN KEY (CustomerId) REFERENCES Cart(CustomerId),
     CONSTRAINT fk_order_cart
@@ -147,6 +158,7 @@ CREATE TABLE OrderContainsProduct (
     OrderId   INT NOT NULL,
     ProductId VARCHAR(20) NOT NULL,
     Quantity  INT NOT NULL,
+    UnitPrice DECIMAL(15,2),  -- price at checkout
     PRIMARY KEY (OrderId, ProductId),
     CONSTRAINT fk_ocp_order
         FOREIGN KEY (OrderId) REFERENCES `Order`(OrderId),
@@ -170,6 +182,96 @@ CREATE TABLE CartContainsProduct (
         FOREIGN KEY (CartId) REFERENCES Cart(CartId)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- 2.11 RevokedToken (logged-out and rotated JWT ids until they expire; see
+-- Backend/Source/auth_tokens.py)
+DROP TABLE IF EXISTS RevokedToken;
+CREATE TABLE RevokedToken (
+    Jti        VARCHAR(32) PRIMARY KEY,
+    ExpiresAt  DATETIME NOT NULL,
+    RevokedAt  TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    INDEX idx_revoked_at (RevokedAt),   -- workers pull new revocations
+    INDEX idx_revoked_expires (ExpiresAt)  -- expiry cleanup
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 2.12 StockReservation (STOCK_MODE=ledger: stock taken by an order, not yet
+-- subtracted from Product.Quantity; see Backend/Source/inventory.py)
+DROP TABLE IF EXISTS StockReservation;
+CREATE TABLE StockReservation (
+    OrderId    INT NOT NULL,
+    ProductId  VARCHAR(20) NOT NULL,
+    Quantity   INT NOT NULL,
+    Status     ENUM('Held', 'Committed', 'Released') NOT NULL DEFAULT 'Held',
+    ExpiresAt  TIMESTAMP NOT NULL,
+    CreatedAt  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (OrderId, ProductId),
+    INDEX idx_reservation_status_expiry (Status, ExpiresAt),  -- orphan sweep
+    CONSTRAINT fk_sr_order
+        FOREIGN KEY (OrderId) REFERENCES `Order`(OrderId),
+    CONSTRAINT fk_sr_product
+        FOREIGN KEY (ProductId) REFERENCES Product(ProductId)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 2.13 IdempotencyKey (checkout results by Idempotency-Key header; see
+-- Backend/Source/idempotency.py)
+DROP TABLE IF EXISTS IdempotencyKey;
+CREATE TABLE IdempotencyKey (
+    CustomerId   INT NOT NULL,
+    IdemKey      VARCHAR(100) NOT NULL,
+    RequestHash  CHAR(64) NOT NULL,
+    Status       ENUM('InFlight', 'Done') NOT NULL DEFAULT 'InFlight',
+    Owner        VARCHAR(32) NOT NULL,  -- token of the attempt running the request
+    Response     TEXT,
+    CreatedAt    TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (CustomerId, IdemKey),
+    INDEX idx_idempotency_created (CreatedAt)  -- expiry cleanup
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 2.14 Outbox (events written with the order, handled in the background;
+-- see Backend/Source/outbox.py)
+DROP TABLE IF EXISTS Outbox;
+CREATE TABLE Outbox (
+    EventId      BIGINT AUTO_INCREMENT PRIMARY KEY,
+    Topic        VARCHAR(50) NOT NULL,
+    Payload      TEXT NOT NULL,
+    Status       ENUM('Pending', 'Done', 'Failed') NOT NULL DEFAULT 'Pending',
+    Attempts     INT NOT NULL DEFAULT 0,
+    AvailableAt  TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    LastError    VARCHAR(255),
+    CreatedAt    TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_outbox_pending (Status, AvailableAt)  -- worker polling
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 2.15 SalesDaily (units / revenue per day and product, kept up to date from
+-- order events; see Backend/Source/sales_rollup.py)
+DROP TABLE IF EXISTS SalesDaily;
+CREATE TABLE SalesDaily (
+    SaleDate   DATE NOT NULL,
+    ProductId  VARCHAR(20) NOT NULL,
+    Units      INT NOT NULL DEFAULT 0,
+    Revenue    DECIMAL(17,2) NOT NULL DEFAULT 0,  -- line totals at checkout price, before discounts
+    Orders     INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (SaleDate, ProductId),
+    INDEX idx_sales_product_date (ProductId, SaleDate, Units)  -- per-product windows
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 2.16 SalesRollupApplied (order events already counted in SalesDaily)
+DROP TABLE IF EXISTS SalesRollupApplied;
+CREATE TABLE SalesRollupApplied (
+    OrderId    INT NOT NULL,
+    Kind       ENUM('placed', 'cancelled') NOT NULL,
+    AppliedAt  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (OrderId, Kind)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 2.17 SalesRollupState (single row: orders up to RebuiltThrough were counted
+-- by the last full rebuild)
+DROP TABLE IF EXISTS SalesRollupState;
+CREATE TABLE SalesRollupState (
+    Id              TINYINT PRIMARY KEY,
+    RebuiltThrough  INT NOT NULL DEFAULT 0,
+    RebuiltAt       TIMESTAMP NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 SET FOREIGN_KEY_CHECKS = 1;
 
 -- =========================================================
@@ -469,6 +571,36 @@ VALUES
 (19,'LP_ACA7_BLK',1),
 (20,'TV_SO75_4K',3);
 
+-- Prices and totals for the sample orders (checkout fills them for new ones)
+SET SQL_SAFE_UPDATES = 0;
+
+UPDATE OrderContainsProduct ocp
+JOIN Product p ON p.ProductId = ocp.ProductId
+SET ocp.UnitPrice = p.Price
+WHERE ocp.UnitPrice IS NULL;
+
+UPDATE `Order` o
+JOIN (SELECT OrderId, SUM(UnitPrice * Quantity) AS Subtotal FROM OrderContainsProduct GROUP BY OrderId) t
+    ON t.OrderId = o.OrderId
+SET o.Total = t.Subtotal - IF(t.Subtotal > 1000, 50, 0)
+WHERE o.Total IS NULL;
+
+SET SQL_SAFE_UPDATES = 1;
+
+-- Sales rollup for the sample orders (what sales_rollup.py rebuild computes)
+INSERT INTO SalesDaily (SaleDate, ProductId, Units, Revenue, Orders)
+SELECT DATE(o.OrderDate), l.ProductId, SUM(l.Quantity), SUM(l.Quantity * l.UnitPrice), COUNT(*)
+FROM `Order` o
+JOIN OrderContainsProduct l ON l.OrderId = o.OrderId
+WHERE o.Status <> 'Cancelled'
+GROUP BY DATE(o.OrderDate), l.ProductId;
+
+INSERT INTO SalesRollupApplied (OrderId, Kind)
+SELECT OrderId, 'cancelled' FROM `Order` WHERE Status = 'Cancelled';
+
+INSERT INTO SalesRollupState (Id, RebuiltThrough, RebuiltAt)
+SELECT 1, COALESCE(MAX(OrderId), 0), NOW() FROM `Order`;
+
 -- 3.10 CartContainsProduct
 INSERT INTO CartContainsProduct (ProductId, CustomerId, CartId, Quantity)
 VALUES
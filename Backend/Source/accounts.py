@@ -0,0 +1,76 @@
+# Account lookup for login and registration.
+# Each role maps to one account table, and a login name is probed as a
+# Username and as an Email with two equality lookups on the unique indexes
+# (uq_*_email in db_creation.sql), joined with UNION ALL. The old
+# "Username = :u OR Email = :u" form scanned the whole table.
+#
+# Names that matched no account are remembered for NEGATIVE_CACHE_TTL
+# seconds, so repeated guesses for unknown accounts (credential stuffing)
+# stop reaching the database. The cache is per worker process: an account
+# registered through another worker may be reported as unknown here for at
+# most NEGATIVE_CACHE_TTL seconds.
+
+import os
+
+from sqlalchemy import text
+
+from .product_cache import MISSING, LRUCache
+
+NEGATIVE_CACHE_SIZE = int(os.getenv("LOGIN_NEGATIVE_CACHE_SIZE", "100000"))
+NEGATIVE_CACHE_TTL = float(os.getenv("LOGIN_NEGATIVE_CACHE_TTL", "30"))
+
+# Login roles -> account table ("buyer" and "customer" share a table)
+ROLE_TABLES = {"buyer": "Customer", "customer": "Customer", "staff": "StoreStaff", "admin": "Admin"}
+
+# A username match wins over an email match on another account
+LOOKUP_SQL = """
+    (SELECT Id, Username, Password, Name, Email, 0 AS Probe FROM {table} WHERE Username = :u)
+    UNION ALL
+    (SELECT Id, Username, Password, Name, Email, 1 AS Probe FROM {table} WHERE Email = :u)
+    ORDER BY Probe
+    LIMIT 1
+"""
+
+EXISTS_SQL = """
+    (SELECT 1 FROM {table} WHERE Username = :u)
+    UNION ALL
+    (SELECT 1 FROM {table} WHERE Email = :e)
+    LIMIT 1
+"""
+
+_unknown = LRUCache(NEGATIVE_CACHE_SIZE, NEGATIVE_CACHE_TTL)
+
+
+def _key(table: str, name: str) -> tuple[str, str]:
+    # The columns use a case-insensitive collation
+    return table, name.strip().casefold()
+
+
+async def find_account(db, role: str, name: str):
+    # Row mapping (Id, Username, Password, Name, Email) or None
+    table = ROLE_TABLES[role]
+    key = _key(table, name)
+    if NEGATIVE_CACHE_TTL > 0 and _unknown.get(key) is not MISSING:
+        return None
+
+    user = (await db.execute(text(LOOKUP_SQL.format(table=table)), {"u": name})).mappings().first()
+    if user is None and NEGATIVE_CACHE_TTL > 0:
+        _unknown.set(key, True)
+    return user
+
+
+async def exists(db, role: str, username: str, email: str) -> bool:
+    table = ROLE_TABLES[role]
+    return (await db.execute(text(EXISTS_SQL.format(table=table)), {"u": username, "e": email})).first() is not None
+
+
+def forget(role: str, *names: str):
+    # Call after creating an account so its names stop being reported unknown
+    table = ROLE_TABLES[role]
+    for name in names:
+        _unknown.delete(_key(table, name))
+
+
+def stats() -> dict:
+    return _unknown.stats()
+
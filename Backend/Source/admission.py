@@ -0,0 +1,280 @@
+# Admission control for the expensive endpoints (login / register bcrypt,
+# checkout row locks, full product listings, staff reports), so one client
+# flooding them cannot take every pooled database connection.
+#
+# Requests are sorted into route classes (ROUTE_CLASSES); other routes pass
+# straight through. For each class:
+#   - a token bucket per client IP (rate requests/s, burst): over the limit
+#     is answered at once with 429 and Retry-After
+#   - a concurrency gate of share x (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+#     requests in flight per worker process; requests wait at most
+#     ADMISSION_QUEUE_SECONDS for a slot (and never more of them than the gate
+#     size), otherwise 503 with Retry-After
+#
+# Buckets live in memory per worker by default; RATE_LIMIT_REDIS_URL shares
+# them across workers (needs the optional `redis` package). Any object with
+# `async take(key, rate, burst) -> seconds to wait` can be passed as `store`.
+# Limits per class can be overridden with
+#   ADMISSION_LIMITS="login=1:10:0.2,checkout=2:10:0.5"   (rate:burst:share)
+
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from . import metrics
+from .database_connection import MAX_OVERFLOW, POOL_SIZE
+
+log = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") not in ("0", "false", "no")
+ADMISSION_QUEUE_SECONDS = float(os.getenv("ADMISSION_QUEUE_SECONDS", "0.5"))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "")
+RATE_LIMIT_KEYS = int(os.getenv("RATE_LIMIT_KEYS", "100000"))
+# Only behind a proxy that sets it, otherwise clients can pick their own key
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "0") in ("1", "true", "yes")
+
+# (method, path, class); a path ending in "/*" matches everything below it
+ROUTE_CLASSES = (
+    ("POST", "/auth/login", "login"),
+    ("POST", "/auth/register", "login"),
+    ("POST", "/buyer/orders/checkout", "checkout"),
+    ("GET", "/buyer/products", "listing"),
+    ("GET", "/staff/products", "listing"),
+    ("GET", "/staff/products/export", "listing"),
+    ("GET", "/staff/analytics/*", "report"),
+)
+
+
+@dataclass(frozen=True)
+class Limit:
+    rate: float   # requests per second per client
+    burst: int    # bucket size
+    share: float  # fraction of the connection pool the class may hold
+
+
+LIMITS = {
+    "login": Limit(rate=1, burst=10, share=0.2),
+    "checkout": Limit(rate=2, burst=10, share=0.5),
+    "listing": Limit(rate=10, burst=40, share=0.5),
+    "report": Limit(rate=1, burst=5, share=0.2),
+}
+
+
+def _parse_limits(spec: str) -> dict[str, Limit]:
+    limits = dict(LIMITS)
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, _, values = item.partition("=")
+        rate, burst, share = values.split(":")
+        limits[name.strip()] = Limit(float(rate), int(burst), float(share))
+    return limits
+
+
+class MemoryStore:
+    # Token buckets for the most recently seen RATE_LIMIT_KEYS clients; a
+    # dropped bucket comes back full, which only an idle client would have anyway
+
+    def __init__(self, maxsize: int = RATE_LIMIT_KEYS, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()  # key -> [tokens, updated]
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(burst), now]
+                while len(self._buckets) > self.maxsize:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "clients": len(self._buckets)}
+
+
+class RedisStore:
+    # Same bucket, updated atomically in Redis with the server clock
+    SCRIPT = """
+        local t = redis.call('TIME')
+        local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+        local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+        local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+        local tokens = tonumber(b[1]) or burst
+        local ts = tonumber(b[2]) or now
+        tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+        local wait = 0
+        if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+        redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+        redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+        return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # optional dependency
+
+        self.client = redis.from_url(url)
+        self._take = self.client.register_script(self.SCRIPT)
+        self.errors = 0
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        try:
+            return float(await self._take(keys=[f"ratelimit:{key}"], args=[rate, burst]))
+        except Exception as e:
+            # Limiter outage lets requests through; the concurrency gates still apply
+            self.errors += 1
+            log.warning(f"Rate limit store error: {e}")
+            return 0.0
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "errors": self.errors}
+
+
+def _make_store():
+    if RATE_LIMIT_REDIS_URL:
+        try:
+            return RedisStore(RATE_LIMIT_REDIS_URL)
+        except ImportError:
+            log.warning("RATE_LIMIT_REDIS_URL is set but `redis` is not installed, using in-memory rate limits")
+    return MemoryStore()
+
+
+class _Gate:
+    def __init__(self, size: int):
+        self.size = size
+        self.active = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(size)
+
+    async def acquire(self, timeout: float) -> bool:
+        if self.waiting >= self.size and self._slots.locked():
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._slots.release()
+
+
+def _client_key(scope) -> str:
+    if TRUST_FORWARDED_FOR:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+async def _reject(send, status: int, retry_after: float, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, store=None, limits: dict[str, Limit] | None = None,
+                 pool_capacity: int = POOL_SIZE + MAX_OVERFLOW, queue_seconds: float = ADMISSION_QUEUE_SECONDS):
+        self.app = app
+        self.store = store or _make_store()
+        self.limits = limits or _parse_limits(os.getenv("ADMISSION_LIMITS", ""))
+        self.queue_seconds = queue_seconds
+        self.gates = {name: _Gate(max(1, int(pool_capacity * limit.share))) for name, limit in self.limits.items()}
+        self._exact = {(m, p): c for m, p, c in ROUTE_CLASSES if not p.endswith("/*")}
+        self._prefixes = [(m, p[:-1], c) for m, p, c in ROUTE_CLASSES if p.endswith("/*")]
+        _middlewares.append(self)
+
+    def route_class(self, method: str, path: str) -> str | None:
+        path = path.rstrip("/") or "/"
+        name = self._exact.get((method, path))
+        if name is None:
+            name = next((c for m, prefix, c in self._prefixes if m == method and path.startswith(prefix)), None)
+        return name if name in self.limits else None
+
+    async def __call__(self, scope, receive, send):
+        name = self.route_class(scope["method"], scope["path"]) if ADMISSION_ENABLED and scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limits[name]
+        wait = await self.store.take(f"{name}:{_client_key(scope)}", limit.rate, limit.burst)
+        if wait > 0:
+            metrics.ADMISSION_REJECTED.inc((name, "rate"))
+            await _reject(send, 429, wait, "Too many requests, slow down")
+            return
+
+        gate = self.gates[name]
+        if not await gate.acquire(self.queue_seconds):
+            metrics.ADMISSION_REJECTED.inc((name, "busy"))
+            await _reject(send, 503, 1, "Server busy, try again shortly")
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+    def stats(self) -> dict:
+        return {
+            "store": self.store.stats(),
+            "classes": {
+                name: {"in_flight": gate.active, "waiting": gate.waiting, "limit": gate.size}
+                for name, gate in self.gates.items()
+            },
+        }
+
+
+_middlewares: list[AdmissionMiddleware] = []
+
+
+def stats() -> dict:
+    # The middleware instance app.py built (Starlette builds the stack lazily)
+    return _middlewares[-1].stats() if _middlewares else {}
+
+
+async def request(handler, method: str, path: str, ip: str) -> tuple[int, dict]:
+    # Drives an ASGI app directly: (status, response headers)
+    status = 0
+    headers = {}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            headers.update((k.decode(), v.decode()) for k, v in message.get("headers", []))
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    scope = {"type": "http", "method": method, "path": path, "headers": [], "client": (ip, 1234)}
+    await handler(scope, receive, send)
+    return status, headers
+
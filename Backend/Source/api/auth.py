@@ -1,11 +1,16 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field
 from typing import Literal, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-import bcrypt  
+from sqlalchemy.exc import IntegrityError
 
 from ..database_connection import get_db
+from .. import accounts, auth_tokens, password_hashing
+from ..auth_tokens import AuthUser, get_current_user
+
+log = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -24,22 +29,25 @@ class RegisterRequest(BaseModel):
 
 class LoginResponse(BaseModel):
     access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int
     role: Role
     userId: int
     username: str
     name: Optional[str] = None
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-
-    password_bytes = plain_password.encode('utf-8')
-    hash_bytes = hashed_password.encode('utf-8')
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
-    try:
-        return bcrypt.checkpw(password_bytes, hash_bytes)
-    except Exception as e:
-        print(f"Bcrypt Check Error: {e}")
+class TokenResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int
 
-        return plain_password == hashed_password
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
 
 def clean_hash(hash_str: str) -> str:
     if not hash_str:
@@ -47,23 +55,15 @@ def clean_hash(hash_str: str) -> str:
     return hash_str.strip() 
 
 @router.post("/auth/login", response_model=LoginResponse)
-async def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    table_name = ""
-    if payload.role == "buyer" or payload.role == "customer":
-        table_name = "Customer"
-    elif payload.role == "staff":
-        table_name = "StoreStaff"
-    elif payload.role == "admin":
-        table_name = "Admin"
-    else:
+async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)):
+    if payload.role not in accounts.ROLE_TABLES:
         raise HTTPException(status_code=400, detail="Invalid role specified")
+    table_name = accounts.ROLE_TABLES[payload.role]
 
-    query = text(f"SELECT Id, Username, Password, Name, Email FROM {table_name} WHERE Username = :u OR Email = :u LIMIT 1")
-    
     try:
-        user = db.execute(query, {"u": payload.username}).mappings().first()
+        user = await accounts.find_account(db, payload.role, payload.username)
     except Exception as e:
-        print(f"DB Error: {e}")
+        log.error(f"Login query failed: {e}")
         raise HTTPException(status_code=500, detail="Database query error")
 
     if not user:
@@ -71,34 +71,69 @@ async def login(payload: LoginRequest, db: Session = Depends(get_db)):
 
     db_password = clean_hash(user["Password"])
   
-    print(f"DEBUG: Checking role {payload.role} in table {table_name}")
+    log.debug(f"Checking role {payload.role} in table {table_name}")
 
-    if not verify_password(payload.password, db_password):
+    if not await password_hashing.verify_password(payload.password, db_password):
         raise HTTPException(status_code=401, detail="Incorrect username or password.")
 
+    if password_hashing.needs_rehash(db_password):
+        # Upgrade plaintext / low-cost hashes now that we know the password
+        try:
+            new_hash = await password_hashing.hash_password(payload.password)
+            await db.execute(text(f"UPDATE {table_name} SET Password = :p WHERE Id = :id"), {"p": new_hash, "id": user["Id"]})
+            await db.commit()
+        except HTTPException:
+            pass
+        except Exception as e:
+            await db.rollback()
+            log.error(f"Password rehash failed: {e}")
+
     return {
-        "access_token": f"token-{user['Id']}-{payload.role}",
+        "access_token": auth_tokens.create_access_token(user["Id"], payload.role, user["Username"]),
+        "refresh_token": auth_tokens.create_refresh_token(user["Id"], payload.role, user["Username"]),
+        "expires_in": auth_tokens.ACCESS_TOKEN_TTL,
         "role": payload.role,
         "userId": user["Id"],
         "username": user["Username"],
         "name": user["Name"]
     }
 
+@router.post("/auth/refresh", response_model=TokenResponse)
+async def refresh(payload: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    # Refresh tokens are single use: the old one is revoked on rotation, and
+    # only the request that revokes it first gets new tokens
+    user = auth_tokens.decode_token(payload.refresh_token, "refresh")
+    if not await auth_tokens.revoke(db, user):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return {
+        "access_token": auth_tokens.create_access_token(user.id, user.role, user.username),
+        "refresh_token": auth_tokens.create_refresh_token(user.id, user.role, user.username),
+        "expires_in": auth_tokens.ACCESS_TOKEN_TTL,
+    }
+
+@router.post("/auth/logout")
+async def logout(
+    payload: LogoutRequest | None = None,
+    user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    await auth_tokens.revoke(db, user)
+    if payload and payload.refresh_token:
+        try:
+            await auth_tokens.revoke(db, auth_tokens.decode_token(payload.refresh_token, "refresh"))
+        except HTTPException:
+            pass
+    return {"message": "Logged out"}
+
 @router.post("/auth/register")
-async def register(payload: RegisterRequest, db: Session = Depends(get_db)):
-    exists = db.execute(
-        text("SELECT 1 FROM Customer WHERE Email = :e OR Username = :u"), 
-        {"e": payload.email, "u": payload.email}
-    ).first()
-    
-    if exists:
+async def register(payload: RegisterRequest, db: AsyncSession = Depends(get_db)):
+    if await accounts.exists(db, "customer", payload.email, payload.email):
         raise HTTPException(status_code=400, detail="Email already exists!")
 
-    hashed_bytes = bcrypt.hashpw(payload.password.encode('utf-8'), bcrypt.gensalt())
-    hashed_password = hashed_bytes.decode('utf-8')
+    hashed_password = await password_hashing.hash_password(payload.password)
 
     try:
-        db.execute(
+        await db.execute(
             text("""
                 INSERT INTO Customer(Username, Password, Name, Email, PhoneNumber) 
                 VALUES (:u, :p, :n, :e, :ph)
@@ -111,10 +146,15 @@ async def register(payload: RegisterRequest, db: Session = Depends(get_db)):
                 "ph": payload.phone
             }
         )
-        db.commit()
+        await db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent registration (unique Username / Email)
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email already exists!")
     except Exception as e:
-        db.rollback()
-        print(f"Register Error: {e}")
+        await db.rollback()
+        log.error(f"Register failed: {e}")
         raise HTTPException(status_code=500, detail="Failed to create account")
 
+    accounts.forget("customer", payload.email)
     return {"message": "Registration successful"}
\ No newline at end of file
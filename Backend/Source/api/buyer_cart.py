@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, bindparam
+from sqlalchemy.exc import IntegrityError
+
+from ..database_connection import get_db
+from .. import cart_store
+from ..auth_tokens import AuthUser, require_role
+from ..schemas.cart import CartUpdateRequest, CartOut
+
+router = APIRouter(dependencies=[Depends(require_role("customer"))])
+
+def _merge(payload: CartUpdateRequest) -> dict[str, int]:
+    merged: dict[str, int] = {}
+    for it in payload.items:
+        merged[it.productId] = merged.get(it.productId, 0) + it.quantity
+    return merged
+
+async def _check_products(db: AsyncSession, product_ids) -> None:
+    # One primary-key read for the whole batch
+    found = (await db.execute(
+        text("SELECT ProductId FROM Product WHERE ProductId IN :pids AND Status='Active'")
+        .bindparams(bindparam("pids", expanding=True)),
+        {"pids": list(product_ids)},
+    )).scalars().all()
+    missing = sorted(set(product_ids) - set(found))
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Product not available: {', '.join(missing)}")
+
+async def _cart_id(db: AsyncSession, user: AuthUser) -> int:
+    cart_id = await cart_store.get_or_create_cart(db, user.id)
+    await db.commit()
+    cart_store.remember_cart(user.id, cart_id)
+    return cart_id
+
+@router.get("", response_model=CartOut)
+async def get_cart(user: AuthUser = Depends(require_role("customer")), db: AsyncSession = Depends(get_db)):
+    return await cart_store.summary(db, await _cart_id(db, user))
+
+@router.post("/items", response_model=CartOut)
+async def add_cart_items(
+    payload: CartUpdateRequest,
+    user: AuthUser = Depends(require_role("customer")),
+    db: AsyncSession = Depends(get_db),
+):
+    # Adds to the quantities already in the cart
+    wanted = {pid: q for pid, q in _merge(payload).items() if q > 0}
+    if not wanted:
+        raise HTTPException(status_code=400, detail="Nothing to add")
+    await _check_products(db, wanted)
+
+    cart_id = await _cart_id(db, user)
+    try:
+        await cart_store.add_items(db, cart_id, user.id, wanted)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Product not available")
+    return await cart_store.summary(db, cart_id)
+
+@router.put("/items", response_model=CartOut)
+async def set_cart_items(
+    payload: CartUpdateRequest,
+    user: AuthUser = Depends(require_role("customer")),
+    db: AsyncSession = Depends(get_db),
+):
+    # Sets absolute quantities (0 removes the line)
+    quantities = {it.productId: it.quantity for it in payload.items}
+    added = [pid for pid, q in quantities.items() if q > 0]
+    if added:
+        await _check_products(db, added)
+
+    cart_id = await _cart_id(db, user)
+    try:
+        await cart_store.set_items(db, cart_id, user.id, quantities)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Product not available")
+    return await cart_store.summary(db, cart_id)
+
+@router.delete("/items/{product_id}", response_model=CartOut)
+async def remove_cart_item(
+    product_id: str,
+    user: AuthUser = Depends(require_role("customer")),
+    db: AsyncSession = Depends(get_db),
+):
+    cart_id = await _cart_id(db, user)
+    await cart_store.remove_items(db, cart_id, [product_id])
+    return await cart_store.summary(db, cart_id)
+
+@router.delete("", response_model=CartOut)
+async def clear_cart(user: AuthUser = Depends(require_role("customer")), db: AsyncSession = Depends(get_db)):
+    cart_id = await _cart_id(db, user)
+    await cart_store.clear(db, cart_id)
+    return await cart_store.summary(db, cart_id)
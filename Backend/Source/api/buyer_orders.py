@@ -1,34 +1,74 @@
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, bindparam
 
 from ..database_connection import get_db
-from ..schemas.order import PlaceOrderRequest, PlaceOrderResponse, OrderItemOut
+from .. import cart_store, idempotency, inventory, order_history, outbox, product_cache
+from ..catalog_query import decode_cursor
+from ..auth_tokens import AuthUser, require_role
+from ..schemas.order import PlaceOrderRequest, PlaceOrderResponse, OrderItemOut, OrderOut
 
 router = APIRouter()
 
-def _get_or_create_cart(db: Session, customer_id: int) -> int:
-    row = db.execute(text("SELECT CartId FROM Cart WHERE CustomerId=:cid LIMIT 1"), {"cid": customer_id}).mappings().first()
-    if row:
-        return int(row["CartId"])
-    res = db.execute(text("INSERT INTO Cart(CustomerId) VALUES (:cid)"), {"cid": customer_id})
-    return int(res.lastrowid)
+@router.get("", response_model=list[OrderOut], response_model_exclude_unset=True)
+async def list_orders(
+    response: Response,
+    limit: int = Query(default=20, ge=1, le=order_history.MAX_ORDER_PAGE),
+    cursor: str | None = Query(default=None, description="X-Next-Cursor of the previous page"),
+    user: AuthUser = Depends(require_role("customer")),
+    db: AsyncSession = Depends(get_db),
+):
+    # Newest first
+    after = decode_cursor(cursor) if cursor else None
+    orders, next_cursor = await order_history.list_orders(db, user.id, limit, after)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return orders
+
+@router.get("/{order_id}", response_model=OrderOut)
+async def get_order(
+    order_id: int,
+    user: AuthUser = Depends(require_role("customer")),
+    db: AsyncSession = Depends(get_db),
+):
+    order = await order_history.get_order(db, user.id, order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order
 
 @router.post("/checkout", response_model=PlaceOrderResponse)
-def checkout(
+async def checkout(
     payload: PlaceOrderRequest,
-    db: Session = Depends(get_db),
-    x_customer_id: int | None = Header(default=None, alias="X-Customer-Id"),
+    db: AsyncSession = Depends(get_db),
+    user: AuthUser = Depends(require_role("customer")),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
 ):
-    customer_id = payload.customerId or x_customer_id or 1
-
-    if not payload.items:
-        raise HTTPException(status_code=400, detail="Cart is empty")
+    if payload.customerId is not None and payload.customerId != user.id:
+        raise HTTPException(status_code=403, detail="Cannot place orders for another customer")
+    if not idempotency_key:
+        return await _place_order(db, user.id, payload)
+
+    # Client retries with the same key get the first response, see idempotency.py
+    return await idempotency.run(
+        user.id,
+        idempotency_key,
+        payload.model_dump(mode="json"),
+        lambda owner: _place_order(db, user.id, payload, idempotency_key, owner),
+    )
+
+async def _place_order(
+    db: AsyncSession,
+    customer_id: int,
+    payload: PlaceOrderRequest,
+    idempotency_key: str | None = None,
+    idempotency_owner: str | None = None,
+) -> dict:
+    reserved: dict[str, int] | None = None
 
     try:
-        with db.begin():
-            cart_id = _get_or_create_cart(db, customer_id)
+        async with db.begin():
+            cart_id = await cart_store.get_or_create_cart(db, customer_id)
 
             items_out: list[OrderItemOut] = []
             subtotal = 0.0
@@ -40,82 +80,135 @@ def checkout(
             if payload.note:
                 recipient_contact += f"\nNote: {payload.note}"
 
-            res = db.execute(
-                text("""
-                    INSERT INTO `Order`(CustomerId, CartId, IntendedShipmentDate, RecipientName, RecipientContact, ShipmentAddress, Status)
-                    VALUES (:cid, :cartid, :ship, :rname, :rcontact, :addr, 'Pending')
-                """),
-                {
-                    "cid": customer_id,
-                    "cartid": cart_id,
-                    "ship": intended_ship,
-                    "rname": payload.recipientName,
-                    "rcontact": recipient_contact,
-                    "addr": payload.address,
-                }
-            )
-            order_id = int(res.lastrowid)
-
+            # Merge repeated lines, then read every product in one statement.
+            # Stock is not locked here, see inventory.py.
+            wanted: dict[str, int] = {}
             for it in payload.items:
-                p = db.execute(
-                    text("""
-                        SELECT ProductId, ProductName, Price, Quantity, Status
-                        FROM Product
-                        WHERE ProductId=:pid
-                        FOR UPDATE
-                    """),
-                    {"pid": str(it.productId)},
-                ).mappings().first()
-
+                pid = str(it.productId)
+                wanted[pid] = wanted.get(pid, 0) + it.quantity
+            if not payload.items:
+                wanted = await cart_store.load_quantities(db, cart_id)
+            if not wanted:
+                raise HTTPException(status_code=400, detail="Cart is empty")
+            pids = sorted(wanted)
+
+            rows = (await db.execute(
+                text("""
+                    SELECT ProductId, ProductName, Price, Quantity, Status
+                    FROM Product
+                    WHERE ProductId IN :pids
+                """).bindparams(bindparam("pids", expanding=True)),
+                {"pids": pids},
+            )).mappings().all()
+            products = {p["ProductId"]: p for p in rows}
+            stock = {pid: int(p["Quantity"] or 0) for pid, p in products.items()}
+
+            for pid in pids:
+                p = products.get(pid)
                 if not p or p["Status"] != "Active":
-                    raise HTTPException(status_code=400, detail=f"Product not available: {it.productId}")
-
-                stock = int(p["Quantity"] or 0)
-                if stock < it.quantity:
-                    raise HTTPException(status_code=400, detail=f"Not enough stock for {p['ProductId']} (remain {stock})")
+                    raise HTTPException(status_code=400, detail=f"Product not available: {pid}")
+
+            if inventory.STOCK_MODE == "ledger":
+                short = inventory.ledger.reserve(wanted, stock)
+                if short:
+                    remain = max(inventory.ledger.available(short), 0)
+                    raise HTTPException(status_code=400, detail=f"Not enough stock for {short} (remain {remain})")
+                reserved = wanted
+            else:
+                for pid, qty in wanted.items():
+                    if stock[pid] < qty:
+                        raise HTTPException(status_code=400, detail=f"Not enough stock for {pid} (remain {stock[pid]})")
+
+            for pid, qty in wanted.items():
+                p = products[pid]
 
                 unit_price = float(p["Price"] or 0)
-                line_total = unit_price * it.quantity
+                line_total = unit_price * qty
                 subtotal += line_total
 
-                db.execute(
-                    text("UPDATE Product SET Quantity = Quantity - :q WHERE ProductId=:pid"),
-                    {"q": it.quantity, "pid": p["ProductId"]},
-                )
-                db.execute(
-                    text("INSERT INTO OrderContainsProduct(OrderId, ProductId, Quantity) VALUES (:oid, :pid, :q)"),
-                    {"oid": order_id, "pid": p["ProductId"], "q": it.quantity},
-                )
-
                 items_out.append(
                     OrderItemOut(
                         productId=p["ProductId"],
                         productName=p["ProductName"],
                         unitPrice=unit_price,
-                        quantity=it.quantity,
+                        quantity=qty,
                         lineTotal=line_total,
                     )
                 )
 
-            db.execute(text("DELETE FROM CartContainsProduct WHERE CartId=:cartid AND CustomerId=:cid"), {"cartid": cart_id, "cid": customer_id})
+            discount = cart_store.discount_for(subtotal)
+            total = subtotal - discount
+
+            res = await db.execute(
+                text("""
+                    INSERT INTO `Order`(CustomerId, CartId, IntendedShipmentDate, RecipientName, RecipientContact, ShipmentAddress, Status, Total)
+                    VALUES (:cid, :cartid, :ship, :rname, :rcontact, :addr, 'Pending', :total)
+                """),
+                {
+                    "cid": customer_id,
+                    "cartid": cart_id,
+                    "ship": intended_ship,
+                    "rname": payload.recipientName,
+                    "rcontact": recipient_contact,
+                    "addr": payload.address,
+                    "total": total,
+                }
+            )
+            order_id = int(res.lastrowid)
 
-        discount = 50.0 if subtotal > 1000 else 0.0
-        total = subtotal - discount
+            # One multi-row INSERT for the lines
+            await db.execute(
+                text("INSERT INTO OrderContainsProduct(OrderId, ProductId, Quantity, UnitPrice) VALUES (:oid, :pid, :q, :price)"),
+                [{"oid": order_id, "pid": pid, "q": wanted[pid], "price": products[pid]["Price"]} for pid in pids],
+            )
 
-        return PlaceOrderResponse(
-            id=str(order_id),
-            recipientName=payload.recipientName,
-            recipientPhone=payload.recipientPhone,
-            address=payload.address,
-            status="Pending",
-            items=items_out,
-            subtotal=subtotal,
-            discount=discount,
-            total=total,
-        )
+            await db.execute(text("DELETE FROM CartContainsProduct WHERE CartId=:cartid AND CustomerId=:cid"), {"cartid": cart_id, "cid": customer_id})
+            await cart_store.bump_version(db, cart_id)
+
+            response = PlaceOrderResponse(
+                id=str(order_id),
+                recipientName=payload.recipientName,
+                recipientPhone=payload.recipientPhone,
+                address=payload.address,
+                status="Pending",
+                items=items_out,
+                subtotal=subtotal,
+                discount=discount,
+                total=total,
+            ).model_dump(mode="json")
+            if idempotency_key:
+                await idempotency.save(db, customer_id, idempotency_key, idempotency_owner, response)
+            # Confirmation, stock alerts ... run after commit, see order_events.py
+            await outbox.publish(db, "order.placed", {
+                "orderId": order_id,
+                "customerId": customer_id,
+                "items": wanted,
+                "total": total,
+            })
+
+            if reserved:
+                await inventory.hold(db, order_id, wanted)
+            elif not await inventory.decrement(db, wanted):
+                # Last statement before commit: the Product rows stay locked only briefly
+                raise HTTPException(status_code=400, detail="Not enough stock, please review your cart")
+
+        cart_store.remember_cart(customer_id, cart_id)
+        cart_store.invalidate(cart_id)
+        outbox.notify()
+        if reserved:
+            inventory.enqueue(order_id, wanted)
+            reserved = None
+        else:
+            await product_cache.invalidate_products(pids)
+
+        return response
 
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Checkout failed: {type(e).__name__}")
+    finally:
+        if reserved:
+            # The order was not placed: give the stock back to the ledger
+            inventory.ledger.release(reserved)
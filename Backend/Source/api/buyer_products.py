@@ -1,80 +1,200 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from pathlib import Path
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from typing import AsyncIterator
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, bindparam
 
-from ..database_connection import get_db
+from ..database_connection import get_read_db, may_be_stale, on_primary, read_session
+from .. import json_stream, product_search, product_cache
+from ..catalog_query import (
+    MAX_PAGE_SIZE, parse_fields, select_columns, product_dict, product_out,
+    decode_cursor, release_cursor, release_keyset, offset_cursor, cursor_offset,
+)
+from ..http_cache import catalog_version, make_etag, etag_matches, set_etag, not_modified
 from ..schemas.product import ProductOut
 
 router = APIRouter()
 
-def get_product_image_url(product_id: str) -> str:
+# Search hits fetched per query when streaming an index search result
+STREAM_ID_CHUNK = 500
 
-    base_dir = Path(__file__).resolve().parent.parent.parent / "database" / "product_images"
-    product_dir = base_dir / product_id
-
-    for ext in [".jpg", ".png", ".jpeg", ".webp"]:
-        if (product_dir / f"1{ext}").exists():
-            return f"/product_images/{product_id}/1{ext}"
-    
-    return None 
-
-@router.get("", response_model=list[ProductOut])
-def list_products(
+@router.get("", response_model=list[ProductOut], response_model_exclude_unset=True)
+async def list_products(
+    response: Response,
     q: str | None = Query(default=None, description="search by id/name/brand"),
-    db: Session = Depends(get_db),
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE, description="page size, omit for the full list"),
+    cursor: str | None = Query(default=None, description="X-Next-Cursor of the previous page"),
+    fields: str | None = Query(default=None, description="comma-separated fields to return"),
+    stream: str | None = Query(default=None, pattern=json_stream.STREAM_FORMATS, description="stream the full list as a JSON array or NDJSON"),
+    if_none_match: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    sql = """
-        SELECT ProductId, ProductName, Brand, Price, Color, Quantity, Specification, WarrantyPeriod, ReleaseDate, Status
+    if stream and limit:
+        raise HTTPException(status_code=400, detail="stream cannot be combined with limit")
+    field_list = parse_fields(fields)
+    after = decode_cursor(cursor) if cursor else None
+    params = _cache_params(q, limit, cursor, field_list, stream)
+
+    version = await catalog_version(db)
+    if version is not None:
+        etag = make_etag(version, "buyer-list", params)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, if_none_match)
+        set_etag(response, etag)
+
+    if stream:
+        # Large responses skip the listing cache, which would hold them whole
+        return json_stream.streaming_response(
+            _stream_products(q, after, field_list, on_primary(db)), stream, dict(response.headers),
+        )
+
+    cache_key = product_cache.listing_key(version, params)
+    cached = await product_cache.get_listing(cache_key)
+    if cached is product_cache.MISSING:
+        items, next_cursor = await _load_products(db, q, limit, after, field_list)
+        cached = {"items": [p.model_dump(exclude_unset=True) for p in items], "next": next_cursor}
+        if not may_be_stale(db):
+            await product_cache.set_listing(cache_key, cached)
+
+    if cached["next"]:
+        response.headers["X-Next-Cursor"] = cached["next"]
+    return cached["items"]
+
+def _cache_params(q, limit, cursor, field_list, stream) -> dict:
+    return {"q": q, "limit": limit, "cursor": cursor, "fields": field_list, "stream": stream}
+
+async def warm_listing_cache(db: AsyncSession):
+    # Called at startup: the storefront opens with the full, unfiltered list
+    version = await catalog_version(db)
+    items, next_cursor = await _load_products(db, None, None, None, None)
+    await product_cache.set_listing(
+        product_cache.listing_key(version, _cache_params(None, None, None, None, None)),
+        {"items": [p.model_dump(exclude_unset=True) for p in items], "next": next_cursor},
+    )
+    return len(items)
+
+def _use_index(q: str | None) -> bool:
+    return bool(q) and product_search.SEARCH_BACKEND == "index" and product_search.is_ready()
+
+def _listing_sql(field_list: list[str] | None) -> str:
+    return f"""
+        SELECT {select_columns(field_list, ("ReleaseDate", "ProductName"))}
         FROM Product
         WHERE Status='Active'
     """
-    params = {}
+
+def _filter_sql(q: str | None, after: dict | None, params: dict) -> str:
+    # Search filter and ORDER BY for the fulltext and LIKE paths
+    if q and product_search.SEARCH_BACKEND == "fulltext":
+        # Relevance order has no stable key to seek on, so this path pages by offset
+        params["ft"] = product_search.fulltext_query(q)
+        match = f"MATCH({product_search.FULLTEXT_COLUMNS}) AGAINST (:ft IN BOOLEAN MODE)"
+        return f" AND {match} ORDER BY {match} DESC, ProductName ASC, ProductId ASC"
+
+    sql = ""
     if q:
         sql += " AND (ProductId LIKE :q OR ProductName LIKE :q OR Brand LIKE :q)"
         params["q"] = f"%{q}%"
-    sql += " ORDER BY ReleaseDate DESC, ProductName ASC"
-
-    rows = db.execute(text(sql), params).mappings().all()
-    return [
-        ProductOut(
-            productId=r["ProductId"],
-            productName=r["ProductName"],
-            brand=r["Brand"],
-            price=float(r["Price"]) if r["Price"] is not None else None,
-            color=r["Color"],
-            quantity=r["Quantity"],
-            specification=r["Specification"],
-            warrantyPeriod=r["WarrantyPeriod"],
-            releaseDate=r["ReleaseDate"],
-            status=r["Status"],
-            imageBaseUrl=get_product_image_url(r["ProductId"]),
-        )
-        for r in rows
-    ]
+    if after:
+        sql += " AND " + release_keyset(after, params)
+    return sql + " ORDER BY ReleaseDate DESC, ProductName ASC, ProductId ASC"
+
+async def _load_products(
+    db: AsyncSession,
+    q: str | None,
+    limit: int | None,
+    after: dict | None,
+    field_list: list[str] | None,
+) -> tuple[list[ProductOut], str | None]:
+    next_cursor = None
+
+    sql = _listing_sql(field_list)
+    params = {}
+    if _use_index(q):
+        offset = cursor_offset(after)
+        # One extra hit tells whether another page follows
+        page_ids = product_search.search(q, offset=offset, limit=limit + 1 if limit else None)
+        if limit and len(page_ids) > limit:
+            page_ids = page_ids[:limit]
+            next_cursor = offset_cursor(offset + limit)
+        if not page_ids:
+            return [], next_cursor
+        stmt = text(sql + " AND ProductId IN :ids").bindparams(bindparam("ids", expanding=True))
+        rank = {pid: i for i, pid in enumerate(page_ids)}
+        rows = sorted((await db.execute(stmt, {"ids": page_ids})).mappings().all(), key=lambda r: rank[r["ProductId"]])
+        return [product_out(r, field_list) for r in rows], next_cursor
+
+    sql += _filter_sql(q, after, params)
+    fulltext = "ft" in params
+    offset = cursor_offset(after) if fulltext else 0
+    if limit and fulltext:
+        sql += " LIMIT :limit OFFSET :offset"
+        params.update(limit=limit + 1, offset=offset)
+    elif limit:
+        sql += " LIMIT :limit"
+        params["limit"] = limit + 1
+
+    rows = (await db.execute(text(sql), params)).mappings().all()
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = offset_cursor(offset + limit) if fulltext else release_cursor(rows[-1])
+
+    return [product_out(r, field_list) for r in rows], next_cursor
+
+async def _stream_products(
+    q: str | None,
+    after: dict | None,
+    field_list: list[str] | None,
+    primary: bool = False,
+) -> AsyncIterator[dict]:
+    sql = _listing_sql(field_list)
+    params = {}
+    if _use_index(q):
+        ids = product_search.search(q, offset=cursor_offset(after))
+        stmt = text(sql + " AND ProductId IN :ids").bindparams(bindparam("ids", expanding=True))
+        async with read_session(primary) as db:
+            for i in range(0, len(ids), STREAM_ID_CHUNK):
+                chunk = ids[i:i + STREAM_ID_CHUNK]
+                rank = {pid: n for n, pid in enumerate(chunk)}
+                rows = (await db.execute(stmt, {"ids": chunk})).mappings().all()
+                for r in sorted(rows, key=lambda r: rank[r["ProductId"]]):
+                    yield product_dict(r, field_list)
+        return
+
+    sql += _filter_sql(q, after, params)
+    async for r in json_stream.stream_rows(sql, params, primary):
+        yield product_dict(r, field_list)
 
 @router.get("/{product_id}", response_model=ProductOut)
-def get_product(product_id: str, db: Session = Depends(get_db)):
-    row = db.execute(
+async def get_product(
+    product_id: str,
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    version = await catalog_version(db)
+    if version is not None:
+        etag = make_etag(version, "buyer-product", product_id)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, if_none_match)
+        set_etag(response, etag)
+
+    cached = await product_cache.get_product(product_id, version)
+    if cached is not product_cache.MISSING:
+        return cached
+
+    product = await _load_product(db, product_id)
+    if not may_be_stale(db):
+        await product_cache.set_product(product_id, version, product.model_dump())
+    return product
+
+async def _load_product(db: AsyncSession, product_id: str) -> ProductOut:
+    row = (await db.execute(
         text("""
             SELECT ProductId, ProductName, Brand, Price, Color, Quantity, Specification, WarrantyPeriod, ReleaseDate, Status
             FROM Product WHERE ProductId=:pid LIMIT 1
         """),
         {"pid": product_id},
-    ).mappings().first()
+    )).mappings().first()
     if not row:
-        return ProductOut(productId=product_id, productName="(not found)")
-
-    return ProductOut(
-        productId=row["ProductId"],
-        productName=row["ProductName"],
-        brand=row["Brand"],
-        price=float(row["Price"]) if row["Price"] is not None else None,
-        color=row["Color"],
-        quantity=row["Quantity"],
-        specification=row["Specification"],
-        warrantyPeriod=row["WarrantyPeriod"],
-        releaseDate=row["ReleaseDate"],
-        status=row["Status"],
-        imageBaseUrl=get_product_image_url(row["ProductId"]),
-    )
\ No newline at end of file
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product_out(row)
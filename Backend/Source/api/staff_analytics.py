@@ -0,0 +1,61 @@
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database_connection import get_read_db
+from ..auth_tokens import require_role
+from .. import order_events, sales_rollup
+from ..sales_rollup import MAX_REPORT_ROWS
+from ..schemas.analytics import SalesRow, LowStockRow, SellThroughRow
+
+router = APIRouter(
+    prefix="/staff/analytics",
+    tags=["staff-analytics"],
+    dependencies=[Depends(require_role("staff", "admin"))],
+)
+
+# All reports read the SalesDaily rollup, see sales_rollup.py
+
+@router.get("/revenue", response_model=list[SalesRow], response_model_exclude_none=True)
+async def revenue(
+    group: Literal["day", "brand", "product"] = "day",
+    start: date | None = Query(default=None, description="first day, default 30 days before end"),
+    end: date | None = Query(default=None, description="last day, default today"),
+    order_by: Literal["revenue", "units"] = "revenue",
+    limit: int = Query(default=50, ge=1, le=MAX_REPORT_ROWS, description="rows for brand / product grouping"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    start, end = sales_rollup.default_range(start, end)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return await sales_rollup.revenue(db, group, start, end, order_by, limit)
+
+@router.get("/top-products", response_model=list[SalesRow], response_model_exclude_none=True)
+async def top_products(
+    days: int = Query(default=7, ge=1, le=3660),
+    order_by: Literal["revenue", "units"] = "units",
+    limit: int = Query(default=10, ge=1, le=MAX_REPORT_ROWS),
+    db: AsyncSession = Depends(get_read_db),
+):
+    start, end = sales_rollup.default_range(None, None, days)
+    return await sales_rollup.revenue(db, "product", start, end, order_by, limit)
+
+@router.get("/low-stock", response_model=list[LowStockRow])
+async def low_stock(
+    threshold: int = Query(default=order_events.LOW_STOCK_THRESHOLD, ge=0),
+    days: int = Query(default=30, ge=1, le=365, description="sales window for daysOfCover"),
+    limit: int = Query(default=100, ge=1, le=MAX_REPORT_ROWS),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await sales_rollup.low_stock(db, threshold, days, limit)
+
+@router.get("/sell-through", response_model=list[SellThroughRow])
+async def sell_through(
+    days: int = Query(default=30, ge=1, le=365),
+    order: Literal["desc", "asc"] = Query(default="desc", description="asc lists the slowest movers"),
+    limit: int = Query(default=50, ge=1, le=MAX_REPORT_ROWS),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await sales_rollup.sell_through(db, days, limit, ascending=order == "asc")
@@ -1,39 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from pathlib import Path
-import shutil
 from typing import Optional
+import io
+import logging
+import shutil
+import tempfile
 
-from Backend.Source.database_connection import get_db
+from Backend.Source.database_connection import get_db, get_read_db, on_primary, stick_to_primary, wants_primary
+from Backend.Source.auth_tokens import require_role
 from Backend.Source.schemas.product import ProductOut, ProductCreate, ProductUpdate
+from Backend.Source import bulk_products, image_index, image_pipeline, json_stream, product_search, product_cache
+from Backend.Source.image_index import IMAGE_DIR
+from Backend.Source.uploads import save_image_upload
+from Backend.Source.http_cache import catalog_version, make_etag, etag_matches, set_etag, not_modified
+from Backend.Source.catalog_query import MAX_PAGE_SIZE, parse_fields, select_columns, product_dict, product_out, decode_cursor, name_cursor, name_keyset
+
+log = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/staff/products", tags=["staff-products"])
+router = APIRouter(
+    prefix="/staff/products",
+    tags=["staff-products"],
+    dependencies=[Depends(require_role("staff", "admin"))],
+)
 
-BASE_DIR = Path(__file__).resolve().parent.parent.parent
-IMAGE_DIR = BASE_DIR / "database" / "product_images"
-IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+# Bulk import bodies above this size are spooled to a temp file instead of memory
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
 
 class ProductStatusPayload(BaseModel):
     status: str
 
-def get_product_image_url(product_id: str) -> Optional[str]:
- 
-    product_sub_folder = IMAGE_DIR / product_id
-    if product_sub_folder.exists() and product_sub_folder.is_dir():
-        for ext in [".jpg", ".png", ".jpeg", ".webp"]:
-            if (product_sub_folder / f"1{ext}").exists():
-                return f"/product_images/{product_id}/1{ext}"
-            if (product_sub_folder / f"{product_id}{ext}").exists():
-                return f"/product_images/{product_id}/{product_id}{ext}"
-
-    for ext in [".jpg", ".png", ".jpeg", ".webp"]:
-        file_name = f"{product_id}{ext}"
-        if (IMAGE_DIR / file_name).exists():
-             return f"/product_images/{file_name}"
-             
-    return None
+def _save_image(product_id: str, image: UploadFile, replace: bool = False):
+    # Blocking file I/O, called through run_in_threadpool
+    product_folder = IMAGE_DIR / product_id
+    file_path = save_image_upload(image.file, product_folder)
+
+    if replace:
+        # The new file is already in place. An old original saved with a
+        # different extension stays until a rescan prunes it, since other
+        # workers may still serve its URL (see image_index)
+        image_index.set_product_image(product_id, f"/product_images/{product_id}/{file_path.name}")
+
+    image_index.refresh_product(product_id)
+
+def _discard_image(product_id: str):
+    # Blocking; removes what _save_image wrote for a product that was not created
+    shutil.rmtree(IMAGE_DIR / product_id, ignore_errors=True)
+    image_index.refresh_product(product_id)
 
 def k_to_col(k: str) -> str:
     mapping = {
@@ -45,39 +61,59 @@ def k_to_col(k: str) -> str:
     if k in mapping: return mapping[k]
     return k[0].upper() + k[1:]
 
-@router.get("", response_model=list[ProductOut])
-def staff_list_products(
+@router.get("", response_model=list[ProductOut], response_model_exclude_unset=True)
+async def staff_list_products(
+    response: Response,
     q: str | None = Query(default=None, description="search"),
     include_deactivated: bool = True,
-    db: Session = Depends(get_db),
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE, description="page size, omit for the full list"),
+    cursor: str | None = Query(default=None, description="X-Next-Cursor of the previous page"),
+    fields: str | None = Query(default=None, description="comma-separated fields to return"),
+    stream: str | None = Query(default=None, pattern=json_stream.STREAM_FORMATS, description="stream the full list as a JSON array or NDJSON"),
+    if_none_match: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    sql = "SELECT * FROM Product WHERE 1=1"
+    if stream and limit:
+        raise HTTPException(status_code=400, detail="stream cannot be combined with limit")
+    field_list = parse_fields(fields)
+
+    version = await catalog_version(db)
+    if version is not None:
+        etag = make_etag(version, "staff-list", q, include_deactivated, limit, cursor, field_list, stream)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, if_none_match)
+        set_etag(response, etag)
+
+    sql = f"SELECT {select_columns(field_list, ('ProductName',))} FROM Product WHERE 1=1"
     params = {}
     if not include_deactivated: sql += " AND Status='Active'"
     if q:
         sql += " AND (ProductId LIKE :q OR ProductName LIKE :q)"
         params["q"] = f"%{q}%"
-    sql += " ORDER BY ProductName ASC"
-
-    rows = db.execute(text(sql), params).mappings().all()
-    return [
-        ProductOut(
-            productId=r["ProductId"],
-            productName=r["ProductName"],
-            brand=r["Brand"],
-            price=float(r["Price"] or 0),
-            color=r["Color"],
-            quantity=r["Quantity"],
-            specification=r["Specification"],
-            warrantyPeriod=r["WarrantyPeriod"],
-            releaseDate=r["ReleaseDate"],
-            status=r["Status"],
-            imageBaseUrl=get_product_image_url(r["ProductId"]),
-        ) for r in rows
-    ]
+    if cursor:
+        sql += " AND " + name_keyset(decode_cursor(cursor), params)
+    sql += " ORDER BY ProductName ASC, ProductId ASC"
+
+    if stream:
+        rows = json_stream.stream_rows(sql, params, on_primary(db))
+        return json_stream.streaming_response(
+            (product_dict(r, field_list) async for r in rows), stream, dict(response.headers)
+        )
+
+    if limit:
+        sql += " LIMIT :limit"
+        params["limit"] = limit + 1
+
+    rows = (await db.execute(text(sql), params)).mappings().all()
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = name_cursor(rows[-1])
+
+    return [product_out(r, field_list) for r in rows]
 
 @router.post("")
-def staff_create_product(
+async def staff_create_product(
+    response: Response,
     productId: str = Form(...),
     productName: str = Form(...),
     brand: str = Form(...),
@@ -86,25 +122,15 @@ def staff_create_product(
     specification: str = Form(None),
     status: str = Form("Active"),
     image: UploadFile = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    print(f"👉 ADD REQUEST: {productId} - {productName}") 
+    log.debug(f"Add product request: {productId} - {productName}")
+    uncommitted_image = False
     try:
-        exists = db.execute(text("SELECT 1 FROM Product WHERE ProductId=:pid"), {"pid": productId}).first()
+        exists = (await db.execute(text("SELECT 1 FROM Product WHERE ProductId=:pid"), {"pid": productId})).first()
         if exists: raise HTTPException(status_code=400, detail=f"ID '{productId}' already exists")
-  
-        if image:
-            product_folder = IMAGE_DIR / productId
-            product_folder.mkdir(parents=True, exist_ok=True)
-
-            file_ext = image.filename.split(".")[-1]
 
-            file_path = product_folder / f"1.{file_ext}"
-            
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-
-        db.execute(
+        await db.execute(
             text("""
                 INSERT INTO Product(ProductId, ProductName, Brand, Price, Color, Quantity, Specification, WarrantyPeriod, ReleaseDate, Status) 
                 VALUES (:pid, :name, :brand, :price, 'Black', :qty, :spec, 12, CURDATE(), :st)
@@ -119,18 +145,82 @@ def staff_create_product(
                 "st": status
             }
         )
-        db.commit()
-        print("✅ ADD SUCCESS")
+        if image:
+            # After the INSERT, so a duplicate id never reaches the image folder
+            uncommitted_image = True
+            await run_in_threadpool(_save_image, productId, image)
+        await db.commit()
+        uncommitted_image = False
+        if image:
+            image_pipeline.submit(productId)
+        product_search.index_product({
+            "ProductId": productId,
+            "ProductName": productName,
+            "Brand": brand,
+            "Specification": specification,
+            "Status": status,
+        })
+        stick_to_primary(response)
+        await product_cache.invalidate_product(productId)
+        log.info(f"Product {productId} added")
+    except HTTPException:
+        await db.rollback()
+        if uncommitted_image:
+            await run_in_threadpool(_discard_image, productId)
+        raise
     except Exception as e:
-        db.rollback()
-        print(f"❌ ADD ERROR: {e}")
+        await db.rollback()
+        if uncommitted_image:
+            await run_in_threadpool(_discard_image, productId)
+        log.error(f"Add product {productId} failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
     return {"message": "Success"}
 
+@router.post("/import")
+async def staff_import_products(
+    request: Request,
+    response: Response,
+    format: str | None = Query(default=None, pattern="^(csv|ndjson)$", description="default: from Content-Type"),
+    db: AsyncSession = Depends(get_db),
+):
+    # Raw CSV / NDJSON body (not multipart), e.g.
+    # curl -X POST --data-binary @feed.csv -H "Content-Type: text/csv" .../staff/products/import
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "ndjson" if "ndjson" in content_type or "jsonl" in content_type else "csv"
+
+    spool = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES)
+    try:
+        async for chunk in request.stream():
+            await run_in_threadpool(spool.write, chunk)
+        spool.seek(0)
+        f = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        try:
+            report = await bulk_products.import_products(db, f, format)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="Import file must be UTF-8")
+    finally:
+        spool.close()
+
+    if report["upserted"]:
+        stick_to_primary(response)
+    log.info(f"Bulk import: {report['upserted']} upserted, {report['failed']} failed")
+    return report
+
+@router.get("/export")
+async def staff_export_products(request: Request, format: str = Query(default="csv", pattern="^(csv|ndjson)$")):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        bulk_products.export_products(format, wants_primary(request)),
+        media_type=f"{media_type}; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'},
+    )
+
 @router.put("/{product_id}", response_model=ProductOut)
-def staff_update_product(
+async def staff_update_product(
     product_id: str,
+    response: Response,
     productName: Optional[str] = Form(None),
     brand: Optional[str] = Form(None),
     price: Optional[float] = Form(None),
@@ -138,9 +228,9 @@ def staff_update_product(
     specification: Optional[str] = Form(None),
     status: Optional[str] = Form(None),
     image: UploadFile = File(None), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    print(f"👉 UPDATE REQUEST for {product_id}")
+    log.debug(f"Update product request: {product_id}")
 
     update_data = {
         "ProductName": productName,
@@ -152,67 +242,57 @@ def staff_update_product(
     }
     update_fields = {k: v for k, v in update_data.items() if v is not None}
 
-    if update_fields:
-        set_clause = ", ".join([f"{k}=:{k}" for k in update_fields.keys()])
-        params = {**update_fields, "pid": product_id}
-        sql = f"UPDATE Product SET {set_clause} WHERE ProductId=:pid"
-        
+    if image:
+        # Before the UPDATE, so a rejected image (413/415) leaves the product untouched
         try:
-            db.execute(text(sql), params)
-            db.commit()
+            await run_in_threadpool(_save_image, product_id, image, True)
+            image_pipeline.submit(product_id)
+            log.info(f"Image updated for {product_id}")
+        except HTTPException:
+            raise
         except Exception as e:
-            db.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
+            image_index.refresh_product(product_id)
+            log.error(f"Image update failed for {product_id}: {e}")
 
+    assignments = [f"{k}=:{k}" for k in update_fields.keys()]
     if image:
+        # The image lives on disk; UpdatedAt is what moves the catalog version (ETags)
+        assignments.append("UpdatedAt=CURRENT_TIMESTAMP(6)")
+    if assignments:
+        params = {**update_fields, "pid": product_id}
+        sql = f"UPDATE Product SET {', '.join(assignments)} WHERE ProductId=:pid"
+        
         try:
-
-            product_folder = IMAGE_DIR / product_id
-            product_folder.mkdir(parents=True, exist_ok=True)
-
-            for existing_file in product_folder.glob("1.*"):
-                existing_file.unlink()
-
-            file_ext = image.filename.split(".")[-1]
-            file_path = product_folder / f"1.{file_ext}"
-            
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-                
-            print(f"✅ IMAGE UPDATED for {product_id}")
+            await db.execute(text(sql), params)
+            await db.commit()
         except Exception as e:
-            print(f"❌ IMAGE UPDATE ERROR: {e}")
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
 
-    updated = db.execute(text("SELECT * FROM Product WHERE ProductId=:pid"), {"pid": product_id}).mappings().first()
+    updated = (await db.execute(text("SELECT * FROM Product WHERE ProductId=:pid"), {"pid": product_id})).mappings().first()
     if not updated: raise HTTPException(status_code=404, detail="Product not found")
+    product_search.index_product(updated)
+    stick_to_primary(response)
+    await product_cache.invalidate_product(product_id)
     
-    return ProductOut(
-        productId=updated["ProductId"],
-        productName=updated["ProductName"],
-        brand=updated["Brand"],
-        price=float(updated["Price"] or 0),
-        color=updated["Color"],
-        quantity=updated["Quantity"],
-        specification=updated["Specification"],
-        warrantyPeriod=updated["WarrantyPeriod"],
-        releaseDate=updated["ReleaseDate"],
-        status=updated["Status"],
-        imageBaseUrl=get_product_image_url(updated["ProductId"]),
-    )
+    return product_out(updated)
 
 @router.put("/{product_id}/update_product_status")
-def update_product_status(product_id: str, payload: ProductStatusPayload, db: Session = Depends(get_db)):
+async def update_product_status(product_id: str, payload: ProductStatusPayload, response: Response, db: AsyncSession = Depends(get_db)):
     raw = (payload.status or "").strip().lower()
     if raw == "active": db_status = "Active"
     elif raw in ("inactive", "deactivated"): db_status = "Deactivated"
     else: raise HTTPException(status_code=400, detail="Invalid status")
     
     try:
-        res = db.execute(text("UPDATE Product SET Status=:st WHERE ProductId=:pid"), {"st": db_status, "pid": product_id})
+        res = await db.execute(text("UPDATE Product SET Status=:st WHERE ProductId=:pid"), {"st": db_status, "pid": product_id})
         if res.rowcount == 0: raise HTTPException(status_code=404, detail="Not found")
-        db.commit()
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+    product_search.set_status(product_id, db_status)
+    stick_to_primary(response)
+    await product_cache.invalidate_product(product_id)
     return {"success": True, "productId": product_id, "status": db_status}
\ No newline at end of file
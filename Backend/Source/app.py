@@ -1,14 +1,128 @@
-from pathlib import Path
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy import text
+import asyncio
+import logging
+import os
+import signal
+import threading
+import time
 
 from .api.auth import router as auth_router
+from .api import buyer_products
 from .api.buyer_products import router as buyer_products_router
 from .api.buyer_orders import router as buyer_orders_router
+from .api.buyer_cart import router as buyer_cart_router
 from .api.staff_products import router as staff_products_router
+from .api.staff_analytics import router as staff_analytics_router
+from .auth_tokens import require_role
+from .database_connection import AsyncSessionLocal
+from . import accounts, admission, auth_tokens, cart_store, database_connection, idempotency, image_index, inventory, image_pipeline, log_config, metrics, outbox, product_search, password_hashing, product_cache
+from . import order_events  # noqa: F401  registers the outbox handlers
+from .middleware import CompressionMiddleware, UploadSizeLimitMiddleware
+from .uploads import MAX_IMAGE_BYTES
 
-app = FastAPI()
+log_config.configure()
+log = logging.getLogger(__name__)
+
+# Pooled connections opened per target before serving; catalog listing preload
+WARM_POOL_CONNECTIONS = int(os.getenv("WARM_POOL_CONNECTIONS", "4"))
+WARM_CATALOG = os.getenv("WARM_CATALOG", "1") not in ("0", "false", "no")
+# After SIGTERM, /ready answers 503 for this long before the server stops
+# accepting connections, so a load balancer can take the worker out first
+DRAIN_SECONDS = float(os.getenv("DRAIN_SECONDS", "0"))
+READY_DB_TIMEOUT = 2.0
+# /metrics and the /*/stats endpoints need an admin token unless this is set
+# (for a scraper on a private network); /health and /ready are always open
+EXPOSE_INTERNAL_STATS = os.getenv("EXPOSE_INTERNAL_STATS", "0") in ("1", "true", "yes")
+STATS_DEPENDENCIES = [] if EXPOSE_INTERNAL_STATS else [Depends(require_role("admin"))]
+
+async def _build_search_index():
+    if product_search.SEARCH_BACKEND != "index":
+        return
+    # Search falls back to LIKE queries until the index is built
+    try:
+        async with AsyncSessionLocal() as db:
+            await product_search.build_index(db)
+    except Exception as e:
+        log.error(f"Search index build failed: {e}")
+
+async def _warm_catalog():
+    try:
+        async with AsyncSessionLocal() as db:
+            count = await buyer_products.warm_listing_cache(db)
+        log.info(f"Catalog cache warmed with {count} products")
+    except Exception as e:
+        log.error(f"Catalog cache warm-up failed: {e}")
+
+def _drain_on_signal(app: FastAPI):
+    # Wraps the server's own SIGTERM / SIGINT handlers: flip /ready to 503
+    # first, hand over to the server's graceful shutdown DRAIN_SECONDS later
+    if threading.current_thread() is not threading.main_thread():
+        return  # lifespan driven from a test client thread: no signals here
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+
+        def handler(signum, frame, previous=previous):
+            app.state.phase = "draining"
+            if DRAIN_SECONDS > 0:
+                loop.call_later(DRAIN_SECONDS, previous, signum, frame)
+            else:
+                previous(signum, frame)
+
+        signal.signal(sig, handler)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    image_index.IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Independent warm-ups run side by side; the server takes no requests
+    # until they are done
+    await asyncio.gather(
+        asyncio.to_thread(image_index.build_index),
+        _build_search_index(),
+        database_connection.warm_pools(WARM_POOL_CONNECTIONS),
+    )
+    if WARM_CATALOG:
+        # After the search and image indexes: listings read both
+        await _warm_catalog()
+
+    image_index.start_watcher()
+    product_search.start_index_sync()
+    auth_tokens.start_denylist_sync()
+    inventory.start_reconciler()
+    outbox.start_workers()
+    database_connection.start_replica_checks()
+    _drain_on_signal(app)
+    app.state.startup_seconds = round(time.perf_counter() - started, 3)
+    app.state.phase = "ready"
+    log.info(f"Ready in {app.state.startup_seconds:.2f}s")
+    yield
+    app.state.phase = "draining"
+    await database_connection.stop_replica_checks()
+    await outbox.stop_workers()
+    await inventory.stop_reconciler()
+    await auth_tokens.stop_denylist_sync()
+    await product_search.stop_index_sync()
+    image_index.stop_watcher()
+    image_pipeline.shutdown()
+    password_hashing.shutdown()
+    await database_connection.dispose_engines()
+
+app = FastAPI(lifespan=lifespan)
+app.state.phase = "starting"
+app.state.startup_seconds = None
+
+# Rate limits / concurrency caps for login, checkout, listings and reports.
+# Added first (innermost) so its 429 / 503 answers still get CORS headers
+app.add_middleware(admission.AdmissionMiddleware)
 
 origins = ["http://localhost:3000"]
 
@@ -18,22 +132,82 @@ app.add_middleware(
     allow_methods=["*"],  
     allow_headers=["*"],  
     allow_credentials=True,
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "Retry-After"],
 )
 
-# Static product images:
-# Backend/database/product_images/<ProductId>/*
-BASE_DIR = Path(__file__).resolve().parent  # .../Backend/Source
-images_dir = (BASE_DIR.parent / "database" / "product_images").resolve()
+# gzip/brotli for JSON responses; product images are already compressed
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+    exclude_prefixes=("/product_images",),
+)
 
-images_dir.mkdir(parents=True, exist_ok=True) 
+# Image + form fields; the image itself is checked again while it is copied
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=MAX_IMAGE_BYTES + 64 * 1024, path_prefixes=("/staff/",))
 
-if images_dir.exists():
-    app.mount("/product_images", StaticFiles(directory=str(images_dir)), name="product_images")
+# Outermost, so latency includes compression and the other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Static product images:
+# Backend/Database/product_images/<ProductId>/*
+# (created by the lifespan; no filesystem work at import)
+images_dir = image_index.IMAGE_DIR.resolve()
+
+app.mount("/product_images", StaticFiles(directory=str(images_dir), check_dir=False), name="product_images")
 
 @app.get("/health")
 def health():
+    # Liveness: the process answers
     return {"status": "ok"}
 
+@app.get("/ready")
+async def ready():
+    # Readiness: warmed up, not draining, primary database answering
+    if app.state.phase != "ready":
+        return JSONResponse({"status": app.state.phase}, status_code=503)
+    try:
+        async with AsyncSessionLocal() as db:
+            await asyncio.wait_for(db.execute(text("SELECT 1")), READY_DB_TIMEOUT)
+    except Exception as e:
+        return JSONResponse({"status": "database unavailable", "detail": str(e)}, status_code=503)
+    return {"status": "ready", "startupSeconds": app.state.startup_seconds}
+
+@app.get("/metrics", response_class=PlainTextResponse, dependencies=STATS_DEPENDENCIES)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/db/stats", dependencies=STATS_DEPENDENCIES)
+def db_stats():
+    return database_connection.pool_stats()
+
+@app.get("/cache/stats", dependencies=STATS_DEPENDENCIES)
+def cache_stats():
+    return product_cache.stats()
+
+@app.get("/cart/stats", dependencies=STATS_DEPENDENCIES)
+def cart_stats():
+    return cart_store.stats()
+
+@app.get("/inventory/stats", dependencies=STATS_DEPENDENCIES)
+def inventory_stats():
+    return inventory.stats()
+
+@app.get("/idempotency/stats", dependencies=STATS_DEPENDENCIES)
+def idempotency_stats():
+    return idempotency.stats()
+
+@app.get("/outbox/stats", dependencies=STATS_DEPENDENCIES)
+def outbox_stats():
+    return outbox.stats()
+
+@app.get("/admission/stats", dependencies=STATS_DEPENDENCIES)
+def admission_stats():
+    return admission.stats()
+
+@app.get("/auth/stats", dependencies=STATS_DEPENDENCIES)
+def auth_stats():
+    return {**auth_tokens.stats(), "unknown_accounts": accounts.stats()}
+
 # api
 app.include_router(auth_router)
 
@@ -41,4 +215,8 @@ app.include_router(buyer_products_router, prefix="/buyer/products", tags=["buyer
 
 app.include_router(buyer_orders_router, prefix="/buyer/orders", tags=["buyer-orders"])
 
-app.include_router(staff_products_router)
\ No newline at end of file
+app.include_router(buyer_cart_router, prefix="/buyer/cart", tags=["buyer-cart"])
+
+app.include_router(staff_products_router)
+
+app.include_router(staff_analytics_router)
\ No newline at end of file
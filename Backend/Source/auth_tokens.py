@@ -0,0 +1,241 @@
+# Signed JWT access / refresh tokens (python-jose).
+# Access tokens carry the user id and role, so routes authenticate with a
+# signature check instead of a database lookup. Verified claims are cached per
+# token, and revoked token ids (logout, refresh rotation) are kept in an
+# in-memory denylist until the token would have expired anyway.
+#
+# Revocations are also stored in RevokedToken. A refresh token is spent by
+# inserting its id there, so it is single use across workers and restarts.
+# Each worker pulls new rows into its denylist every DENYLIST_SYNC_SECONDS,
+# so an access token revoked on another worker stops working within that
+# time.
+
+import asyncio
+import logging
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+
+from fastapi import Depends, Header, HTTPException
+from jose import JWTError, jwt
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database_connection import AsyncSessionLocal
+from .product_cache import MISSING, LRUCache
+
+log = logging.getLogger(__name__)
+
+JWT_SECRET = os.getenv("JWT_SECRET", "")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", "900"))
+REFRESH_TOKEN_TTL = int(os.getenv("REFRESH_TOKEN_TTL", str(7 * 24 * 3600)))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+DENYLIST_SYNC_SECONDS = float(os.getenv("DENYLIST_SYNC_SECONDS", "5"))
+# Re-read window for revocations committed out of RevokedAt order
+DENYLIST_SYNC_OVERLAP = 5.0
+
+JWT_DEV_SECRET = os.getenv("JWT_DEV_SECRET", "0") in ("1", "true", "yes")
+
+if not JWT_SECRET:
+    if not JWT_DEV_SECRET:
+        raise RuntimeError("JWT_SECRET is not set (JWT_DEV_SECRET=1 allows a random per-process secret for development)")
+    # Tokens will not survive a restart or work across workers
+    JWT_SECRET = secrets.token_urlsafe(32)
+    log.warning("JWT_SECRET is not set, using a random per-process secret")
+
+# Login roles -> token role ("buyer" and "customer" are the same account table)
+TOKEN_ROLES = {"buyer": "customer", "customer": "customer", "staff": "staff", "admin": "admin"}
+
+
+@dataclass(frozen=True)
+class AuthUser:
+    id: int
+    role: str
+    username: str
+    jti: str
+    exp: int
+    type: str = "access"
+
+
+class Denylist:
+    # token id -> expiry; entries are dropped once the token is expired anyway
+
+    def __init__(self):
+        self._data: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+
+    def add(self, jti: str, exp: float):
+        with self._lock:
+            self._data[jti] = exp
+            self._prune()
+
+    def __contains__(self, jti: str) -> bool:
+        exp = self._data.get(jti)
+        return exp is not None and exp > time.time()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _prune(self):
+        now = time.time()
+        if now < self._next_prune:
+            return
+        self._data = {jti: exp for jti, exp in self._data.items() if exp > now}
+        self._next_prune = now + 60
+
+
+_claims_cache = LRUCache(AUTH_CACHE_SIZE, ACCESS_TOKEN_TTL)
+_denylist = Denylist()
+_sync_task: asyncio.Task | None = None
+_synced_until = None  # RevokedAt of the newest row pulled
+
+
+def _encode(user_id: int, role: str, username: str, token_type: str, ttl: int) -> str:
+    now = int(time.time())
+    claims = {
+        "sub": str(user_id),
+        "role": TOKEN_ROLES[role],
+        "name": username,
+        "type": token_type,
+        "jti": secrets.token_urlsafe(12),
+        "iat": now,
+        "exp": now + ttl,
+    }
+    return jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+def create_access_token(user_id: int, role: str, username: str) -> str:
+    return _encode(user_id, role, username, "access", ACCESS_TOKEN_TTL)
+
+
+def create_refresh_token(user_id: int, role: str, username: str) -> str:
+    return _encode(user_id, role, username, "refresh", REFRESH_TOKEN_TTL)
+
+
+def decode_token(token: str, token_type: str = "access") -> AuthUser:
+    user = _claims_cache.get(token)
+    if user is MISSING:
+        try:
+            claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+            user = AuthUser(
+                int(claims["sub"]), claims["role"], claims.get("name", ""), claims["jti"], int(claims["exp"]),
+                claims.get("type", ""),
+            )
+        except (JWTError, KeyError, ValueError):
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        if user.type == "access":
+            _claims_cache.set(token, user)
+
+    # Checked on every call: a cached access token must not pass as a refresh token
+    if user.type != token_type:
+        raise HTTPException(status_code=401, detail="Invalid token type")
+    # Cached entries can outlive the token by up to the cache TTL
+    if user.exp <= time.time():
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    if user.jti in _denylist:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return user
+
+
+async def revoke(db: AsyncSession, user: AuthUser) -> bool:
+    # False when the token was already revoked (by any worker)
+    _denylist.add(user.jti, user.exp)
+    res = await db.execute(
+        text("INSERT IGNORE INTO RevokedToken(Jti, ExpiresAt) VALUES (:jti, FROM_UNIXTIME(:exp))"),
+        {"jti": user.jti, "exp": user.exp},
+    )
+    await db.commit()
+    return res.rowcount == 1
+
+
+async def sync_denylist():
+    # Pull revocations made by other workers (all unexpired ones on the first call)
+    global _synced_until
+    async with AsyncSessionLocal() as db:
+        if _synced_until is None:
+            rows = (await db.execute(text(
+                "SELECT Jti, UNIX_TIMESTAMP(ExpiresAt), RevokedAt FROM RevokedToken WHERE ExpiresAt > NOW()"
+            ))).all()
+        else:
+            rows = (await db.execute(
+                text("SELECT Jti, UNIX_TIMESTAMP(ExpiresAt), RevokedAt FROM RevokedToken "
+                     "WHERE RevokedAt >= :since - INTERVAL :overlap SECOND"),
+                {"since": _synced_until, "overlap": DENYLIST_SYNC_OVERLAP},
+            )).all()
+    for jti, exp, revoked_at in rows:
+        _denylist.add(jti, float(exp))
+        if _synced_until is None or revoked_at > _synced_until:
+            _synced_until = revoked_at
+    if _synced_until is None:
+        async with AsyncSessionLocal() as db:
+            _synced_until = (await db.execute(text("SELECT NOW(3)"))).scalar()
+
+
+async def _purge_expired():
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("DELETE FROM RevokedToken WHERE ExpiresAt < NOW() LIMIT 1000"))
+        await db.commit()
+
+
+async def _sync_loop():
+    since_purge = 0.0
+    while True:
+        try:
+            await sync_denylist()
+            since_purge += DENYLIST_SYNC_SECONDS
+            if since_purge >= 3600:
+                since_purge = 0.0
+                await _purge_expired()
+        except Exception as e:
+            log.error(f"Token denylist sync error: {e}")
+        await asyncio.sleep(DENYLIST_SYNC_SECONDS)
+
+
+def start_denylist_sync():
+    global _sync_task
+    if _sync_task is None and DENYLIST_SYNC_SECONDS > 0:
+        _sync_task = asyncio.get_running_loop().create_task(_sync_loop())
+
+
+async def stop_denylist_sync():
+    global _sync_task
+    if _sync_task is not None:
+        _sync_task.cancel()
+        try:
+            await _sync_task
+        except asyncio.CancelledError:
+            pass
+        _sync_task = None
+
+
+def _bearer(authorization: str | None) -> str | None:
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token.strip()
+
+
+async def get_current_user(authorization: str | None = Header(default=None)) -> AuthUser:
+    token = _bearer(authorization)
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return decode_token(token)
+
+
+def require_role(*roles: str):
+    async def dependency(user: AuthUser = Depends(get_current_user)) -> AuthUser:
+        if user.role not in roles:
+            raise HTTPException(status_code=403, detail="Not allowed for this role")
+        return user
+    return dependency
+
+
+def stats() -> dict:
+    return {**_claims_cache.stats(), "revoked": len(_denylist)}
+
@@ -0,0 +1,268 @@
+# Bulk product import/export for the staff catalog.
+# Import: CSV or NDJSON rows (camelCase ProductCreate fields or Product column
+# names as headers/keys), validated with ProductCreate and upserted in batched
+# multi-row INSERT ... ON DUPLICATE KEY UPDATE transactions. Only the columns
+# a row actually carries are written, so a partial file (e.g. productId,
+# productName, price) updates those and leaves the other columns alone.
+# Export: streams the Product table through a server-side cursor.
+#
+# Command line:
+#   python -m Backend.Source.bulk_products import products.csv
+#   python -m Backend.Source.bulk_products export products.ndjson --format ndjson
+
+import argparse
+import asyncio
+import csv
+import functools
+import io
+import json
+import os
+import time
+from datetime import date
+from decimal import Decimal
+from typing import AsyncIterator, Iterator, TextIO
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import product_cache, product_search
+from .catalog_query import PRODUCT_COLUMNS
+from .database_connection import AsyncSessionLocal, read_session, stick_to_primary
+from .schemas.product import ProductCreate
+
+FORMATS = ("csv", "ndjson")
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+EXPORT_CHUNK_ROWS = 1000
+MAX_REPORTED_ERRORS = 1000
+
+_COLUMN_TO_FIELD = {col: field for field, col in PRODUCT_COLUMNS.items()}
+
+# Re-read after an upsert to refresh the search index, whichever columns were written
+SEARCH_ROWS_SQL = text(
+    "SELECT ProductId, ProductName, Brand, Specification, Status FROM Product WHERE ProductId IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+
+@functools.lru_cache(maxsize=64)
+def upsert_sql(columns: tuple[str, ...]):
+    # columns: Product column names present in the rows, ProductId first
+    return text(
+        f"INSERT INTO Product({', '.join(columns)}) "
+        f"VALUES ({', '.join(':' + col for col in columns)}) "
+        "ON DUPLICATE KEY UPDATE "
+        + ", ".join(f"{col}=VALUES({col})" for col in columns if col != "ProductId")
+    )
+
+
+def row_params(product: ProductCreate) -> dict:
+    # Only the fields given in the row (a header present with an empty cell
+    # counts and clears the column)
+    present = product.model_fields_set
+    return {col: getattr(product, field) for field, col in PRODUCT_COLUMNS.items() if field in present}
+
+
+def _clean(raw: dict) -> dict:
+    record = {}
+    for key, value in raw.items():
+        if key is None:
+            continue
+        key = key.strip()
+        key = _COLUMN_TO_FIELD.get(key, key)
+        if isinstance(value, str):
+            value = value.strip() or None
+        record[key] = value
+    return record
+
+
+def iter_records(f: TextIO, fmt: str) -> Iterator[tuple[int, dict | None, str | None]]:
+    # (row number, record, parse error)
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        for n, raw in enumerate(reader, start=1):
+            if None in raw:
+                yield n, None, "too many columns"
+            else:
+                yield n, _clean(raw), None
+        return
+
+    for n, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+        except ValueError as e:
+            yield n, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(raw, dict):
+            yield n, None, "expected a JSON object"
+            continue
+        yield n, _clean(raw), None
+
+
+def iter_batches(f: TextIO, fmt: str, size: int = BULK_BATCH_SIZE) -> Iterator[list]:
+    batch = []
+    for item in iter_records(f, fmt):
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _fail(report: dict, row: int, product_id: str | None, errors: list[str]):
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"row": row, "productId": product_id, "errors": errors})
+
+
+async def _upsert_batch(db: AsyncSession, batch: list, report: dict):
+    valid = []
+    for row, record, error in batch:
+        report["received"] += 1
+        if error:
+            _fail(report, row, None, [error])
+            continue
+        try:
+            product = ProductCreate(**record)
+        except ValidationError as e:
+            errors = [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+            _fail(report, row, record.get("productId"), errors)
+            continue
+        valid.append((row, row_params(product)))
+
+    if not valid:
+        return
+
+    # One multi-row statement per column set
+    groups: dict[tuple[str, ...], list[dict]] = {}
+    for _, params in valid:
+        groups.setdefault(tuple(params), []).append(params)
+
+    try:
+        for columns, rows in groups.items():
+            await db.execute(upsert_sql(columns), rows)
+        await db.commit()
+        done = [params["ProductId"] for _, params in valid]
+    except Exception:
+        # Find the offending rows: retry one by one so the rest still load
+        await db.rollback()
+        done = []
+        for row, params in valid:
+            try:
+                await db.execute(upsert_sql(tuple(params)), params)
+                await db.commit()
+                done.append(params["ProductId"])
+            except Exception as e:
+                await db.rollback()
+                _fail(report, row, params["ProductId"], [str(getattr(e, "orig", None) or e)])
+
+    report["upserted"] += len(done)
+    if done:
+        for r in (await db.execute(SEARCH_ROWS_SQL, {"ids": done})).mappings():
+            product_search.index_product(r)
+        stick_to_primary()
+        await product_cache.invalidate_products(done)
+
+
+async def import_products(db: AsyncSession, f: TextIO, fmt: str, batch_size: int = BULK_BATCH_SIZE) -> dict:
+    # Parsing is blocking (csv module, file reads), so each batch is pulled in the threadpool
+    report = {"received": 0, "upserted": 0, "failed": 0, "errors": []}
+    batches = iter_batches(f, fmt, batch_size)
+    while True:
+        batch = await run_in_threadpool(next, batches, None)
+        if batch is None:
+            break
+        await _upsert_batch(db, batch, report)
+    return report
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+async def export_products(fmt: str, primary: bool = False) -> AsyncIterator[str]:
+    # Opens its own session: the generator outlives the request handler
+    fields = list(PRODUCT_COLUMNS)
+    async with read_session(primary) as db:
+        result = await db.stream(text(f"SELECT {', '.join(PRODUCT_COLUMNS.values())} FROM Product ORDER BY ProductId"))
+
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if fmt == "csv":
+            writer.writerow(fields)
+
+        async for rows in result.mappings().partitions(EXPORT_CHUNK_ROWS):
+            for r in rows:
+                if fmt == "csv":
+                    writer.writerow([_json_value(r[col]) for col in PRODUCT_COLUMNS.values()])
+                else:
+                    record = {field: _json_value(r[col]) for field, col in PRODUCT_COLUMNS.items()}
+                    buf.write(json.dumps(record, ensure_ascii=False) + "\n")
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+        if buf.tell():
+            yield buf.getvalue()
+
+
+def _format_for(path: str, fmt: str | None) -> str:
+    if fmt:
+        return fmt
+    return "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+
+
+async def _cli_import(path: str, fmt: str, batch_size: int):
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            report = await import_products(db, f, fmt, batch_size)
+    elapsed = time.perf_counter() - started
+
+    for err in report["errors"]:
+        print(f"row {err['row']} ({err['productId']}): {'; '.join(err['errors'])}")
+    print(f"{report['upserted']} upserted, {report['failed']} failed of {report['received']} rows "
+          f"in {elapsed:.1f}s ({report['received'] / elapsed:.0f} rows/s)")
+
+
+async def _cli_export(path: str, fmt: str):
+    started = time.perf_counter()
+    rows = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        async for chunk in export_products(fmt):
+            f.write(chunk)
+            rows += chunk.count("\n")
+    if fmt == "csv":
+        rows -= 1  # header
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {rows} rows to {path} in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk product import/export")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="upsert products from a CSV/NDJSON file")
+    p.add_argument("path")
+    p.add_argument("--format", choices=FORMATS)
+    p.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+    p = sub.add_parser("export", help="write all products to a CSV/NDJSON file")
+    p.add_argument("path")
+    p.add_argument("--format", choices=FORMATS)
+    args = parser.parse_args()
+
+    fmt = _format_for(args.path, args.format)
+    if args.command == "import":
+        asyncio.run(_cli_import(args.path, fmt, args.batch_size))
+    else:
+        asyncio.run(_cli_export(args.path, fmt))
+
+
+if __name__ == "__main__":
+    main()
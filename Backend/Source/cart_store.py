@@ -0,0 +1,174 @@
+# Server-side cart backed by the Cart / CartContainsProduct tables.
+#
+# - Adds, quantity changes and removes take one statement for any number of
+#   items and are committed before the request returns.
+# - Every change also bumps Cart.Version in the same transaction. Cart
+#   summaries (lines and totals) are cached per cart under that version and
+#   the catalog version, so a change made through any worker (or a checkout)
+#   retires them, and product price / status changes retire them like
+#   catalog listings.
+
+import os
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import product_cache
+from .product_cache import MISSING, LRUCache
+
+CART_CACHE_SIZE = int(os.getenv("CART_CACHE_SIZE", "4096"))
+
+# Orders above this subtotal get DISCOUNT_AMOUNT off
+DISCOUNT_THRESHOLD = 1000.0
+DISCOUNT_AMOUNT = 50.0
+
+ADD_SQL = text(
+    "INSERT INTO CartContainsProduct(ProductId, CustomerId, CartId, Quantity) VALUES (:pid, :cid, :cartid, :q) "
+    "ON DUPLICATE KEY UPDATE Quantity = Quantity + VALUES(Quantity)"
+)
+SET_SQL = text(
+    "INSERT INTO CartContainsProduct(ProductId, CustomerId, CartId, Quantity) VALUES (:pid, :cid, :cartid, :q) "
+    "ON DUPLICATE KEY UPDATE Quantity = VALUES(Quantity)"
+)
+REMOVE_SQL = text(
+    "DELETE FROM CartContainsProduct WHERE CartId=:cartid AND ProductId IN :pids"
+).bindparams(bindparam("pids", expanding=True))
+BUMP_SQL = text("UPDATE Cart SET Version = Version + 1 WHERE CartId=:cartid")
+
+_cart_ids = LRUCache(CART_CACHE_SIZE, 24 * 3600)  # customer id -> cart id, never changes
+_summaries = LRUCache(CART_CACHE_SIZE, product_cache.PRODUCT_CACHE_TTL)  # cart id -> (versions, summary)
+
+
+def discount_for(subtotal: float) -> float:
+    return DISCOUNT_AMOUNT if subtotal > DISCOUNT_THRESHOLD else 0.0
+
+
+async def get_or_create_cart(db: AsyncSession, customer_id: int) -> int:
+    # Does not commit: checkout calls this inside its own transaction
+    cart_id = _cart_ids.get(customer_id)
+    if cart_id is not MISSING:
+        return cart_id
+
+    row = (await db.execute(text("SELECT CartId FROM Cart WHERE CustomerId=:cid ORDER BY CartId LIMIT 1"), {"cid": customer_id})).mappings().first()
+    if row:
+        cart_id = int(row["CartId"])
+        _cart_ids.set(customer_id, cart_id)
+        return cart_id
+    res = await db.execute(text("INSERT INTO Cart(CustomerId) VALUES (:cid)"), {"cid": customer_id})
+    # Cached once the caller's transaction is known to have committed
+    return int(res.lastrowid)
+
+
+def remember_cart(customer_id: int, cart_id: int):
+    _cart_ids.set(customer_id, cart_id)
+
+
+def invalidate(cart_id: int):
+    # Local shortcut; other workers see the bumped Cart.Version
+    _summaries.delete(cart_id)
+
+
+async def bump_version(db: AsyncSession, cart_id: int):
+    # Inside the transaction that changes the cart's lines
+    await db.execute(BUMP_SQL, {"cartid": cart_id})
+
+
+async def add_items(db: AsyncSession, cart_id: int, customer_id: int, quantities: dict[str, int]):
+    await db.execute(ADD_SQL, [
+        {"pid": pid, "cid": customer_id, "cartid": cart_id, "q": q} for pid, q in quantities.items()
+    ])
+    await bump_version(db, cart_id)
+    await db.commit()
+    invalidate(cart_id)
+
+
+async def set_items(db: AsyncSession, cart_id: int, customer_id: int, quantities: dict[str, int]):
+    # Absolute quantities; 0 removes the line
+    upserts = [{"pid": pid, "cid": customer_id, "cartid": cart_id, "q": q} for pid, q in quantities.items() if q > 0]
+    removed = [pid for pid, q in quantities.items() if q <= 0]
+    if upserts:
+        await db.execute(SET_SQL, upserts)
+    if removed:
+        await db.execute(REMOVE_SQL, {"cartid": cart_id, "pids": removed})
+    await bump_version(db, cart_id)
+    await db.commit()
+    invalidate(cart_id)
+
+
+async def remove_items(db: AsyncSession, cart_id: int, product_ids: list[str]):
+    await db.execute(REMOVE_SQL, {"cartid": cart_id, "pids": product_ids})
+    await bump_version(db, cart_id)
+    await db.commit()
+    invalidate(cart_id)
+
+
+async def clear(db: AsyncSession, cart_id: int):
+    await db.execute(text("DELETE FROM CartContainsProduct WHERE CartId=:cartid"), {"cartid": cart_id})
+    await bump_version(db, cart_id)
+    await db.commit()
+    invalidate(cart_id)
+
+
+async def load_quantities(db: AsyncSession, cart_id: int) -> dict[str, int]:
+    rows = (await db.execute(
+        text("SELECT ProductId, Quantity FROM CartContainsProduct WHERE CartId=:cartid AND Quantity > 0"),
+        {"cartid": cart_id},
+    )).mappings().all()
+    return {r["ProductId"]: int(r["Quantity"]) for r in rows}
+
+
+async def summary(db: AsyncSession, cart_id: int) -> dict:
+    # A primary-key read of the cart version instead of the join below
+    cart_version = (await db.execute(text("SELECT Version FROM Cart WHERE CartId=:cartid"), {"cartid": cart_id})).scalar()
+    catalog_version = await product_cache.catalog_version()
+    versions = (cart_version, catalog_version)
+    cached = _summaries.get(cart_id)
+    if cached is not MISSING and catalog_version is not None and cached[0] == versions:
+        return cached[1]
+
+    rows = (await db.execute(
+        text("""
+            SELECT c.ProductId, c.Quantity, p.ProductName, p.Price, p.Status, p.Quantity AS Stock
+            FROM CartContainsProduct c
+            JOIN Product p ON p.ProductId = c.ProductId
+            WHERE c.CartId=:cartid AND c.Quantity > 0
+            ORDER BY c.ProductId
+        """),
+        {"cartid": cart_id},
+    )).mappings().all()
+
+    items = []
+    subtotal = 0.0
+    for r in rows:
+        qty = int(r["Quantity"])
+        unit_price = float(r["Price"] or 0)
+        available = r["Status"] == "Active" and int(r["Stock"] or 0) >= qty
+        if available:
+            subtotal += unit_price * qty
+        items.append({
+            "productId": r["ProductId"],
+            "productName": r["ProductName"],
+            "unitPrice": unit_price,
+            "quantity": qty,
+            "lineTotal": unit_price * qty,
+            "available": available,
+        })
+
+    discount = discount_for(subtotal)
+    result = {
+        "cartId": cart_id,
+        "items": items,
+        "itemCount": sum(i["quantity"] for i in items),
+        "subtotal": subtotal,
+        "discount": discount,
+        "total": subtotal - discount,
+    }
+    # Rows read after the version: a concurrent change only makes the entry unused
+    if catalog_version is not None:
+        _summaries.set(cart_id, (versions, result))
+    return result
+
+
+def stats() -> dict:
+    return {"summaries": _summaries.stats()}
+
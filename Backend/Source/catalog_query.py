@@ -0,0 +1,129 @@
+# Helpers shared by the buyer and staff product listings:
+# field projection (?fields=) and opaque keyset cursors (?cursor=).
+
+import base64
+import json
+from datetime import date
+
+from fastapi import HTTPException
+
+from .image_index import get_product_image_url, get_product_image_variants
+from .schemas.product import ProductOut
+
+MAX_PAGE_SIZE = 200
+
+PRODUCT_COLUMNS = {
+    "productId": "ProductId",
+    "productName": "ProductName",
+    "brand": "Brand",
+    "price": "Price",
+    "color": "Color",
+    "quantity": "Quantity",
+    "specification": "Specification",
+    "warrantyPeriod": "WarrantyPeriod",
+    "releaseDate": "ReleaseDate",
+    "status": "Status",
+}
+PRODUCT_FIELDS = list(PRODUCT_COLUMNS) + ["imageBaseUrl", "imageUrls"]
+
+# Always returned, whatever ?fields= asks for
+BASE_FIELDS = ("productId", "productName")
+
+
+def parse_fields(fields: str | None) -> list[str] | None:
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in PRODUCT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def select_columns(fields: list[str] | None, extra: tuple[str, ...] = ()) -> str:
+    # extra: columns needed for ordering / cursors even if not returned
+    if fields is None:
+        cols = list(PRODUCT_COLUMNS.values())
+    else:
+        cols = [PRODUCT_COLUMNS[f] for f in (*BASE_FIELDS, *fields) if f in PRODUCT_COLUMNS]
+    return ", ".join(dict.fromkeys([*cols, *extra]))
+
+
+def product_dict(r, fields: list[str] | None = None) -> dict:
+    # Product row -> ProductOut-shaped dict, without building a model
+    # (used as is by the streamed listings, see json_stream)
+    wanted = PRODUCT_FIELDS if fields is None else {*BASE_FIELDS, *fields}
+
+    data = {key: r[col] for key, col in PRODUCT_COLUMNS.items() if key in wanted}
+    if data.get("price") is not None:
+        data["price"] = float(data["price"])
+    if "imageBaseUrl" in wanted:
+        data["imageBaseUrl"] = get_product_image_url(r["ProductId"])
+    if "imageUrls" in wanted:
+        data["imageUrls"] = get_product_image_variants(r["ProductId"])
+    return data
+
+
+def product_out(r, fields: list[str] | None = None) -> ProductOut:
+    return ProductOut(**product_dict(r, fields))
+
+
+def encode_cursor(values: dict) -> str:
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, dict):
+            raise ValueError(cursor)
+        return values
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def release_cursor(r) -> str:
+    return encode_cursor({"d": r["ReleaseDate"], "n": r["ProductName"], "id": r["ProductId"]})
+
+
+def release_keyset(cursor: dict, params: dict) -> str:
+    # Rows after the cursor in ORDER BY ReleaseDate DESC, ProductName ASC, ProductId ASC.
+    # MySQL sorts NULL dates last in DESC order.
+    params["c_name"] = cursor.get("n")
+    params["c_id"] = cursor.get("id")
+    after_name = "(ProductName > :c_name OR (ProductName = :c_name AND ProductId > :c_id))"
+
+    if cursor.get("d") is None:
+        return f"(ReleaseDate IS NULL AND {after_name})"
+
+    try:
+        params["c_date"] = date.fromisoformat(cursor["d"])
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return f"(ReleaseDate < :c_date OR ReleaseDate IS NULL OR (ReleaseDate = :c_date AND {after_name}))"
+
+
+def name_cursor(r) -> str:
+    return encode_cursor({"n": r["ProductName"], "id": r["ProductId"]})
+
+
+def name_keyset(cursor: dict, params: dict) -> str:
+    # Rows after the cursor in ORDER BY ProductName ASC, ProductId ASC
+    params["c_name"] = cursor.get("n")
+    params["c_id"] = cursor.get("id")
+    return "(ProductName, ProductId) > (:c_name, :c_id)"
+
+
+def offset_cursor(offset: int) -> str:
+    return encode_cursor({"o": offset})
+
+
+def cursor_offset(cursor: dict | None) -> int:
+    if not cursor:
+        return 0
+    try:
+        return max(int(cursor.get("o", 0)), 0)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
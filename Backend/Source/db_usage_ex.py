@@ -1,27 +1,26 @@
 # Example file to print all customer
 # This file is for checking connection only
+#   python -m Backend.Source.db_usage_ex
 
+import asyncio
 import json
 from sqlalchemy import text
 
-from database_connection import SessionLocal  # uses your existing DB connection
+from .database_connection import AsyncSessionLocal  # uses your existing DB connection
 
 
-def main():
+async def main():
     # Create a new DB session
-    db = SessionLocal()
-    try:
-        # Query all rows from the "customer" table
-        result = db.execute(text("SELECT * FROM customer"))
+    async with AsyncSessionLocal() as db:
+        # Query all rows from the "Customer" table
+        result = await db.execute(text("SELECT * FROM Customer"))
 
         # Convert result rows to a list of dicts
         rows = result.mappings().all()
 
         # Dump as JSON (pretty printed, UTF-8 safe)
-        print(json.dumps(list(rows), ensure_ascii=False, default=str, indent=2))
-    finally:
-        db.close()
+        print(json.dumps([dict(r) for r in rows], ensure_ascii=False, default=str, indent=2))
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+# Conditional GET support for catalog endpoints.
+# ETags are derived from the catalog version, MAX(Product.UpdatedAt), so
+# every worker and every restart hands out the same tag for the same data
+# and a matching If-None-Match is answered with 304 before loading or
+# serializing anything. Each worker reuses the version it last read for
+# CATALOG_VERSION_TTL seconds, until a product write it sees (see
+# product_cache.invalidate_products) makes it read the version again.
+#
+# The tags are strong. CompressionMiddleware appends the content coding
+# ("-gzip", "-br") to the tag of a compressed body, and etag_matches ignores
+# that suffix.
+
+import hashlib
+import json
+import os
+import time
+
+from fastapi import Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import product_cache
+
+CATALOG_VERSION_TTL = float(os.getenv("CATALOG_VERSION_TTL", "1"))
+CODINGS = ("gzip", "br")
+
+# (product_cache generation, expires at, version)
+_version: tuple | None = None
+
+
+async def catalog_version(db: AsyncSession) -> str | None:
+    # None when the shared cache store is unreachable: no ETag, no caching
+    global _version
+    generation = await product_cache.catalog_version()
+    if generation is None:
+        return None
+    now = time.monotonic()
+    if _version and _version[0] == generation and now < _version[1]:
+        return _version[2]
+    updated = (await db.execute(text("SELECT MAX(UpdatedAt) FROM Product"))).scalar()
+    version = f"{updated:%Y%m%d%H%M%S%f}" if updated else "0"
+    _version = (generation, now + CATALOG_VERSION_TTL, version)
+    return version
+
+
+async def touch_product(db: AsyncSession, product_id: str):
+    # For changes that live on disk (images): move UpdatedAt, and with it the catalog version
+    await db.execute(text("UPDATE Product SET UpdatedAt=CURRENT_TIMESTAMP(6) WHERE ProductId=:pid"), {"pid": product_id})
+
+
+def make_etag(version: str, *parts) -> str:
+    digest = hashlib.sha1(json.dumps(parts, default=str, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+def _opaque(tag: str) -> str:
+    # If-None-Match uses weak comparison, so ignore W/ prefixes and the content coding
+    tag = tag.strip().removeprefix("W/")
+    for coding in CODINGS:
+        if tag.endswith(f'-{coding}"'):
+            return tag[:-len(coding) - 2] + '"'
+    return tag
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        if tag.strip() == "*" or _opaque(tag) == etag:
+            return True
+    return False
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+
+
+def not_modified(etag: str, if_none_match: str | None = None) -> Response:
+    # Echo the client's tag: it carries the content coding the body was sent with
+    for tag in (if_none_match or "").split(","):
+        if _opaque(tag) == etag:
+            etag = tag.strip()
+            break
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
@@ -0,0 +1,198 @@
+# Idempotency-Key support for checkout.
+# The first request with a key runs; its response is saved in the
+# IdempotencyKey table inside the checkout transaction, so an order and its
+# stored response commit together. Duplicates:
+#   - in the same worker, while the first is running: wait for its result
+#   - in another worker: poll the table until the first one finishes
+#   - afterwards: get the saved response (in-memory LRU, then the table)
+#     without touching Product
+# A key reused with a different request body is rejected with 422. Failed
+# requests release their key so the client can retry.
+#
+# Every attempt that runs the request gets an owner token. A takeover after
+# IDEMPOTENCY_WAIT hands the key to a new token, and save() only succeeds for
+# the current owner, so a slow first attempt that finishes after being taken
+# over rolls back instead of placing a second order.
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import secrets
+import time
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database_connection import AsyncSessionLocal
+from .product_cache import MISSING, LRUCache
+
+log = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+# How long a duplicate waits for another worker; an InFlight row older than
+# this is taken over (its worker is assumed dead)
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "30"))
+POLL_SECONDS = 0.05
+CLEANUP_EVERY = 1000
+MAX_KEY_LENGTH = 100
+
+_results = LRUCache(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL)  # (customer, key) -> (hash, response)
+_inflight: dict[tuple[int, str], asyncio.Future] = {}
+_counters = {"executed": 0, "replayed": 0, "waited": 0, "polled": 0, "lost": 0}
+_claims = 0
+
+
+def request_hash(body: dict) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _check_hash(stored: str, expected: str):
+    if stored != expected:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+
+
+async def _cleanup(db: AsyncSession):
+    await db.execute(
+        text("DELETE FROM IdempotencyKey WHERE CreatedAt < NOW() - INTERVAL :ttl SECOND LIMIT 1000"),
+        {"ttl": IDEMPOTENCY_TTL},
+    )
+
+
+async def _claim(customer_id: int, key: str, req_hash: str) -> tuple[str | None, dict | None]:
+    # (owner token, None): this request owns the key and must run.
+    # (None, response): the saved response.
+    global _claims
+    owner = secrets.token_urlsafe(16)
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT
+    async with AsyncSessionLocal() as db:
+        while True:
+            try:
+                await db.execute(
+                    text("INSERT INTO IdempotencyKey(CustomerId, IdemKey, RequestHash, Owner) VALUES (:cid, :k, :h, :o)"),
+                    {"cid": customer_id, "k": key, "h": req_hash, "o": owner},
+                )
+                _claims += 1
+                if _claims % CLEANUP_EVERY == 0:
+                    await _cleanup(db)
+                await db.commit()
+                return owner, None
+            except IntegrityError:
+                await db.rollback()
+
+            row = (await db.execute(
+                text("SELECT RequestHash, Status, Response FROM IdempotencyKey WHERE CustomerId=:cid AND IdemKey=:k"),
+                {"cid": customer_id, "k": key},
+            )).mappings().first()
+            await db.commit()  # next read sees a fresh snapshot
+            if row is None:
+                continue  # released by a failed attempt, try to claim it again
+            _check_hash(row["RequestHash"], req_hash)
+            if row["Status"] == "Done":
+                return None, json.loads(row["Response"])
+
+            if time.monotonic() >= deadline:
+                # Owner gave no answer in time: take the key over. Waits for
+                # the owner's transaction if it is saving right now.
+                res = await db.execute(
+                    text("""
+                        UPDATE IdempotencyKey SET Owner=:o, CreatedAt=NOW()
+                        WHERE CustomerId=:cid AND IdemKey=:k AND Status='InFlight'
+                          AND CreatedAt < NOW() - INTERVAL :wait SECOND
+                    """),
+                    {"o": owner, "cid": customer_id, "k": key, "wait": int(IDEMPOTENCY_WAIT)},
+                )
+                await db.commit()
+                if res.rowcount:
+                    return owner, None
+                # Finished meanwhile, or taken over by someone else: read it again
+                deadline = time.monotonic() + IDEMPOTENCY_WAIT
+            _counters["polled"] += 1
+            await asyncio.sleep(POLL_SECONDS)
+
+
+async def _release(customer_id: int, key: str, owner: str):
+    # Only while still the owner: a taken-over key belongs to the new attempt
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                text("DELETE FROM IdempotencyKey WHERE CustomerId=:cid AND IdemKey=:k AND Owner=:o AND Status='InFlight'"),
+                {"cid": customer_id, "k": key, "o": owner},
+            )
+            await db.commit()
+    except Exception as e:
+        # The row is taken over after IDEMPOTENCY_WAIT
+        log.warning(f"Idempotency release error: {e}")
+
+
+async def save(db: AsyncSession, customer_id: int, key: str, owner: str, response: dict):
+    # Inside the caller's transaction, so the result commits with the work.
+    # Raises (the caller must roll back) when the key was taken over.
+    res = await db.execute(
+        text("""
+            UPDATE IdempotencyKey SET Status='Done', Response=:r
+            WHERE CustomerId=:cid AND IdemKey=:k AND Owner=:o AND Status='InFlight'
+        """),
+        {"r": json.dumps(response, default=str), "cid": customer_id, "k": key, "o": owner},
+    )
+    if res.rowcount == 0:
+        _counters["lost"] += 1
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key was taken over by a retry")
+
+
+async def run(customer_id: int, key: str, body: dict, execute: Callable[[str], Awaitable[dict]]) -> dict:
+    # execute(owner) must call save() with that owner token in its
+    # transaction and return the response
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+    scope = (customer_id, key)
+    req_hash = request_hash(body)
+
+    cached = _results.get(scope)
+    if cached is not MISSING:
+        _check_hash(cached[0], req_hash)
+        _counters["replayed"] += 1
+        return cached[1]
+
+    running = _inflight.get(scope)
+    if running is not None:
+        _counters["waited"] += 1
+        await asyncio.wait([running])
+        if running.cancelled():
+            # The first attempt failed and released the key: try again ourselves
+            return await run(customer_id, key, body, execute)
+        cached_hash, response = running.result()
+        _check_hash(cached_hash, req_hash)
+        return response
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[scope] = future
+    try:
+        owner, response = await _claim(customer_id, key, req_hash)
+        if owner is None:
+            _counters["replayed"] += 1
+        else:
+            try:
+                response = await execute(owner)
+            except BaseException:
+                await _release(customer_id, key, owner)
+                raise
+            _counters["executed"] += 1
+        _results.set(scope, (req_hash, response))
+        future.set_result((req_hash, response))
+        return response
+    except BaseException:
+        future.cancel()
+        raise
+    finally:
+        _inflight.pop(scope, None)
+
+
+def stats() -> dict:
+    return {**_counters, "inflight": len(_inflight), "cached": _results.stats()["size"]}
+
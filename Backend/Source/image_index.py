@@ -0,0 +1,236 @@
+# In-memory index of product image URLs.
+# The index is built once at startup by scanning product_images, so listing
+# endpoints can resolve imageBaseUrl with a dict lookup instead of stat calls.
+#
+# A replaced original (1.jpg -> 1.png) is not deleted by the upload: other
+# worker processes may still hand out its URL until they rescan. The newest
+# 1.* wins, and older ones are removed by a rescan once they have been
+# superseded for REPLACED_IMAGE_GRACE seconds.
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+# <PRODUCT_IMAGE_DIR>/<ProductId>/*, Backend/Database/product_images by default
+IMAGE_DIR = Path(os.getenv("PRODUCT_IMAGE_DIR") or Path(__file__).resolve().parent.parent / "Database" / "product_images")
+
+IMAGE_EXTS = [".jpg", ".png", ".jpeg", ".webp"]
+
+REPLACED_IMAGE_GRACE = float(os.getenv("REPLACED_IMAGE_GRACE", "600"))
+
+# Written by image_pipeline next to the original: per-size derivative URLs
+MANIFEST_NAME = "manifest.json"
+
+_index: dict[str, str] = {}
+_variants: dict[str, dict] = {}
+_built = False
+_lock = threading.Lock()
+
+_watcher: Optional[threading.Thread] = None
+_watcher_stop = threading.Event()
+
+
+def _mtime(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return -1
+
+
+def _originals(product_id: str, folder_names: set[str]) -> list[str]:
+    # <pid>/1.<ext> files, newest first (ties in IMAGE_EXTS order)
+    names = [f"1{ext}" for ext in IMAGE_EXTS if f"1{ext}" in folder_names]
+    if len(names) > 1:
+        names.sort(key=lambda name: -_mtime(IMAGE_DIR / product_id / name))
+    return names
+
+
+def _pick_url(product_id: str, folder_names: set[str], root_names: set[str]) -> Optional[str]:
+    # Same lookup order as the old per-request probing:
+    # <pid>/1.<ext>, <pid>/<pid>.<ext>, then <pid>.<ext> at the root
+    originals = _originals(product_id, folder_names)
+    if originals:
+        return f"/product_images/{product_id}/{originals[0]}"
+    for ext in IMAGE_EXTS:
+        if f"{product_id}{ext}" in folder_names:
+            return f"/product_images/{product_id}/{product_id}{ext}"
+
+    for ext in IMAGE_EXTS:
+        if f"{product_id}{ext}" in root_names:
+            return f"/product_images/{product_id}{ext}"
+
+    return None
+
+
+def _list_names(folder: Path) -> set[str]:
+    try:
+        return set(os.listdir(folder))
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
+
+
+def _load_variants(product_id: str, url: str | None, folder_names: set[str]) -> dict | None:
+    # Derivatives only count while they were made from the current original
+    if not url or MANIFEST_NAME not in folder_names:
+        return None
+    try:
+        with open(IMAGE_DIR / product_id / MANIFEST_NAME, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("source") != url:
+        return None
+    try:
+        if image_path(url).stat().st_mtime_ns != manifest.get("sourceMtime"):
+            return None
+    except OSError:
+        return None
+    return manifest.get("images") or None
+
+
+def _scan() -> tuple[dict[str, str], dict[str, dict]]:
+    folders: dict[str, set[str]] = {}
+    root_names: set[str] = set()
+
+    try:
+        entries = list(os.scandir(IMAGE_DIR))
+    except FileNotFoundError:
+        return {}, {}
+
+    for entry in entries:
+        if entry.is_dir():
+            folders[entry.name] = _list_names(Path(entry.path))
+        else:
+            root_names.add(entry.name)
+
+    product_ids = set(folders)
+    for name in root_names:
+        stem, ext = os.path.splitext(name)
+        if ext in IMAGE_EXTS:
+            product_ids.add(stem)
+
+    index = {}
+    variants = {}
+    for pid in product_ids:
+        names = folders.get(pid, set())
+        names -= _prune_replaced(pid, names)
+        url = _pick_url(pid, names, root_names)
+        if url:
+            index[pid] = url
+            found = _load_variants(pid, url, names)
+            if found:
+                variants[pid] = found
+    return index, variants
+
+
+def _prune_replaced(product_id: str, folder_names: set[str]) -> set[str]:
+    # Delete originals superseded for longer than REPLACED_IMAGE_GRACE;
+    # returns the removed names
+    originals = _originals(product_id, folder_names)
+    if len(originals) < 2:
+        return set()
+    replaced_at = _mtime(IMAGE_DIR / product_id / originals[0]) / 1e9
+    if time.time() - replaced_at < REPLACED_IMAGE_GRACE:
+        return set()
+
+    removed = set()
+    for name in originals[1:]:
+        try:
+            (IMAGE_DIR / product_id / name).unlink()
+            removed.add(name)
+        except FileNotFoundError:
+            removed.add(name)
+        except OSError as e:
+            log.warning(f"Could not remove replaced image {product_id}/{name}: {e}")
+    return removed
+
+
+def build_index() -> int:
+    global _index, _variants, _built
+    index, variants = _scan()
+    with _lock:
+        _index = index
+        _variants = variants
+        _built = True
+    return len(index)
+
+
+def refresh_product(product_id: str) -> Optional[str]:
+    # Re-probe a single product after its image was written or deleted
+    root_names = {f"{product_id}{ext}" for ext in IMAGE_EXTS if (IMAGE_DIR / f"{product_id}{ext}").exists()}
+    folder_names = _list_names(IMAGE_DIR / product_id)
+    url = _pick_url(product_id, folder_names, root_names)
+    found = _load_variants(product_id, url, folder_names)
+
+    with _lock:
+        if url:
+            _index[product_id] = url
+        else:
+            _index.pop(product_id, None)
+        if found:
+            _variants[product_id] = found
+        else:
+            _variants.pop(product_id, None)
+    return url
+
+
+def set_product_image(product_id: str, url: str):
+    # Point readers at a new original right away
+    with _lock:
+        _index[product_id] = url
+        _variants.pop(product_id, None)
+
+
+def get_product_image_url(product_id: str) -> Optional[str]:
+    if not _built:
+        build_index()
+    return _index.get(product_id)
+
+
+def get_product_image_variants(product_id: str) -> dict | None:
+    # {"thumb": {"webp": url, "avif": url, "jpg": url}, "medium": {...}}
+    if not _built:
+        build_index()
+    return _variants.get(product_id)
+
+
+def image_path(url: str) -> Path:
+    # /product_images/<rel> -> file on disk
+    return IMAGE_DIR / url.removeprefix("/product_images/")
+
+
+def _watch(interval: float):
+    while not _watcher_stop.wait(interval):
+        try:
+            build_index()
+        except OSError as e:
+            log.error(f"Image index rescan error: {e}")
+
+
+def start_watcher(interval: float | None = None):
+    # Optional polling rescan for images added outside the staff API.
+    # Enabled with IMAGE_INDEX_POLL_SECONDS=<seconds>
+    global _watcher
+    if interval is None:
+        interval = float(os.getenv("IMAGE_INDEX_POLL_SECONDS", "0") or 0)
+    if interval <= 0 or _watcher is not None:
+        return
+
+    _watcher_stop.clear()
+    _watcher = threading.Thread(target=_watch, args=(interval,), name="image-index-watcher", daemon=True)
+    _watcher.start()
+
+
+def stop_watcher():
+    global _watcher
+    if _watcher is None:
+        return
+    _watcher_stop.set()
+    _watcher.join(timeout=5)
+    _watcher = None
@@ -0,0 +1,221 @@
+# Image derivative pipeline.
+# After an upload, a background worker resizes the original into fixed-size
+# thumbnails and re-encodes them as WebP/AVIF (plus a JPEG fallback), then
+# writes <ProductId>/manifest.json which image_index exposes as imageUrls.
+#
+# Backfill existing folders:
+#   python -m Backend.Source.image_pipeline backfill [--force] [product_id ...]
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import http_cache, image_index, product_cache
+from .database_connection import AsyncSessionLocal
+from .image_index import IMAGE_DIR, MANIFEST_NAME
+
+log = logging.getLogger(__name__)
+
+_PIL_MISSING = object()
+_pil_module = None
+
+# name -> bounding box (px); the image is scaled to fit, keeping its aspect ratio
+SIZES = {
+    "thumb": (320, 320),
+    "medium": (800, 800),
+}
+QUALITY = {"webp": 80, "avif": 55, "jpg": 82}
+DERIVED_DIR = "derived"
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+_executor: ThreadPoolExecutor | None = None
+_pending: set[str] = set()
+_pending_lock = threading.Lock()
+# A new upload can be queued while the previous job for the product still runs
+_product_locks: dict[str, threading.Lock] = {}
+
+
+def _pil():
+    # Pillow is imported on first use rather than at startup (it is slow to
+    # import and only needed once an image is processed); None when missing
+    global _pil_module
+    if _pil_module is None:
+        try:
+            import PIL.features
+            import PIL.Image
+            import PIL.ImageOps
+            _pil_module = PIL
+        except ImportError:  # optional dependency: pip install pillow
+            _pil_module = _PIL_MISSING
+    return None if _pil_module is _PIL_MISSING else _pil_module
+
+
+def available_formats() -> list[str]:
+    pil = _pil()
+    if pil is None:
+        return []
+    formats = []
+    if pil.features.check("webp"):
+        formats.append("webp")
+    if pil.features.check("avif"):
+        formats.append("avif")
+    return formats + ["jpg"]
+
+
+def _save(img, path, fmt: str):
+    tmp = path.with_name(path.name + ".tmp")
+    if fmt == "jpg":
+        img.convert("RGB").save(tmp, "JPEG", quality=QUALITY["jpg"], optimize=True, progressive=True)
+    else:
+        img.save(tmp, fmt.upper(), quality=QUALITY[fmt])
+    os.replace(tmp, path)
+
+
+def process_product(product_id: str, force: bool = False) -> dict | None:
+    # Blocking; runs in the worker pool or from the backfill command
+    pil = _pil()
+    if pil is None:
+        return None
+
+    image_index.refresh_product(product_id)
+    source_url = image_index.get_product_image_url(product_id)
+    if not source_url:
+        return None
+    if not force and image_index.get_product_image_variants(product_id):
+        return None
+
+    source = image_index.image_path(source_url)
+    source_mtime = source.stat().st_mtime_ns
+    out_dir = IMAGE_DIR / product_id / DERIVED_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    images = {}
+    with pil.Image.open(source) as original:
+        original = pil.ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "RGBA"):
+            has_alpha = original.mode in ("LA", "PA") or "transparency" in original.info
+            original = original.convert("RGBA" if has_alpha else "RGB")
+
+        for size, box in SIZES.items():
+            resized = original.copy()
+            resized.thumbnail(box, pil.Image.LANCZOS)
+            images[size] = {}
+            for fmt in available_formats():
+                path = out_dir / f"{size}.{fmt}"
+                _save(resized, path, fmt)
+                images[size][fmt] = f"/product_images/{product_id}/{DERIVED_DIR}/{path.name}"
+
+    manifest = {"source": source_url, "sourceMtime": source_mtime, "images": images}
+    manifest_path = IMAGE_DIR / product_id / MANIFEST_NAME
+    tmp = manifest_path.with_name(MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path)
+
+    image_index.refresh_product(product_id)
+    return manifest
+
+
+def _run(product_id: str, loop: asyncio.AbstractEventLoop | None):
+    with _pending_lock:
+        _pending.discard(product_id)
+        lock = _product_locks.setdefault(product_id, threading.Lock())
+    try:
+        with lock:
+            manifest = process_product(product_id, force=True)
+    except Exception as e:
+        log.error(f"Image pipeline error for {product_id}: {e}")
+        return
+
+    if manifest and loop is not None and not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(_derivatives_ready(product_id), loop)
+
+
+async def _derivatives_ready(product_id: str):
+    # Cached catalog entries and ETags were made before imageUrls existed
+    try:
+        async with AsyncSessionLocal() as db, db.begin():
+            await http_cache.touch_product(db, product_id)
+    except Exception as e:
+        log.error(f"Catalog version update failed for {product_id}: {e}")
+    await product_cache.invalidate_product(product_id)
+
+
+def submit(product_id: str):
+    # Queue derivative generation after an upload; repeated uploads of the
+    # same product while a job is queued collapse into one job.
+    # Call from the event loop so finished jobs can invalidate the cache.
+    global _executor
+    if _pil() is None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    with _pending_lock:
+        if product_id in _pending:
+            return
+        _pending.add(product_id)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image-pipeline")
+    _executor.submit(_run, product_id, loop)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def backfill(product_ids: list[str] | None = None, force: bool = False, workers: int = IMAGE_WORKERS) -> int:
+    # A wrong IMAGE_DIR must not look like "nothing to do"
+    if not IMAGE_DIR.is_dir():
+        raise FileNotFoundError(f"Image directory not found: {IMAGE_DIR}")
+    if product_ids is None:
+        product_ids = sorted(entry.name for entry in os.scandir(IMAGE_DIR) if entry.is_dir())
+        if not product_ids:
+            raise FileNotFoundError(f"No product folders in {IMAGE_DIR}")
+    image_index.build_index()
+
+    missing = [pid for pid in product_ids if not image_index.get_product_image_url(pid)]
+    if len(missing) == len(product_ids):
+        raise FileNotFoundError(f"No original images for {', '.join(missing)} in {IMAGE_DIR}")
+    for pid in missing:
+        log.warning(f"{pid}: no original image, skipped")
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for pid, manifest in zip(product_ids, pool.map(lambda p: process_product(p, force), product_ids)):
+            if manifest:
+                done += 1
+                print(f"{pid}: {', '.join(manifest['images'])}")
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Product image derivatives")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("backfill", help="generate derivatives for existing product_images folders")
+    p.add_argument("product_ids", nargs="*", help="only these products (default: all)")
+    p.add_argument("--force", action="store_true", help="regenerate even if up to date")
+    p.add_argument("--workers", type=int, default=IMAGE_WORKERS)
+    args = parser.parse_args()
+
+    if _pil() is None:
+        parser.error("Pillow is required: pip install pillow")
+    try:
+        count = backfill(args.product_ids or None, args.force, args.workers)
+    except FileNotFoundError as e:
+        sys.exit(f"Backfill failed: {e}")
+    print(f"Processed {count} product(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+# Stock handling for checkout, without SELECT ... FOR UPDATE on Product.
+#
+# STOCK_MODE=conditional (default)
+#   Checkout subtracts stock inside its transaction with
+#   UPDATE ... WHERE Quantity >= :q, as the last statement before commit, so
+#   the row lock is held for as short a time as possible. A confirmed order
+#   is never cancelled for stock.
+#
+# STOCK_MODE=ledger (opt-in)
+#   Each worker process keeps a stock ledger: the Product.Quantity it last
+#   read plus what its own orders have taken since. Checkout reserves against
+#   the ledger in memory (atomic: no await between check and update) and
+#   writes StockReservation rows with the order, never touching the Product
+#   row. A background reconciler subtracts all reserved quantities from
+#   Product.Quantity every RECONCILE_SECONDS, one conditional UPDATE per batch,
+#   and re-reads every ledger product from the database, which picks up sales,
+#   staff edits and restocks made through other workers.
+#   Ledgers are per process, so two workers can sell the same last unit; the
+#   conditional UPDATE catches that at reconcile time and the losing order is
+#   cancelled (its reservation Released) after the customer was told it was
+#   placed. Product.Quantity never goes negative.
+#   Held reservations still unreconciled after RESERVATION_TTL seconds (their
+#   worker died) are committed or released by any worker's sweep.
+#   Only use it where a late cancellation is acceptable.
+
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import outbox, product_cache
+from .database_connection import AsyncSessionLocal
+
+log = logging.getLogger(__name__)
+
+STOCK_MODE = os.getenv("STOCK_MODE", "conditional").lower()
+RECONCILE_SECONDS = float(os.getenv("RECONCILE_SECONDS", "0.2"))
+RESERVATION_TTL = int(os.getenv("RESERVATION_TTL", "300"))
+SWEEP_SECONDS = 60.0
+# Ledger entries with nothing held and no checkout for this long are dropped,
+# so the per-tick refresh only reads products that are selling
+LEDGER_IDLE_SECONDS = 300.0
+
+
+class StockLedger:
+    # product id -> stock as last read from the database (base) and the
+    # quantity reserved by this process but not yet subtracted there (held)
+
+    def __init__(self):
+        self._base: dict[str, int] = {}
+        self._held: dict[str, int] = {}
+        self._used: dict[str, float] = {}  # product id -> last reserve()
+
+    def available(self, product_id: str) -> int | None:
+        if product_id not in self._base:
+            return None
+        return self._base[product_id] - self._held.get(product_id, 0)
+
+    def reserve(self, wanted: dict[str, int], db_quantities: dict[str, int]) -> str | None:
+        # All or nothing; returns the first product that is short, if any.
+        # db_quantities seeds products the ledger has not seen yet.
+        now = time.monotonic()
+        for pid in wanted:
+            if pid not in self._base:
+                self._base[pid] = db_quantities.get(pid, 0)
+            self._used[pid] = now
+        for pid, qty in wanted.items():
+            if self.available(pid) < qty:
+                return pid
+        for pid, qty in wanted.items():
+            self._held[pid] = self._held.get(pid, 0) + qty
+        return None
+
+    def release(self, wanted: dict[str, int]):
+        for pid, qty in wanted.items():
+            self._held[pid] = self._held.get(pid, 0) - qty
+
+    def settle(self, processed: dict[str, int], fresh: dict[str, int]) -> set[str]:
+        # processed: quantities now reflected in (or dropped from) the database;
+        # fresh: Product.Quantity read after that. Returns the products whose
+        # stock moved since the last read (sales, edits, restocks anywhere).
+        self.release(processed)
+        moved = set()
+        for pid, qty in fresh.items():
+            if pid in self._base and self._base[pid] != qty:
+                self._base[pid] = qty
+                moved.add(pid)
+        return moved
+
+    def evict_idle(self, idle_seconds: float):
+        # Only entries with nothing held: re-seeding those from a checkout's
+        # read cannot double-count this worker's own unreconciled orders
+        cutoff = time.monotonic() - idle_seconds
+        for pid in [pid for pid, used in self._used.items() if used < cutoff and not self._held.get(pid)]:
+            self._base.pop(pid, None)
+            self._held.pop(pid, None)
+            self._used.pop(pid, None)
+
+    def products(self) -> list[str]:
+        return list(self._base)
+
+    def stats(self) -> dict:
+        return {"products": len(self._base), "held": sum(self._held.values())}
+
+
+class _OutOfStock(Exception):
+    pass
+
+
+ledger = StockLedger()
+_queue: list[tuple[int, dict[str, int]]] = []  # orders not yet reconciled
+_reconcile_lock = asyncio.Lock()
+_reconciler: asyncio.Task | None = None
+_counters = {"committed": 0, "released": 0, "batches": 0, "fallbacks": 0}
+
+
+def _decrement_stmt(quantities: dict[str, int]):
+    # One statement for every product; only matches rows with enough stock
+    pids = sorted(quantities)
+    cases = " ".join(f"WHEN :pid{i} THEN :q{i}" for i in range(len(pids)))
+    params = {"pids": pids}
+    for i, pid in enumerate(pids):
+        params[f"pid{i}"] = pid
+        params[f"q{i}"] = quantities[pid]
+    stmt = text(
+        f"UPDATE Product SET Quantity = Quantity - CASE ProductId {cases} END "
+        f"WHERE ProductId IN :pids AND Quantity >= CASE ProductId {cases} END"
+    ).bindparams(bindparam("pids", expanding=True))
+    return stmt, params
+
+
+async def decrement(db: AsyncSession, quantities: dict[str, int]) -> bool:
+    # False (and nothing worth committing) when any product is short
+    stmt, params = _decrement_stmt(quantities)
+    res = await db.execute(stmt, params)
+    return res.rowcount == len(quantities)
+
+
+async def hold(db: AsyncSession, order_id: int, quantities: dict[str, int]):
+    # Inside the checkout transaction, after ledger.reserve()
+    await db.execute(
+        text("""
+            INSERT INTO StockReservation(OrderId, ProductId, Quantity, ExpiresAt)
+            VALUES (:oid, :pid, :q, NOW() + INTERVAL :ttl SECOND)
+        """),
+        [{"oid": order_id, "pid": pid, "q": q, "ttl": RESERVATION_TTL} for pid, q in quantities.items()],
+    )
+
+
+def enqueue(order_id: int, quantities: dict[str, int]):
+    # After the checkout transaction committed
+    _queue.append((order_id, quantities))
+
+
+def _totals(orders) -> dict[str, int]:
+    totals: dict[str, int] = {}
+    for _, quantities in orders:
+        for pid, q in quantities.items():
+            totals[pid] = totals.get(pid, 0) + q
+    return totals
+
+
+async def _claim(db: AsyncSession, order_ids: list[int]) -> int:
+    # Held -> Committed; the status check makes sure only one worker applies a reservation
+    res = await db.execute(
+        text("UPDATE StockReservation SET Status='Committed' WHERE Status='Held' AND OrderId IN :oids")
+        .bindparams(bindparam("oids", expanding=True)),
+        {"oids": order_ids},
+    )
+    return res.rowcount
+
+
+async def _commit_order(order_id: int, quantities: dict[str, int]) -> bool | None:
+    # True: committed, False: out of stock (order cancelled), None: already handled elsewhere
+    try:
+        async with AsyncSessionLocal() as db, db.begin():
+            if await _claim(db, [order_id]) == 0:
+                return None
+            if not await decrement(db, quantities):
+                raise _OutOfStock()
+        return True
+    except _OutOfStock:
+        pass
+
+    async with AsyncSessionLocal() as db, db.begin():
+        res = await db.execute(
+            text("UPDATE StockReservation SET Status='Released' WHERE OrderId=:oid AND Status='Held'"),
+            {"oid": order_id},
+        )
+        if res.rowcount == 0:
+            return None
+        await db.execute(text("UPDATE `Order` SET Status='Cancelled' WHERE OrderId=:oid"), {"oid": order_id})
+        await outbox.publish(db, "order.cancelled", {"orderId": order_id, "reason": "out of stock"})
+    outbox.notify()
+    log.warning(f"Order {order_id} cancelled: out of stock at reconcile")
+    return False
+
+
+async def _commit_orders(orders: list[tuple[int, dict[str, int]]]) -> list[tuple[int, dict[str, int]]]:
+    # Returns the orders that were dealt with (committed, released or already
+    # handled); the rest failed on a database error and should be retried
+    lines = sum(len(q) for _, q in orders)
+    try:
+        async with AsyncSessionLocal() as db, db.begin():
+            if await _claim(db, [oid for oid, _ in orders]) != lines or not await decrement(db, _totals(orders)):
+                raise _OutOfStock()
+        _counters["committed"] += len(orders)
+        return orders
+    except _OutOfStock:
+        _counters["fallbacks"] += 1
+
+    # Some product is short or some order was swept elsewhere: one order at a time
+    done = []
+    for order_id, quantities in orders:
+        try:
+            result = await _commit_order(order_id, quantities)
+        except Exception as e:
+            log.error(f"Reconcile error for order {order_id}: {e}")
+            continue
+        if result is True:
+            _counters["committed"] += 1
+        elif result is False:
+            _counters["released"] += 1
+        done.append((order_id, quantities))
+    return done
+
+
+async def _sweep():
+    # Held reservations past their expiry belong to a worker that is gone
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(text("""
+            SELECT OrderId, ProductId, Quantity FROM StockReservation
+            WHERE Status='Held' AND ExpiresAt < NOW()
+            ORDER BY ExpiresAt LIMIT 1000
+        """))).mappings().all()
+    orders: dict[int, dict[str, int]] = {}
+    for r in rows:
+        orders.setdefault(r["OrderId"], {})[r["ProductId"]] = int(r["Quantity"])
+    for order_id, quantities in orders.items():
+        await _commit_order(order_id, quantities)
+    return set(pid for q in orders.values() for pid in q)
+
+
+async def reconcile(sweep: bool = False):
+    async with _reconcile_lock:
+        batch = _queue[:]
+        del _queue[:len(batch)]
+        done = []
+        if batch:
+            try:
+                done = await _commit_orders(batch)
+            except Exception as e:
+                log.error(f"Reconcile error: {e}")
+            _counters["batches"] += 1
+            done_ids = {oid for oid, _ in done}
+            _queue[:0] = [order for order in batch if order[0] not in done_ids]
+
+        swept = await _sweep() if sweep else set()
+        if sweep:
+            ledger.evict_idle(LEDGER_IDLE_SECONDS)
+
+        # Every tick re-reads every ledger product: sales, staff edits and
+        # restocks made through other workers only show up this way
+        processed = _totals(done)
+        pids = sorted(set(processed) | set(ledger.products()) | swept)
+        if not pids:
+            return
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                text("SELECT ProductId, Quantity FROM Product WHERE ProductId IN :pids")
+                .bindparams(bindparam("pids", expanding=True)),
+                {"pids": pids},
+            )).all()
+        # No await between the read and settle(): the ledger matches the database
+        changed = ledger.settle(processed, {pid: int(qty or 0) for pid, qty in rows}) | set(processed) | swept
+    if changed:
+        await product_cache.invalidate_products(sorted(changed))
+
+
+async def _reconcile_loop():
+    since_sweep = 0.0
+    while True:
+        await asyncio.sleep(RECONCILE_SECONDS)
+        since_sweep += RECONCILE_SECONDS
+        sweep = since_sweep >= SWEEP_SECONDS
+        if sweep:
+            since_sweep = 0.0
+        try:
+            await reconcile(sweep)
+        except Exception as e:
+            log.error(f"Reconcile error: {e}")
+
+
+def start_reconciler():
+    global _reconciler
+    if STOCK_MODE == "ledger" and _reconciler is None:
+        _reconciler = asyncio.get_running_loop().create_task(_reconcile_loop())
+
+
+async def stop_reconciler():
+    global _reconciler
+    if _reconciler is not None:
+        _reconciler.cancel()
+        try:
+            await _reconciler
+        except asyncio.CancelledError:
+            pass
+        _reconciler = None
+    if _queue:
+        try:
+            await reconcile()
+        except Exception as e:
+            # Left Held; another worker's sweep picks them up after RESERVATION_TTL
+            log.error(f"Reconcile error: {e}")
+
+
+def stats() -> dict:
+    return {"mode": STOCK_MODE, "queued": len(_queue), **ledger.stats(), **_counters}
+
@@ -0,0 +1,76 @@
+# Incremental JSON encoding for large catalog responses (?stream=json|ndjson).
+# Rows are read through a server-side cursor, mapped with
+# catalog_query.product_dict and written out in chunks, so neither the result
+# set nor the response body is held in memory and no Pydantic model is built
+# per row. Uses orjson when it is installed.
+
+import json
+from datetime import date
+from decimal import Decimal
+from typing import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+
+from .database_connection import read_session
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+STREAM_FORMATS = "^(json|ndjson)$"
+STREAM_CHUNK_BYTES = 64 * 1024
+STREAM_PARTITION_ROWS = 500
+
+_MEDIA_TYPES = {"json": "application/json", "ndjson": "application/x-ndjson"}
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+async def stream_rows(sql: str, params: dict, primary: bool = False) -> AsyncIterator:
+    # Opens its own session: the generator outlives the request handler
+    async with read_session(primary) as db:
+        result = await db.stream(text(sql), params)
+        async for rows in result.mappings().partitions(STREAM_PARTITION_ROWS):
+            for r in rows:
+                yield r
+
+
+async def encode(items: AsyncIterator[dict], fmt: str) -> AsyncIterator[bytes]:
+    # The first item is flushed on its own to keep time-to-first-byte low,
+    # later ones are batched up to STREAM_CHUNK_BYTES
+    buf = bytearray(b"[" if fmt == "json" else b"")
+    count = 0
+    async for item in items:
+        if fmt == "json" and count:
+            buf += b","
+        buf += dumps(item)
+        if fmt == "ndjson":
+            buf += b"\n"
+        count += 1
+        if count == 1 or len(buf) >= STREAM_CHUNK_BYTES:
+            yield bytes(buf)
+            buf.clear()
+
+    if fmt == "json":
+        buf += b"]"
+    if buf:
+        yield bytes(buf)
+
+
+def streaming_response(items: AsyncIterator[dict], fmt: str, headers: dict | None = None) -> StreamingResponse:
+    return StreamingResponse(encode(items, fmt), media_type=_MEDIA_TYPES[fmt], headers=headers)
+
@@ -0,0 +1,345 @@
+# Mixed-workload load test for the API, with machine-readable results for
+# comparing commits. Needs the optional `httpx` package and a database
+# seeded by seed_data.py (the virtual users log in as its bench_c<i>
+# customers and the bench_staff account).
+#
+#   python -m Backend.Source.seed_data --schema --products 20000 --customers 500 --orders 20000
+#   python -m Backend.Source.loadtest --users 32 --duration 60 --out before.json
+#   ... change the code ...
+#   python -m Backend.Source.loadtest --users 32 --duration 60 --out after.json
+#   python -m Backend.Source.loadtest compare before.json after.json
+#
+# By default the app runs in this process behind an ASGI transport (no
+# network, client and server share one CPU: compare such runs with each
+# other, not with a real deployment). --url drives a running server instead.
+# Virtual users pick scenarios by --mix weights from per-user seeded random
+# generators, so two runs with the same arguments send the same requests
+# (checkout Idempotency-Keys aside, which are unique per run).
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from .seed_data import BENCH_PASSWORD, STAFF_USERNAME, customer_username
+
+DEFAULT_MIX = "browse=35,search=15,product=10,cart=10,checkout=8,orders=10,login=4,staff_list=5,staff_edit=3"
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _httpx():
+    try:
+        import httpx
+    except ImportError:
+        sys.exit("loadtest needs httpx: pip install httpx")
+    return httpx
+
+
+def parse_mix(mix: str) -> dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}, expected one of: {', '.join(SCENARIOS)}")
+        weights[name] = int(weight or 1)
+    return {k: v for k, v in weights.items() if v > 0}
+
+
+class Recorder:
+    # Latencies per endpoint; requests finishing during warm-up are dropped
+
+    def __init__(self, record_after: float):
+        self.record_after = record_after
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.statuses: dict[str, dict[str, int]] = {}
+
+    def add(self, name: str, elapsed: float, status: int):
+        if time.monotonic() < self.record_after:
+            return
+        self.latencies.setdefault(name, []).append(elapsed)
+        codes = self.statuses.setdefault(name, {})
+        codes[str(status)] = codes.get(str(status), 0) + 1
+        if status == 0 or status >= 400:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def _percentile(sorted_values: list[float], p: float) -> float:
+    # Nearest rank
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def _summary(latencies: list[float], errors: int, seconds: float, statuses: dict | None = None) -> dict:
+    values = sorted(latencies)
+    result = {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / seconds, 2) if seconds else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+    for p in PERCENTILES:
+        result[f"p{p}_ms"] = round(_percentile(values, p) * 1000, 3)
+    if statuses is not None:
+        result["statuses"] = statuses
+    return result
+
+
+class VirtualUser:
+    def __init__(self, client, recorder: Recorder, rng: random.Random, catalog: dict, customer: str, staff_headers: dict):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.catalog = catalog
+        self.customer = customer
+        self.staff_headers = staff_headers
+        self.headers: dict = {}
+
+    async def request(self, name: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except Exception:
+            response, status = None, 0
+        self.recorder.add(name, time.perf_counter() - started, status)
+        return response
+
+    async def login(self, username: str | None = None, role: str = "customer") -> dict:
+        response = await self.request("POST /auth/login", "POST", "/auth/login", json={
+            "username": username or self.customer, "password": BENCH_PASSWORD, "role": role,
+        })
+        if response is None or response.status_code != 200:
+            return {}
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def pick_product(self) -> str:
+        return self.rng.choice(self.catalog["ids"])
+
+    # Scenarios
+
+    async def browse(self):
+        response = await self.request("GET /buyer/products?limit", "GET", "/buyer/products", params={"limit": 20})
+        cursor = response is not None and response.headers.get("X-Next-Cursor")
+        if cursor:
+            await self.request("GET /buyer/products?cursor", "GET", "/buyer/products", params={"limit": 20, "cursor": cursor})
+
+    async def search(self):
+        await self.request("GET /buyer/products?q", "GET", "/buyer/products", params={"q": self.rng.choice(self.catalog["words"]), "limit": 20})
+
+    async def product(self):
+        await self.request("GET /buyer/products/{id}", "GET", f"/buyer/products/{self.pick_product()}")
+
+    async def cart(self):
+        pid = self.pick_product()
+        await self.request("POST /buyer/cart/items", "POST", "/buyer/cart/items", headers=self.headers,
+                           json={"items": [{"productId": pid, "quantity": 1}]})
+        await self.request("PUT /buyer/cart/items", "PUT", "/buyer/cart/items", headers=self.headers,
+                           json={"items": [{"productId": pid, "quantity": self.rng.randrange(0, 4)}]})
+        await self.request("GET /buyer/cart", "GET", "/buyer/cart", headers=self.headers)
+
+    async def checkout(self):
+        items = [{"productId": self.pick_product(), "quantity": self.rng.randrange(1, 3)} for _ in range(self.rng.randrange(1, 4))]
+        await self.request("POST /buyer/orders/checkout", "POST", "/buyer/orders/checkout",
+                           headers={**self.headers, "Idempotency-Key": uuid.uuid4().hex},
+                           json={
+                               "customerName": self.customer, "customerEmail": f"{self.customer}@bench.local",
+                               "customerPhone": "0900000000", "recipientName": self.customer,
+                               "recipientPhone": "0900000000", "address": "Bench address", "items": items,
+                           })
+
+    async def orders(self):
+        response = await self.request("GET /buyer/orders", "GET", "/buyer/orders", headers=self.headers, params={"limit": 20})
+        if response is not None and response.status_code == 200 and response.json():
+            order_id = response.json()[0]["id"]
+            await self.request("GET /buyer/orders/{id}", "GET", f"/buyer/orders/{order_id}", headers=self.headers)
+
+    async def login_scenario(self):
+        await self.login(customer_username(self.rng.randrange(self.catalog["customers"])))
+
+    async def staff_list(self):
+        await self.request("GET /staff/products", "GET", "/staff/products", headers=self.staff_headers, params={"limit": 50})
+
+    async def staff_edit(self):
+        await self.request("PUT /staff/products/{id}", "PUT", f"/staff/products/{self.pick_product()}", headers=self.staff_headers,
+                           data={"price": str(self.rng.randrange(200, 50_000) * 1000)})
+
+
+SCENARIOS = {
+    "browse": VirtualUser.browse,
+    "search": VirtualUser.search,
+    "product": VirtualUser.product,
+    "cart": VirtualUser.cart,
+    "checkout": VirtualUser.checkout,
+    "orders": VirtualUser.orders,
+    "login": VirtualUser.login_scenario,
+    "staff_list": VirtualUser.staff_list,
+    "staff_edit": VirtualUser.staff_edit,
+}
+
+
+@asynccontextmanager
+async def _client(url: str | None, users: int):
+    httpx = _httpx()
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    if url:
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+            yield client
+        return
+
+    from .app import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits, timeout=60) as client:
+            yield client
+
+
+async def _catalog(client, customers: int) -> dict:
+    response = await client.get("/buyer/products", params={"fields": "productId,productName"})
+    response.raise_for_status()
+    products = response.json()
+    if not products:
+        raise SystemExit("No active products: seed the database first (python -m Backend.Source.seed_data)")
+    words = sorted({w for p in products for w in p["productName"].split() if len(w) > 2 and not w.isdigit()})
+    return {"ids": [p["productId"] for p in products], "words": words or ["phone"], "customers": customers}
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    weights = parse_mix(args.mix)
+    names, weight_values = list(weights), list(weights.values())
+
+    async with _client(args.url, args.users) as client:
+        catalog = await _catalog(client, args.customers)
+        setup = Recorder(float("inf"))
+        staff_headers = await VirtualUser(client, setup, random.Random(), catalog, STAFF_USERNAME, {}).login(STAFF_USERNAME, "staff")
+        if not staff_headers and {"staff_list", "staff_edit"} & set(weights):
+            raise SystemExit(f"Login as {STAFF_USERNAME} failed: seed the database first")
+
+        started = time.monotonic()
+        recorder = Recorder(started + args.warmup)
+        deadline = started + args.warmup + args.duration
+
+        async def user_loop(i: int):
+            rng = random.Random(args.seed * 100_003 + i)
+            user = VirtualUser(client, recorder, rng, catalog, customer_username(i % args.customers), staff_headers)
+            user.headers = await user.login()
+            sent = 0
+            while time.monotonic() < deadline and (not args.requests or sent < args.requests):
+                scenario = rng.choices(names, weight_values)[0]
+                await SCENARIOS[scenario](user)
+                sent += 1
+                if args.think_ms:
+                    await asyncio.sleep(rng.expovariate(1000 / args.think_ms))
+
+        await asyncio.gather(*(user_loop(i) for i in range(args.users)))
+        measured = max(min(time.monotonic(), deadline) - recorder.record_after, 1e-9)
+
+    everything = [x for values in recorder.latencies.values() for x in values]
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "target": args.url or "in-process",
+            "python": platform.python_version(),
+            "users": args.users,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "think_ms": args.think_ms,
+            "mix": weights,
+            "seed": args.seed,
+            "products": len(catalog["ids"]),
+        },
+        "total": _summary(everything, sum(recorder.errors.values()), measured),
+        "endpoints": {
+            name: _summary(values, recorder.errors.get(name, 0), measured, recorder.statuses[name])
+            for name, values in sorted(recorder.latencies.items())
+        },
+    }
+
+
+def compare(before: dict, after: dict, threshold: float) -> bool:
+    # Prints throughput and p50/p99 changes per endpoint; False if any p99
+    # got worse by more than threshold (a fraction)
+    ok = True
+    rows = [("total", before["total"], after["total"])]
+    rows += [(name, before["endpoints"].get(name), stats) for name, stats in after["endpoints"].items()]
+    print(f"{'endpoint':<34} {'rps':>18} {'p50 ms':>20} {'p99 ms':>20}")
+    for name, old, new in rows:
+        if not old:
+            print(f"{name:<34} (new)")
+            continue
+
+        def change(key):
+            delta = (new[key] - old[key]) / old[key] if old[key] else 0.0
+            return f"{old[key]:>7.1f} → {new[key]:<7.1f}{delta:+.0%}", delta
+
+        rps, _ = change("rps")
+        p50, _ = change("p50_ms")
+        p99, p99_delta = change("p99_ms")
+        flag = ""
+        if p99_delta > threshold:
+            ok, flag = False, "  REGRESSION"
+        print(f"{name:<34} {rps:>18} {p50:>20} {p99:>20}{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API load test")
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        parser.add_argument("command")
+        parser.add_argument("before")
+        parser.add_argument("after")
+        parser.add_argument("--threshold", type=float, default=0.10, help="allowed p99 increase before failing")
+        args = parser.parse_args()
+        with open(args.before, encoding="utf-8") as f:
+            before = json.load(f)
+        with open(args.after, encoding="utf-8") as f:
+            after = json.load(f)
+        sys.exit(0 if compare(before, after, args.threshold) else 1)
+
+    parser.add_argument("--url", help="base URL of a running server (default: the app in this process)")
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds run before measuring")
+    parser.add_argument("--requests", type=int, default=0, help="stop each user after this many scenarios (0: no limit)")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between scenarios per user")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario weights, default {DEFAULT_MIX}")
+    parser.add_argument("--customers", type=int, default=500, help="bench customers seeded by seed_data.py")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write the JSON results here (default: stdout)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        total = results["total"]
+        print(f"{total['requests']} requests, {total['rps']:.1f} req/s, p50 {total['p50_ms']:.1f} ms, "
+              f"p99 {total['p99_ms']:.1f} ms, {total['errors']} errors -> {args.out}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# Request and database instrumentation, exported in the Prometheus text
+# format at GET /metrics (no client library needed).
+#
+# - MetricsMiddleware: per-route latency histogram, request counter, in-flight
+#   gauge, and the number / time of SQL statements each request ran. Adds a
+#   Server-Timing header (db;dur=<ms>;desc="<n> queries") so load tests and
+#   browser dev tools see the database share of every response, and logs
+#   requests slower than SLOW_REQUEST_MS or running more than
+#   QUERY_WARN_COUNT statements (usually an N+1 loop).
+# - instrument_engine(): SQLAlchemy cursor events for statement counts and
+#   timings; timed_pool() wraps a pool class to measure connection checkout
+#   waits (time spent queued for a free connection).
+#
+# Metrics are per worker process. METRICS_ENABLED=0 turns the middleware and
+# the statement hooks off.
+
+import logging
+import os
+import time
+from contextvars import ContextVar
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "no")
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+QUERY_WARN_COUNT = int(os.getenv("QUERY_WARN_COUNT", "25"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+log = logging.getLogger(__name__)
+
+
+class Histogram:
+    # Cumulative buckets as Prometheus expects them. Updates are not locked:
+    # under threads a concurrent observe can at worst be lost, never corrupt.
+
+    def __init__(self, name: str, help: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, labels: tuple = ()):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self, label_names: tuple = ()) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            base = _labels(label_names, labels)
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_labels(label_names + ('le',), labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(label_names + ('le',), labels + ('+Inf',))} {series[-1]}")
+            lines.append(f"{self.name}_sum{base} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{base} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, kind: str = "counter"):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self, label_names: tuple = ()) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(label_names, labels)} {value:g}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+ROUTE_LABELS = ("method", "route")
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status")
+IN_PROGRESS = Counter("http_requests_in_progress", "HTTP requests being served", kind="gauge")
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Time to the end of the response body")
+REQUEST_QUERIES = Histogram("http_request_db_queries", "SQL statements per request", COUNT_BUCKETS)
+REQUEST_DB_TIME = Histogram("http_request_db_seconds", "Time spent in SQL statements per request")
+QUERIES = Counter("db_queries_total", "SQL statements executed, including background work")
+QUERY_LATENCY = Histogram("db_query_duration_seconds", "SQL statement latency")
+POOL_WAIT = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection")
+ADMISSION_REJECTED = Counter("http_requests_rejected_total", "Requests refused by admission control (admission.py)")
+
+_engines: dict[str, object] = {}
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Set by the middleware for the duration of a request; SQLAlchemy's async
+# greenlets run with the calling task's context, so the cursor hooks see it
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> RequestStats | None:
+    return _request_stats.get()
+
+
+def _record_query(engine_name: str, elapsed: float):
+    QUERIES.inc((engine_name,))
+    QUERY_LATENCY.observe(elapsed, (engine_name,))
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_engine(engine, name: str):
+    # engine: a sync Engine (for an AsyncEngine pass async_engine.sync_engine)
+    from sqlalchemy import event
+
+    _engines[name] = engine
+    if not METRICS_ENABLED:
+        return
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _record_query(name, time.perf_counter() - conn.info["query_started"].pop())
+
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            _record_query(name, time.perf_counter() - conn.info["query_started"].pop())
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+def timed_pool(pool_class, name: str):
+    # Subclass of pool_class whose checkouts are timed; a class (not instance)
+    # patch, so it survives engine.dispose() recreating the pool
+    class TimedPool(pool_class):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                POOL_WAIT.observe(time.perf_counter() - started, (name,))
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+
+def _pool_lines() -> list[str]:
+    gauges = {
+        "db_pool_size": ("Configured pool size", lambda p: p.size()),
+        "db_pool_checked_out": ("Connections in use", lambda p: p.checkedout()),
+        "db_pool_overflow": ("Connections above pool_size (negative: not yet opened)", lambda p: p.overflow()),
+    }
+    lines = []
+    for metric, (help, read) in gauges.items():
+        lines += [f"# HELP {metric} {help}", f"# TYPE {metric} gauge"]
+        for name, engine in sorted(_engines.items()):
+            try:
+                value = read(engine.pool)
+            except (AttributeError, NotImplementedError):
+                continue  # pool class without that figure
+            lines.append(f'{metric}{{engine="{name}"}} {value}')
+    return lines
+
+
+def render() -> str:
+    lines = []
+    lines += REQUESTS.render(ROUTE_LABELS + ("status",))
+    lines += IN_PROGRESS.render(("method",))
+    lines += REQUEST_LATENCY.render(ROUTE_LABELS)
+    lines += REQUEST_QUERIES.render(ROUTE_LABELS)
+    lines += REQUEST_DB_TIME.render(ROUTE_LABELS)
+    lines += QUERIES.render(("engine",))
+    lines += QUERY_LATENCY.render(("engine",))
+    lines += POOL_WAIT.render(("engine",))
+    lines += ADMISSION_REJECTED.render(("route_class", "reason"))
+    lines += _pool_lines()
+    return "\n".join(lines) + "\n"
+
+
+def _route_template(scope) -> str:
+    # The router stores the matched route in the (shared) scope; unmatched
+    # paths are grouped so random URLs cannot blow up the label set
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app, exclude_paths: tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if not METRICS_ENABLED or scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"'
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        IN_PROGRESS.inc((method,))
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_PROGRESS.inc((method,), -1)
+            _request_stats.reset(token)
+
+            labels = (method, _route_template(scope))
+            REQUESTS.inc(labels + (str(status),))
+            REQUEST_LATENCY.observe(elapsed, labels)
+            REQUEST_QUERIES.observe(stats.queries, labels)
+            REQUEST_DB_TIME.observe(stats.db_seconds, labels)
+
+            if elapsed * 1000 >= SLOW_REQUEST_MS or stats.queries > QUERY_WARN_COUNT:
+                log.warning(
+                    "slow request %s %s status=%s ms=%.1f queries=%d db_ms=%.1f",
+                    method, labels[1], status, elapsed * 1000, stats.queries, stats.db_seconds * 1000,
+                )
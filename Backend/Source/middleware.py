@@ -0,0 +1,83 @@
+# ASGI middleware used by app.py
+
+from fastapi import HTTPException
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+
+
+class CompressionMiddleware:
+    # Brotli when the optional brotli-asgi package is installed (it falls back
+    # to gzip for clients without br), otherwise gzip. Paths under
+    # exclude_prefixes (already-compressed images) are passed through untouched.
+    # A compressed response's strong ETag gets the coding appended, since its
+    # bytes differ from the identity body (http_cache.etag_matches strips it).
+
+    def __init__(self, app, minimum_size: int = 1024, exclude_prefixes: tuple[str, ...] = ()):
+        self.app = app
+        self.exclude_prefixes = exclude_prefixes
+        try:
+            from brotli_asgi import BrotliMiddleware
+            self.compressed = BrotliMiddleware(app, minimum_size=minimum_size)
+        except ImportError:
+            self.compressed = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not scope["path"].startswith(self.exclude_prefixes):
+            await self.compressed(scope, receive, self._tag_coding(send))
+        else:
+            await self.app(scope, receive, send)
+
+    @staticmethod
+    def _tag_coding(send):
+        async def tagged_send(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                etag, coding = headers.get("etag"), headers.get("content-encoding")
+                if etag and coding and etag.endswith('"'):
+                    headers["etag"] = f'{etag[:-1]}-{coding}"'
+            await send(message)
+
+        return tagged_send
+
+class UploadSizeLimitMiddleware:
+    # Caps multipart request bodies under path_prefixes before the form parser
+    # spools them to disk: rejects a too-large Content-Length up front and
+    # stops reading a chunked body once it passes max_bytes.
+
+    def __init__(self, app, max_bytes: int, path_prefixes: tuple[str, ...] = ()):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_prefixes = path_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Upload larger than {self.max_bytes // (1024 * 1024)} MB"
+        try:
+            content_length = int(headers.get(b"content-length", b"0"))
+        except ValueError:
+            content_length = 0
+        if content_length > self.max_bytes:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,51 @@
+# Handlers for order events published through the outbox (see outbox.py).
+# They run after the order committed, outside the checkout request, and may
+# run more than once for the same event.
+
+import logging
+import os
+
+from sqlalchemy import bindparam, text
+
+from . import sales_rollup
+from .database_connection import AsyncSessionLocal
+from .outbox import handler
+
+log = logging.getLogger(__name__)
+
+LOW_STOCK_THRESHOLD = int(os.getenv("LOW_STOCK_THRESHOLD", "5"))
+
+
+@handler("order.placed")
+async def send_confirmation(event: dict):
+    # Stand-in for the confirmation email
+    log.info(f"Order {event['orderId']} confirmed for customer {event['customerId']}: "
+             f"{len(event['items'])} line(s), total {event['total']:.2f}")
+
+
+@handler("order.placed")
+async def check_low_stock(event: dict):
+    pids = sorted(event["items"])
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            text("SELECT ProductId, Quantity FROM Product WHERE ProductId IN :pids AND Quantity <= :low")
+            .bindparams(bindparam("pids", expanding=True)),
+            {"pids": pids, "low": LOW_STOCK_THRESHOLD},
+        )).mappings().all()
+    for r in rows:
+        log.warning(f"Low stock: {r['ProductId']} has {r['Quantity']} left")
+
+
+@handler("order.placed")
+async def count_sale(event: dict):
+    await sales_rollup.apply_order(event["orderId"], "placed")
+
+
+@handler("order.cancelled")
+async def uncount_sale(event: dict):
+    await sales_rollup.apply_order(event["orderId"], "cancelled")
+
+
+@handler("order.cancelled")
+async def send_cancellation(event: dict):
+    log.info(f"Order {event['orderId']} cancelled: {event['reason']}")
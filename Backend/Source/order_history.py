@@ -0,0 +1,104 @@
+# Buyer order history and order detail.
+# A history page is two queries whatever its size: the orders, read from the
+# covering index idx_order_customer_date (CustomerId, OrderDate DESC,
+# OrderId DESC, Status, Total), then the lines of every order on the page.
+# Order totals are stored at checkout, so nothing is re-aggregated.
+
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .catalog_query import encode_cursor
+
+MAX_ORDER_PAGE = 100
+
+LINES_SQL = text("""
+    SELECT ocp.OrderId, ocp.ProductId, ocp.Quantity, COALESCE(ocp.UnitPrice, p.Price) AS UnitPrice, p.ProductName
+    FROM OrderContainsProduct ocp
+    JOIN Product p ON p.ProductId = ocp.ProductId
+    WHERE ocp.OrderId IN :oids
+    ORDER BY ocp.OrderId, ocp.ProductId
+""").bindparams(bindparam("oids", expanding=True))
+
+
+def order_cursor(r) -> str:
+    return encode_cursor({"d": r["OrderDate"], "id": r["OrderId"]})
+
+
+def order_keyset(cursor: dict, params: dict) -> str:
+    # Rows after the cursor in ORDER BY OrderDate DESC, OrderId DESC
+    try:
+        params["c_date"] = datetime.fromisoformat(cursor["d"])
+        params["c_id"] = int(cursor["id"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return "(OrderDate, OrderId) < (:c_date, :c_id)"
+
+
+async def _lines(db: AsyncSession, order_ids: list[int]) -> dict[int, list[dict]]:
+    lines: dict[int, list[dict]] = {oid: [] for oid in order_ids}
+    if not order_ids:
+        return lines
+    for r in (await db.execute(LINES_SQL, {"oids": order_ids})).mappings():
+        unit_price = float(r["UnitPrice"] or 0)
+        lines[r["OrderId"]].append({
+            "productId": r["ProductId"],
+            "productName": r["ProductName"],
+            "unitPrice": unit_price,
+            "quantity": r["Quantity"],
+            "lineTotal": unit_price * r["Quantity"],
+        })
+    return lines
+
+
+def _order_dict(r, items: list[dict]) -> dict:
+    data = {
+        "id": str(r["OrderId"]),
+        "orderDate": r["OrderDate"],
+        "status": r["Status"],
+        "items": items,
+        "total": float(r["Total"]) if r["Total"] is not None else sum(i["lineTotal"] for i in items),
+    }
+    for key, col in (
+        ("intendedShipmentDate", "IntendedShipmentDate"),
+        ("recipientName", "RecipientName"),
+        ("recipientContact", "RecipientContact"),
+        ("address", "ShipmentAddress"),
+    ):
+        if col in r:
+            data[key] = r[col]
+    return data
+
+
+async def list_orders(db: AsyncSession, customer_id: int, limit: int, after: dict | None) -> tuple[list[dict], str | None]:
+    sql = "SELECT OrderId, OrderDate, Status, Total FROM `Order` WHERE CustomerId=:cid"
+    params = {"cid": customer_id, "limit": limit + 1}
+    if after:
+        sql += " AND " + order_keyset(after, params)
+    sql += " ORDER BY OrderDate DESC, OrderId DESC LIMIT :limit"
+
+    rows = (await db.execute(text(sql), params)).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = order_cursor(rows[-1])
+
+    lines = await _lines(db, [r["OrderId"] for r in rows])
+    return [_order_dict(r, lines[r["OrderId"]]) for r in rows], next_cursor
+
+
+async def get_order(db: AsyncSession, customer_id: int, order_id: int) -> dict | None:
+    row = (await db.execute(
+        text("""
+            SELECT OrderId, OrderDate, IntendedShipmentDate, Status, RecipientName, RecipientContact, ShipmentAddress, Total
+            FROM `Order` WHERE OrderId=:oid AND CustomerId=:cid
+        """),
+        {"oid": order_id, "cid": customer_id},
+    )).mappings().first()
+    if not row:
+        return None
+    lines = await _lines(db, [order_id])
+    return _order_dict(row, lines[order_id])
+
@@ -0,0 +1,204 @@
+# Transactional outbox for work that follows an order (confirmation
+# messages, stock alerts, analytics ...).
+#
+# publish() inserts an Outbox row in the caller's transaction, so an event
+# exists exactly when the order committed. Workers claim pending rows in
+# batches (SELECT ... FOR UPDATE SKIP LOCKED, then a lease on AvailableAt),
+# run every handler registered for the topic and mark the rows Done. A failed
+# event is retried with exponential backoff and marked Failed after
+# OUTBOX_MAX_ATTEMPTS. Delivery is at least once: handlers must tolerate
+# running twice for the same event.
+#
+# Workers run as asyncio tasks in the API process (OUTBOX_WORKERS, 0 to
+# disable) or in a separate process:
+#   python -m Backend.Source.outbox worker
+
+import asyncio
+import json
+import logging
+import os
+from typing import Awaitable, Callable
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database_connection import AsyncSessionLocal
+
+log = logging.getLogger(__name__)
+
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "1"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "1"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+# A claimed event is handed to another worker if not finished within this time
+LEASE_SECONDS = 60
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 3600.0
+
+Handler = Callable[[dict], Awaitable[None]]
+
+_handlers: dict[str, list[Handler]] = {}
+_wakeup: asyncio.Event | None = None
+_workers: list[asyncio.Task] = []
+_counters = {"done": 0, "retried": 0, "failed": 0, "batches": 0}
+
+
+def handler(topic: str):
+    # Registers an async handler(payload) for a topic
+    def register(fn: Handler) -> Handler:
+        _handlers.setdefault(topic, []).append(fn)
+        return fn
+    return register
+
+
+def handlers(topic: str) -> list[Handler]:
+    return list(_handlers.get(topic, ()))
+
+
+async def publish(db: AsyncSession, topic: str, payload: dict):
+    # Inside the caller's transaction; call notify() after it commits
+    await db.execute(
+        text("INSERT INTO Outbox(Topic, Payload) VALUES (:t, :p)"),
+        {"t": topic, "p": json.dumps(payload, default=str)},
+    )
+
+
+def notify():
+    # Wake the local workers instead of waiting for the next poll
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def backoff(attempts: int) -> float:
+    return min(BACKOFF_BASE ** attempts, BACKOFF_MAX)
+
+
+async def _claim(limit: int) -> list:
+    async with AsyncSessionLocal() as db, db.begin():
+        rows = (await db.execute(
+            text("""
+                SELECT EventId, Topic, Payload, Attempts FROM Outbox
+                WHERE Status='Pending' AND AvailableAt <= NOW(3)
+                ORDER BY AvailableAt LIMIT :n
+                FOR UPDATE SKIP LOCKED
+            """),
+            {"n": limit},
+        )).mappings().all()
+        if rows:
+            await db.execute(
+                text("""
+                    UPDATE Outbox SET Attempts = Attempts + 1, AvailableAt = NOW(3) + INTERVAL :lease SECOND
+                    WHERE EventId IN :ids
+                """).bindparams(bindparam("ids", expanding=True)),
+                {"lease": LEASE_SECONDS, "ids": [r["EventId"] for r in rows]},
+            )
+    return rows
+
+
+async def _handle(event) -> str | None:
+    # None on success, else the error message
+    try:
+        payload = json.loads(event["Payload"])
+        for fn in handlers(event["Topic"]):
+            await fn(payload)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"[:255]
+    return None
+
+
+async def process_batch(limit: int = OUTBOX_BATCH_SIZE) -> int:
+    events = await _claim(limit)
+    if not events:
+        return 0
+
+    errors = await asyncio.gather(*(_handle(e) for e in events))
+    done = [e["EventId"] for e, err in zip(events, errors) if err is None]
+
+    async with AsyncSessionLocal() as db, db.begin():
+        if done:
+            await db.execute(
+                text("UPDATE Outbox SET Status='Done', LastError=NULL WHERE EventId IN :ids").bindparams(bindparam("ids", expanding=True)),
+                {"ids": done},
+            )
+        for event, err in zip(events, errors):
+            if err is None:
+                continue
+            attempts = event["Attempts"] + 1
+            failed = attempts >= OUTBOX_MAX_ATTEMPTS
+            log.warning(f"Outbox event {event['EventId']} ({event['Topic']}) failed, attempt {attempts}: {err}")
+            await db.execute(
+                text("""
+                    UPDATE Outbox SET Status=:st, LastError=:err, AvailableAt = NOW(3) + INTERVAL :delay SECOND
+                    WHERE EventId=:id
+                """),
+                {"st": "Failed" if failed else "Pending", "err": err, "delay": backoff(attempts), "id": event["EventId"]},
+            )
+            _counters["failed" if failed else "retried"] += 1
+
+    _counters["done"] += len(done)
+    _counters["batches"] += 1
+    return len(events)
+
+
+async def _worker_loop():
+    while True:
+        try:
+            handled = await process_batch()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error(f"Outbox worker error: {e}")
+            handled = 0
+        if handled:
+            continue  # more may be waiting
+        try:
+            await asyncio.wait_for(_wakeup.wait(), OUTBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def start_workers(count: int = OUTBOX_WORKERS):
+    global _wakeup
+    if _workers or count <= 0:
+        return
+    _wakeup = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    _workers.extend(loop.create_task(_worker_loop()) for _ in range(count))
+
+
+async def stop_workers():
+    # Claimed events that were interrupted are picked up again after their lease
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+def stats() -> dict:
+    return {"workers": len(_workers), "topics": {t: len(h) for t, h in _handlers.items()}, **_counters}
+
+
+async def _run_forever(count: int):
+    from . import order_events  # noqa: F401  registers the handlers
+
+    start_workers(count)
+    try:
+        await asyncio.gather(*_workers)
+    finally:
+        await stop_workers()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Outbox worker")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("worker", help="drain the outbox")
+    p.add_argument("--workers", type=int, default=max(OUTBOX_WORKERS, 1))
+    args = parser.parse_args()
+
+    from . import log_config
+
+    log_config.configure()
+    asyncio.run(_run_forever(args.workers))
@@ -0,0 +1,99 @@
+# Password hashing service.
+# bcrypt is CPU-bound (~250 ms at cost 12), so the async API runs it in a
+# bounded process pool instead of on the event loop. When too many hashes are
+# already queued, callers get a 503 instead of piling up behind the pool.
+
+import asyncio
+import hmac
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+import bcrypt
+from fastapi import HTTPException
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Every web worker has its own pool, so by default the cores are split
+# between them (WEB_CONCURRENCY, set by serve.py) instead of each worker
+# starting one hashing process per core.
+_WEB_WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1") or 1))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "0")) or max(1, (os.cpu_count() or 1) // _WEB_WORKERS)
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 8)))
+# "process" escapes the GIL for the Python glue around bcrypt; "thread" avoids
+# the extra processes on small machines
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "process").lower()
+
+_executor: Executor | None = None
+_pending = 0
+
+
+def hash_password_sync(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def is_bcrypt_hash(stored: str) -> bool:
+    return stored.startswith(("$2a$", "$2b$", "$2y$"))
+
+
+def check_password_sync(password: str, stored: str) -> bool:
+    if not is_bcrypt_hash(stored):
+        # Legacy rows saved before hashing was added hold the plain password
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), stored.encode("utf-8"))
+    except ValueError:
+        return False
+
+
+def needs_rehash(stored: str) -> bool:
+    # Plaintext, or bcrypt with a lower cost than configured ($2b$<cost>$...)
+    if not is_bcrypt_hash(stored):
+        return True
+    try:
+        return int(stored.split("$")[2]) < BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if HASH_EXECUTOR == "thread":
+            _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+        else:
+            _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+    return _executor
+
+
+async def _run(fn, *args):
+    # Only touched from the event loop thread, so a plain counter is enough
+    global _pending
+    if _pending >= HASH_MAX_PENDING:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(hash_password_sync, password)
+
+
+async def verify_password(password: str, stored: str) -> bool:
+    if not is_bcrypt_hash(stored):
+        return check_password_sync(password, stored)
+    return await _run(check_password_sync, password, stored)
+
+
+def pending() -> int:
+    return _pending
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
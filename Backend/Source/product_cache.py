@@ -0,0 +1,229 @@
+# Read-through cache for buyer catalog reads (product detail and listings).
+# The catalog only changes through the staff API and checkout stock
+# decrements; those call invalidate_products() so readers never wait a full TTL.
+#
+# Backends:
+#   - in-process LRU with TTL (default, per worker process)
+#   - Redis-compatible store shared by all workers (PRODUCT_CACHE_REDIS_URL,
+#     needs the optional `redis` package)
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "2048"))
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "300"))
+PRODUCT_CACHE_REDIS_URL = os.getenv("PRODUCT_CACHE_REDIS_URL", "")
+
+MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return MISSING
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class _LocalBackend:
+    name = "local"
+
+    def __init__(self):
+        self.cache = LRUCache(PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL)
+        self.generation = 0
+
+    async def get(self, key):
+        return self.cache.get(key)
+
+    async def set(self, key, value):
+        self.cache.set(key, value)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.cache.delete(key)
+
+    async def listing_generation(self) -> int:
+        return self.generation
+
+    async def bump_listing_generation(self):
+        self.generation += 1
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+class _RedisBackend:
+    name = "redis"
+    GENERATION_KEY = "catalog:listing-gen"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # optional dependency
+
+        self.client = redis.from_url(url)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key):
+        try:
+            raw = await self.client.get(key)
+        except Exception as e:
+            # Cache outage degrades to a database read
+            log.warning(f"Product cache get error: {e}")
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key, value):
+        try:
+            await self.client.set(key, json.dumps(value, default=str), ex=int(PRODUCT_CACHE_TTL))
+        except Exception as e:
+            log.warning(f"Product cache set error: {e}")
+
+    async def delete(self, *keys):
+        if keys:
+            await self.client.delete(*keys)
+
+    async def listing_generation(self) -> int | None:
+        try:
+            return int(await self.client.get(self.GENERATION_KEY) or 0)
+        except Exception as e:
+            log.warning(f"Product cache get error: {e}")
+            return None
+
+    async def bump_listing_generation(self):
+        await self.client.incr(self.GENERATION_KEY)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def _make_backend():
+    if PRODUCT_CACHE_REDIS_URL:
+        try:
+            return _RedisBackend(PRODUCT_CACHE_REDIS_URL)
+        except ImportError:
+            log.warning("PRODUCT_CACHE_REDIS_URL is set but `redis` is not installed, using the local cache")
+    return _LocalBackend()
+
+
+_backend = _make_backend()
+
+
+def is_shared() -> bool:
+    # True when every worker sees the same entries and catalog version
+    return _backend.name != "local"
+
+
+def _product_key(product_id: str) -> str:
+    return f"product:{product_id}"
+
+
+async def catalog_version() -> int | None:
+    # Bumped by every product write this backend sees (all workers with the
+    # shared store); None when the shared store is unreachable
+    return await _backend.listing_generation()
+
+
+def listing_key(version: str | None, params: dict) -> str:
+    # Listings are namespaced by http_cache.catalog_version, so a product write
+    # retires every cached page at once. Read the version before the database
+    # so a page loaded across a write is stored under the old one.
+    return f"list:{version}:" + json.dumps(params, sort_keys=True, default=str)
+
+
+async def get_product(product_id: str, version: str | None):
+    # Entries carry the catalog version read before their database load; one
+    # loaded across a write (stored after its invalidation) is ignored
+    if version is None:
+        return MISSING
+    entry = await _backend.get(_product_key(product_id))
+    if entry is MISSING or entry.get("version") != version:
+        return MISSING
+    return entry["product"]
+
+
+async def set_product(product_id: str, version: str | None, value: dict):
+    if version is not None:
+        await _backend.set(_product_key(product_id), {"version": version, "product": value})
+
+
+async def get_listing(key: str):
+    return await _backend.get(key)
+
+
+async def set_listing(key: str, value: dict):
+    await _backend.set(key, value)
+
+
+async def invalidate_products(product_ids):
+    try:
+        await _backend.delete(*[_product_key(pid) for pid in product_ids])
+        await _backend.bump_listing_generation()
+    except Exception as e:
+        # The write already committed; stale entries age out after PRODUCT_CACHE_TTL
+        log.error(f"Product cache invalidation error: {e}")
+
+
+async def invalidate_product(product_id: str):
+    await invalidate_products([product_id])
+
+
+def stats() -> dict:
+    return {"backend": _backend.name, **_backend.stats()}
@@ -0,0 +1,248 @@
+# In-process full-text search over the Product catalog.
+# Inverted index of accent-folded tokens (so "dien thoai" matches "Điện thoại"),
+# with prefix matching for search-as-you-type and simple field-weighted ranking.
+#
+# Every worker process has its own index. Product writes made through the
+# process are indexed at once, and every SEARCH_SYNC_SECONDS each worker also
+# re-reads the products changed since its last look (Product.UpdatedAt), so
+# edits made through other workers show up in search within that time.
+
+import asyncio
+import bisect
+import heapq
+import logging
+import os
+import re
+import threading
+import unicodedata
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database_connection import AsyncSessionLocal
+
+log = logging.getLogger(__name__)
+
+# "index" (default): in-process inverted index
+# "fulltext": MySQL FULLTEXT (MATCH ... AGAINST), see ft_product_search in db_creation.sql
+#   (FULLTEXT_COLUMNS must list the index columns in the same order)
+# "like": the old LIKE '%q%' scan
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "index").lower()
+SEARCH_SYNC_SECONDS = float(os.getenv("SEARCH_SYNC_SECONDS", "5"))
+# Re-read window for product writes committed out of UpdatedAt order
+SEARCH_SYNC_OVERLAP = 5.0
+
+FIELD_WEIGHTS = {
+    "ProductId": 4.0,
+    "ProductName": 3.0,
+    "Brand": 2.0,
+    "Specification": 1.0,
+}
+PREFIX_FACTOR = 0.6
+
+FULLTEXT_COLUMNS = "ProductId, ProductName, Brand, Specification"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_postings: dict[str, dict[str, float]] = {}
+_sorted_tokens: list[str] = []
+_doc_tokens: dict[str, set[str]] = {}
+_doc_status: dict[str, str] = {}
+_built = False
+_lock = threading.RLock()
+_synced_until = None  # database time the index has read changes up to
+_sync_task: asyncio.Task | None = None
+
+
+def fold(s: str) -> str:
+    # Lowercase and strip diacritics; đ/Đ has no decomposition so map it by hand
+    s = s.lower().replace("đ", "d")
+    s = unicodedata.normalize("NFD", s)
+    return "".join(ch for ch in s if not unicodedata.combining(ch))
+
+
+def tokenize(s: str | None) -> list[str]:
+    if not s:
+        return []
+    return _TOKEN_RE.findall(fold(s))
+
+
+def is_ready() -> bool:
+    return _built
+
+
+def _remove_doc(product_id: str):
+    for token in _doc_tokens.pop(product_id, set()):
+        docs = _postings.get(token)
+        if docs is None:
+            continue
+        docs.pop(product_id, None)
+        if not docs:
+            del _postings[token]
+            i = bisect.bisect_left(_sorted_tokens, token)
+            if i < len(_sorted_tokens) and _sorted_tokens[i] == token:
+                _sorted_tokens.pop(i)
+    _doc_status.pop(product_id, None)
+
+
+def _add_doc(row):
+    product_id = row["ProductId"]
+    weights: dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(row.get(field)):
+            weights[token] = weights.get(token, 0.0) + weight
+
+    for token, weight in weights.items():
+        docs = _postings.get(token)
+        if docs is None:
+            docs = _postings[token] = {}
+            bisect.insort(_sorted_tokens, token)
+        docs[product_id] = weight
+
+    _doc_tokens[product_id] = set(weights)
+    _doc_status[product_id] = row.get("Status") or "Active"
+
+
+def index_product(row):
+    # row: mapping with the Product column names (a RowMapping or dict)
+    with _lock:
+        _remove_doc(row["ProductId"])
+        _add_doc(row)
+
+
+def remove_product(product_id: str):
+    with _lock:
+        _remove_doc(product_id)
+
+
+def set_status(product_id: str, status: str):
+    with _lock:
+        if product_id in _doc_tokens:
+            _doc_status[product_id] = status
+
+
+async def build_index(db: AsyncSession) -> int:
+    global _postings, _sorted_tokens, _doc_tokens, _doc_status, _built, _synced_until
+    # Before the scan: writes committed during it are picked up by the next sync
+    synced_until = (await db.execute(text("SELECT NOW(6)"))).scalar()
+    rows = (await db.execute(
+        text("SELECT ProductId, ProductName, Brand, Specification, Status FROM Product")
+    )).mappings()
+
+    with _lock:
+        _postings, _sorted_tokens, _doc_tokens, _doc_status = {}, [], {}, {}
+        count = 0
+        for r in rows:
+            _add_doc(r)
+            count += 1
+        _built = True
+        _synced_until = synced_until
+    return count
+
+
+async def sync_index(db: AsyncSession) -> int:
+    # Re-index the products written since the last build or sync, by any worker
+    global _synced_until
+    if _synced_until is None:
+        return 0
+    rows = (await db.execute(
+        text("SELECT ProductId, ProductName, Brand, Specification, Status, UpdatedAt FROM Product "
+             "WHERE UpdatedAt >= :since - INTERVAL :overlap SECOND"),
+        {"since": _synced_until, "overlap": SEARCH_SYNC_OVERLAP},
+    )).mappings().all()
+    for r in rows:
+        index_product(r)
+        if r["UpdatedAt"] > _synced_until:
+            _synced_until = r["UpdatedAt"]
+    return len(rows)
+
+
+async def _sync_loop():
+    while True:
+        await asyncio.sleep(SEARCH_SYNC_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                await sync_index(db)
+        except Exception as e:
+            log.error(f"Search index sync error: {e}")
+
+
+def start_index_sync():
+    global _sync_task
+    if _sync_task is None and SEARCH_BACKEND == "index" and SEARCH_SYNC_SECONDS > 0:
+        _sync_task = asyncio.get_running_loop().create_task(_sync_loop())
+
+
+async def stop_index_sync():
+    global _sync_task
+    if _sync_task is not None:
+        _sync_task.cancel()
+        try:
+            await _sync_task
+        except asyncio.CancelledError:
+            pass
+        _sync_task = None
+
+
+def _match_token(token: str) -> dict[str, float]:
+    scores = dict(_postings.get(token, {}))
+
+    i = bisect.bisect_right(_sorted_tokens, token)
+    while i < len(_sorted_tokens) and _sorted_tokens[i].startswith(token):
+        for pid, weight in _postings[_sorted_tokens[i]].items():
+            w = weight * PREFIX_FACTOR
+            if w > scores.get(pid, 0.0):
+                scores[pid] = w
+        i += 1
+    return scores
+
+
+def search(q: str, active_only: bool = True, offset: int = 0, limit: int | None = None) -> list[str]:
+    # Returns product ids ordered by relevance, the page [offset, offset + limit)
+    # or everything from offset on. Every query token must match (exactly or
+    # as a prefix) in at least one indexed field.
+    tokens = tokenize(q)
+    if not tokens:
+        return []
+
+    with _lock:
+        scores: dict[str, float] | None = None
+        for token in dict.fromkeys(tokens):
+            matches = _match_token(token)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {pid: s + matches[pid] for pid, s in scores.items() if pid in matches}
+            if not scores:
+                return []
+
+        if active_only:
+            scores = {pid: s for pid, s in scores.items() if _doc_status.get(pid) == "Active"}
+
+    order = lambda kv: (-kv[1], kv[0])
+    if limit is None:
+        ranked = sorted(scores.items(), key=order)[offset:]
+    else:
+        # Only the top offset + limit hits need ordering
+        ranked = heapq.nsmallest(offset + limit, scores.items(), key=order)[offset:]
+    return [pid for pid, _ in ranked]
+
+
+def fulltext_query(q: str) -> str:
+    # Boolean-mode query: every query word required, matched as a prefix.
+    # The FULLTEXT parser keeps "_" inside words, so an id such as PH_IP14_BLK
+    # is one word; a word with "_" matches either whole (the id) or as its
+    # folded tokens (names and specs).
+    terms = []
+    for word in q.split():
+        tokens = tokenize(word)
+        if not tokens:
+            continue
+        parts = " ".join(f"+{t}*" for t in tokens)
+        joined = "_".join(tokens)
+        if "_" in word and len(tokens) > 1:
+            terms.append(f"+({joined}* ({parts}))")
+        else:
+            terms.append(parts)
+    return " ".join(terms)
+
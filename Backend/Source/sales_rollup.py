@@ -0,0 +1,361 @@
+# Sales analytics served from the SalesDaily rollup (units, revenue and order
+# count per day and product) instead of joining Order / OrderContainsProduct
+# over the whole history.
+#
+# - order.placed / order.cancelled outbox events add / subtract an order's
+#   lines (apply_order, see order_events.py). SalesRollupApplied makes that
+#   idempotent, since outbox delivery is at least once.
+# - rebuild() recomputes the table from the order history: a streamed read of
+#   every line, aggregated in NumPy when installed (pure Python otherwise),
+#   then swapped in with one transaction. Orders up to the rebuild snapshot
+#   (SalesRollupState.RebuiltThrough) are skipped by the event handlers.
+#   Rebuild and handlers are serialised by the SalesRollupState row lock.
+# Revenue is line totals at checkout price, before the order discount.
+#
+#   python -m Backend.Source.sales_rollup rebuild [--no-numpy]
+
+import asyncio
+import logging
+import os
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database_connection import AsyncSessionLocal
+
+log = logging.getLogger(__name__)
+
+# numpy is imported by the first rebuild, not at startup: only the rebuild
+# uses it and it is slow to import
+np = None
+
+
+def _load_numpy() -> bool:
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # optional: rebuild falls back to a dict
+            return False
+        np = numpy
+    return True
+
+
+ROLLUP_CHUNK_ROWS = int(os.getenv("ROLLUP_CHUNK_ROWS", "100000"))
+# Orders newer than this are left to the final rebuild transaction (and their
+# events), so a checkout still in flight during the snapshot is not skipped
+SNAPSHOT_LAG_SECONDS = 60
+INSERT_BATCH = 2000
+MAX_REPORT_ROWS = 500
+
+UPSERT_SQL = text("""
+    INSERT INTO SalesDaily(SaleDate, ProductId, Units, Revenue, Orders)
+    VALUES (:d, :pid, :units, :revenue, :orders)
+    ON DUPLICATE KEY UPDATE
+        Units = Units + VALUES(Units), Revenue = Revenue + VALUES(Revenue), Orders = Orders + VALUES(Orders)
+""")
+
+
+async def _rebuilt_through(db: AsyncSession, lock: str) -> int:
+    row = (await db.execute(text(f"SELECT RebuiltThrough FROM SalesRollupState WHERE Id=1 {lock}"))).first()
+    return int(row[0]) if row else 0
+
+
+async def apply_order(order_id: int, kind: str):
+    # kind: "placed" adds the order's lines, "cancelled" subtracts them
+    sign = 1 if kind == "placed" else -1
+    async with AsyncSessionLocal() as db, db.begin():
+        through = await _rebuilt_through(db, "FOR SHARE")
+        if kind == "placed" and order_id <= through:
+            return  # counted by the last rebuild
+        res = await db.execute(
+            text("INSERT IGNORE INTO SalesRollupApplied(OrderId, Kind) VALUES (:oid, :kind)"),
+            {"oid": order_id, "kind": kind},
+        )
+        if res.rowcount == 0:
+            return  # already applied
+
+        rows = (await db.execute(
+            text("""
+                SELECT DATE(o.OrderDate) AS d, l.ProductId, l.Quantity, COALESCE(l.UnitPrice, 0) AS UnitPrice
+                FROM `Order` o JOIN OrderContainsProduct l ON l.OrderId = o.OrderId
+                WHERE o.OrderId = :oid
+                ORDER BY l.ProductId
+            """),
+            {"oid": order_id},
+        )).mappings().all()
+        if rows:
+            # Sorted by product, so concurrent handlers lock rows in the same order
+            await db.execute(UPSERT_SQL, [
+                {"d": r["d"], "pid": r["ProductId"], "units": sign * r["Quantity"],
+                 "revenue": sign * r["Quantity"] * r["UnitPrice"], "orders": sign}
+                for r in rows
+            ])
+
+
+class _Aggregator:
+    # (day number, product) -> units, revenue in cents, lines
+
+    def __init__(self, use_numpy: bool):
+        self.use_numpy = use_numpy and _load_numpy()
+        self.product_index: dict[str, int] = {}
+        self.products: list[str] = []
+        self._parts: list[tuple] = []  # numpy: per-chunk partial sums
+        self._totals: dict[tuple[int, str], list[int]] = {}
+
+    def add(self, rows):
+        # rows: (day number, product id, quantity, price in cents)
+        if not self.use_numpy:
+            for day, pid, qty, cents in rows:
+                entry = self._totals.setdefault((day, pid), [0, 0, 0])
+                entry[0] += qty
+                entry[1] += qty * cents
+                entry[2] += 1
+            return
+
+        index = self.product_index
+        for _, pid, _, _ in rows:
+            if pid not in index:
+                index[pid] = len(self.products)
+                self.products.append(pid)
+        n = len(rows)
+        days = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+        pidx = np.fromiter((index[r[1]] for r in rows), dtype=np.int64, count=n)
+        qty = np.fromiter((r[2] for r in rows), dtype=np.int64, count=n)
+        cents = np.fromiter((r[3] for r in rows), dtype=np.int64, count=n)
+        self._parts.append(self._reduce((days << 32) | pidx, qty, qty * cents, np.ones(n, dtype=np.int64)))
+
+    @staticmethod
+    def _reduce(keys, units, revenue, lines):
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        size = len(uniq)
+        return (
+            uniq,
+            np.bincount(inverse, weights=units, minlength=size).astype(np.int64),
+            np.bincount(inverse, weights=revenue, minlength=size).astype(np.int64),
+            np.bincount(inverse, weights=lines, minlength=size).astype(np.int64),
+        )
+
+    def results(self):
+        # -> iterator of (day number, product id, units, revenue cents, lines)
+        if not self.use_numpy:
+            for (day, pid), (units, revenue, lines) in self._totals.items():
+                yield day, pid, units, revenue, lines
+            return
+        if not self._parts:
+            return
+        keys, units, revenue, lines = (np.concatenate(col) for col in zip(*self._parts))
+        keys, units, revenue, lines = self._reduce(keys, units, revenue, lines)
+        for key, u, r, c in zip(keys.tolist(), units.tolist(), revenue.tolist(), lines.tolist()):
+            yield key >> 32, self.products[key & 0xFFFFFFFF], u, r, c
+
+
+async def rebuild(use_numpy: bool = True) -> dict:
+    started = time.perf_counter()
+    agg = _Aggregator(use_numpy)
+    cancelled: list[int] = []
+    lines = 0
+
+    async with AsyncSessionLocal() as db:
+        snapshot = (await db.execute(
+            text("SELECT COALESCE(MAX(OrderId), 0) FROM `Order` WHERE OrderDate < NOW() - INTERVAL :lag SECOND"),
+            {"lag": SNAPSHOT_LAG_SECONDS},
+        )).scalar_one()
+        result = await db.stream(
+            text("""
+                SELECT o.OrderId, o.Status = 'Cancelled' AS IsCancelled, TO_DAYS(o.OrderDate) AS d,
+                       l.ProductId, l.Quantity, ROUND(COALESCE(l.UnitPrice, 0) * 100) AS cents
+                FROM `Order` o JOIN OrderContainsProduct l ON l.OrderId = o.OrderId
+                WHERE o.OrderId <= :m
+            """),
+            {"m": snapshot},
+        )
+        async for chunk in result.partitions(ROLLUP_CHUNK_ROWS):
+            live = []
+            for oid, is_cancelled, day, pid, qty, cents in chunk:
+                if is_cancelled:
+                    cancelled.append(oid)
+                else:
+                    live.append((day, pid, int(qty), int(cents)))
+            agg.add(live)
+            lines += len(chunk)
+        await db.rollback()
+    aggregated = time.perf_counter()
+
+    rows = [
+        {"d": day, "pid": pid, "units": units, "revenue": Decimal(revenue) / 100, "orders": count}
+        for day, pid, units, revenue, count in agg.results()
+    ]
+    async with AsyncSessionLocal() as db, db.begin():
+        await _rebuilt_through(db, "FOR UPDATE")
+        await db.execute(text("DELETE FROM SalesDaily"))
+        await db.execute(text("DELETE FROM SalesRollupApplied"))
+        for start in range(0, len(rows), INSERT_BATCH):
+            await db.execute(
+                text("INSERT INTO SalesDaily(SaleDate, ProductId, Units, Revenue, Orders) VALUES (FROM_DAYS(:d), :pid, :units, :revenue, :orders)"),
+                rows[start:start + INSERT_BATCH],
+            )
+        # A cancellation already reflected here must not be subtracted again
+        cancelled_ids = sorted(set(cancelled))
+        for start in range(0, len(cancelled_ids), INSERT_BATCH):
+            await db.execute(
+                text("INSERT INTO SalesRollupApplied(OrderId, Kind) VALUES (:oid, 'cancelled')"),
+                [{"oid": oid} for oid in cancelled_ids[start:start + INSERT_BATCH]],
+            )
+        # Orders after the snapshot, straight in SQL and marked as applied
+        await db.execute(
+            text("""
+                INSERT INTO SalesDaily(SaleDate, ProductId, Units, Revenue, Orders)
+                SELECT DATE(o.OrderDate), l.ProductId, SUM(l.Quantity), SUM(l.Quantity * COALESCE(l.UnitPrice, 0)), COUNT(*)
+                FROM `Order` o JOIN OrderContainsProduct l ON l.OrderId = o.OrderId
+                WHERE o.OrderId > :m AND o.Status <> 'Cancelled'
+                GROUP BY DATE(o.OrderDate), l.ProductId
+                ON DUPLICATE KEY UPDATE
+                    Units = Units + VALUES(Units), Revenue = Revenue + VALUES(Revenue), Orders = Orders + VALUES(Orders)
+            """),
+            {"m": snapshot},
+        )
+        await db.execute(
+            text("INSERT IGNORE INTO SalesRollupApplied(OrderId, Kind) SELECT OrderId, 'placed' FROM `Order` WHERE OrderId > :m"),
+            {"m": snapshot},
+        )
+        await db.execute(
+            text("INSERT IGNORE INTO SalesRollupApplied(OrderId, Kind) SELECT OrderId, 'cancelled' FROM `Order` WHERE OrderId > :m AND Status = 'Cancelled'"),
+            {"m": snapshot},
+        )
+        await db.execute(
+            text("""
+                INSERT INTO SalesRollupState(Id, RebuiltThrough, RebuiltAt) VALUES (1, :m, NOW())
+                ON DUPLICATE KEY UPDATE RebuiltThrough = VALUES(RebuiltThrough), RebuiltAt = VALUES(RebuiltAt)
+            """),
+            {"m": snapshot},
+        )
+
+    report = {
+        "lines": lines,
+        "rows": len(rows),
+        "through": snapshot,
+        "aggregator": "numpy" if agg.use_numpy else "python",
+        "readSeconds": round(aggregated - started, 3),
+        "totalSeconds": round(time.perf_counter() - started, 3),
+    }
+    log.info(f"Sales rollup rebuilt: {report}")
+    return report
+
+
+# Reports
+
+def default_range(start: date | None, end: date | None, days: int = 30) -> tuple[date, date]:
+    end = end or date.today()
+    return start or end - timedelta(days=days - 1), end
+
+
+def _sales_dict(r) -> dict:
+    return {"units": int(r["Units"] or 0), "revenue": float(r["Revenue"] or 0), "orders": int(r["Orders"] or 0)}
+
+
+async def revenue(db: AsyncSession, group: str, start: date, end: date, order_by: str = "revenue", limit: int = 50) -> list[dict]:
+    params = {"s": start, "e": end, "n": limit}
+    sort = "Units" if order_by == "units" else "Revenue"
+    if group == "day":
+        sql = """
+            SELECT SaleDate AS k, SUM(Units) AS Units, SUM(Revenue) AS Revenue, SUM(Orders) AS Orders
+            FROM SalesDaily WHERE SaleDate BETWEEN :s AND :e
+            GROUP BY SaleDate ORDER BY SaleDate
+        """
+    elif group == "brand":
+        sql = f"""
+            SELECT COALESCE(p.Brand, '') AS k, SUM(s.Units) AS Units, SUM(s.Revenue) AS Revenue, SUM(s.Orders) AS Orders
+            FROM SalesDaily s JOIN Product p ON p.ProductId = s.ProductId
+            WHERE s.SaleDate BETWEEN :s AND :e
+            GROUP BY p.Brand ORDER BY {sort} DESC LIMIT :n
+        """
+    else:
+        sql = f"""
+            SELECT t.ProductId AS k, p.ProductName, p.Brand, t.Units, t.Revenue, t.Orders
+            FROM (
+                SELECT ProductId, SUM(Units) AS Units, SUM(Revenue) AS Revenue, SUM(Orders) AS Orders
+                FROM SalesDaily WHERE SaleDate BETWEEN :s AND :e
+                GROUP BY ProductId ORDER BY {sort} DESC LIMIT :n
+            ) t JOIN Product p ON p.ProductId = t.ProductId
+            ORDER BY t.{sort} DESC, t.ProductId
+        """
+    out = []
+    for r in (await db.execute(text(sql), params)).mappings():
+        item = {"key": str(r["k"]), **_sales_dict(r)}
+        if group == "product":
+            item["productName"] = r["ProductName"]
+            item["brand"] = r["Brand"]
+        out.append(item)
+    return out
+
+
+async def low_stock(db: AsyncSession, threshold: int, days: int, limit: int) -> list[dict]:
+    # Active products at or below threshold, with recent sales and days of cover
+    rows = (await db.execute(
+        text("""
+            SELECT p.ProductId, p.ProductName, p.Brand, p.Quantity, COALESCE(SUM(s.Units), 0) AS Units
+            FROM Product p
+            LEFT JOIN SalesDaily s ON s.ProductId = p.ProductId AND s.SaleDate >= :since
+            WHERE p.Status = 'Active' AND p.Quantity <= :t
+            GROUP BY p.ProductId, p.ProductName, p.Brand, p.Quantity
+            ORDER BY p.Quantity, Units DESC, p.ProductId
+            LIMIT :n
+        """),
+        {"since": date.today() - timedelta(days=days - 1), "t": threshold, "n": limit},
+    )).mappings().all()
+    out = []
+    for r in rows:
+        per_day = int(r["Units"]) / days
+        out.append({
+            "productId": r["ProductId"],
+            "productName": r["ProductName"],
+            "brand": r["Brand"],
+            "quantity": int(r["Quantity"] or 0),
+            "unitsSold": int(r["Units"]),
+            "daysOfCover": round(int(r["Quantity"] or 0) / per_day, 1) if per_day else None,
+        })
+    return out
+
+
+async def sell_through(db: AsyncSession, days: int, limit: int, ascending: bool = False) -> list[dict]:
+    # Units sold in the window / (units sold + units still in stock)
+    rows = (await db.execute(
+        text(f"""
+            SELECT p.ProductId, p.ProductName, p.Brand, p.Quantity, COALESCE(SUM(s.Units), 0) AS Units
+            FROM Product p
+            LEFT JOIN SalesDaily s ON s.ProductId = p.ProductId AND s.SaleDate >= :since
+            WHERE p.Status = 'Active'
+            GROUP BY p.ProductId, p.ProductName, p.Brand, p.Quantity
+            ORDER BY COALESCE(SUM(s.Units), 0) / NULLIF(COALESCE(SUM(s.Units), 0) + GREATEST(p.Quantity, 0), 0) {"ASC" if ascending else "DESC"}, p.ProductId
+            LIMIT :n
+        """),
+        {"since": date.today() - timedelta(days=days - 1), "n": limit},
+    )).mappings().all()
+    out = []
+    for r in rows:
+        units, stock = int(r["Units"]), max(int(r["Quantity"] or 0), 0)
+        out.append({
+            "productId": r["ProductId"],
+            "productName": r["ProductName"],
+            "brand": r["Brand"],
+            "quantity": stock,
+            "unitsSold": units,
+            "sellThrough": round(units / (units + stock), 4) if units + stock else 0.0,
+        })
+    return out
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sales rollup maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("rebuild", help="recompute SalesDaily from the order history")
+    p.add_argument("--no-numpy", action="store_true", help="aggregate in pure Python")
+    args = parser.parse_args()
+
+    print(asyncio.run(rebuild(not args.no_numpy)))
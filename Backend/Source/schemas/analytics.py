@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+
+class SalesRow(BaseModel):
+    key: str  # date, brand or product id, depending on the grouping
+    units: int
+    revenue: float
+    orders: int
+    productName: str | None = None
+    brand: str | None = None
+
+class LowStockRow(BaseModel):
+    productId: str
+    productName: str
+    brand: str | None = None
+    quantity: int
+    unitsSold: int
+    daysOfCover: float | None = None  # at the recent sales rate; None if nothing sold
+
+class SellThroughRow(BaseModel):
+    productId: str
+    productName: str
+    brand: str | None = None
+    quantity: int
+    unitsSold: int
+    sellThrough: float  # unitsSold / (unitsSold + quantity)
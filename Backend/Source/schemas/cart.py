@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+class CartItemIn(BaseModel):
+    productId: str = Field(min_length=1, max_length=20)
+    quantity: int = Field(ge=0)  # 0 removes the line when setting quantities
+
+class CartUpdateRequest(BaseModel):
+    items: List[CartItemIn] = Field(min_length=1)
+
+class CartItemOut(BaseModel):
+    productId: str
+    productName: str
+    unitPrice: float
+    quantity: int
+    lineTotal: float
+    available: bool
+
+class CartOut(BaseModel):
+    cartId: int
+    items: List[CartItemOut]
+    itemCount: int
+    subtotal: float
+    discount: float
+    total: float
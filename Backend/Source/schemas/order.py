@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List
+from datetime import date, datetime
 
 class OrderItemIn(BaseModel):
     productId: str 
@@ -13,7 +14,7 @@ class PlaceOrderRequest(BaseModel):
     recipientPhone: str
     address: str
     note: str | None = None
-    items: List[OrderItemIn]
+    items: List[OrderItemIn] = []  # empty: order the customer's saved cart
 
     customerId: int | None = None
 
@@ -34,3 +35,14 @@ class PlaceOrderResponse(BaseModel):
     subtotal: float
     discount: float
     total: float
+
+class OrderOut(BaseModel):
+    id: str
+    orderDate: datetime | None = None
+    intendedShipmentDate: date | None = None
+    status: str | None = None
+    recipientName: str | None = None
+    recipientContact: str | None = None
+    address: str | None = None
+    items: List[OrderItemOut]
+    total: float | None = None
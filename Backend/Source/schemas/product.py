@@ -16,6 +16,7 @@ class ProductOut(BaseModel):
     releaseDate: date | None = None
     status: Status | None = None
     imageBaseUrl: str | None = None  
+    imageUrls: dict[str, dict[str, str]] | None = None  # size -> format -> url
 
 class ProductCreate(BaseModel):
     productId: str = Field(min_length=1, max_length=20)
@@ -0,0 +1,228 @@
+# Synthetic data for benchmarks and load tests (see loadtest.py).
+# Generates products, customers (each with a cart), one staff account and
+# order history, deterministically from --seed, in batched multi-row inserts.
+# Rows are recognisable by their prefix (products BN..., users bench_...) and
+# removed again with --clean.
+#
+#   python -m Backend.Source.seed_data --schema --products 20000 --customers 2000 --orders 50000
+#
+# --schema (re)creates the database from Backend/Database/db_creation.sql
+# first, which DROPS the existing database.
+# Every generated account uses the password BENCH_PASSWORD.
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import text
+
+from . import password_hashing
+from .database_connection import DATABASE_URL, AsyncSessionLocal
+
+SCHEMA_FILE = Path(__file__).resolve().parents[1] / "Database" / "db_creation.sql"
+PRODUCT_PREFIX = "BN"
+USER_PREFIX = "bench_"
+STAFF_USERNAME = "bench_staff"
+BENCH_PASSWORD = "bench123"
+BATCH_SIZE = 1000
+
+BRANDS = ["Samsung", "Apple", "Xiaomi", "Sony", "LG", "Asus", "Dell", "Lenovo", "Oppo", "Panasonic"]
+KINDS = ["Phone", "Laptop", "Tablet", "TV", "Headphones", "Monitor", "Speaker", "Watch", "Camera", "Router"]
+ADJECTIVES = ["Pro", "Max", "Lite", "Ultra", "Plus", "Mini", "Air", "Neo", "Prime", "Edge"]
+COLORS = ["Black", "White", "Blue", "Silver", "Red", "Green"]
+ORDER_STATUSES = ["Pending", "Processing", "Delivered", "Delivered", "Delivered", "Cancelled"]
+
+
+def product_id(i: int) -> str:
+    return f"{PRODUCT_PREFIX}{i:07d}"
+
+
+def customer_username(i: int) -> str:
+    return f"{USER_PREFIX}c{i}"
+
+
+def _statements(sql: str):
+    # db_creation.sql has no procedures or triggers: statements end with ";" at end of line
+    buf = []
+    for line in sql.splitlines():
+        if not line.strip() or line.strip().startswith("--"):
+            continue
+        buf.append(line)
+        if line.rstrip().endswith(";"):
+            stmt = "\n".join(buf).strip()
+            buf = []
+            if stmt.rstrip(";").strip():
+                yield stmt
+
+
+def create_schema(path: Path = SCHEMA_FILE):
+    import pymysql
+    from sqlalchemy.engine import make_url
+
+    url = make_url(DATABASE_URL)
+    conn = pymysql.connect(
+        host=url.host or "localhost", port=url.port or 3306,
+        user=url.username, password=url.password or "", charset="utf8mb4",
+    )
+    try:
+        with conn.cursor() as cur:
+            for stmt in _statements(path.read_text(encoding="utf-8")):
+                cur.execute(stmt)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+async def _insert(db, sql: str, rows: list[dict]):
+    for start in range(0, len(rows), BATCH_SIZE):
+        await db.execute(text(sql), rows[start:start + BATCH_SIZE])
+
+
+def _products(rng: random.Random, n: int) -> list[dict]:
+    today = date.today()
+    rows = []
+    for i in range(n):
+        brand = rng.choice(BRANDS)
+        kind = rng.choice(KINDS)
+        rows.append({
+            "pid": product_id(i),
+            "name": f"{brand} {kind} {rng.choice(ADJECTIVES)} {i % 97}",
+            "brand": brand,
+            "price": rng.randrange(200, 50_000) * 1000,
+            "color": rng.choice(COLORS),
+            # Large stock, so long checkout runs do not sell out
+            "qty": rng.randrange(100_000, 1_000_000),
+            "spec": f"{kind} by {brand}, model year {2018 + i % 8}, {rng.choice(ADJECTIVES).lower()} edition",
+            "warranty": rng.choice([6, 12, 24]),
+            "release": today - timedelta(days=rng.randrange(0, 2000)),
+            "status": "Active" if rng.random() < 0.95 else "Deactivated",
+        })
+    return rows
+
+
+async def seed(products: int, customers: int, orders: int, seed_value: int = 42):
+    rng = random.Random(seed_value)
+    password = password_hashing.hash_password_sync(BENCH_PASSWORD)
+    started = time.perf_counter()
+
+    async with AsyncSessionLocal() as db:
+        product_rows = _products(rng, products)
+        await _insert(db, """
+            INSERT INTO Product(ProductId, ProductName, Brand, Price, Color, Quantity, Specification, WarrantyPeriod, ReleaseDate, Status)
+            VALUES (:pid, :name, :brand, :price, :color, :qty, :spec, :warranty, :release, :status)
+        """, product_rows)
+
+        # Built per batch: a million customers (accounts.py benchmark) would not fit in one list comfortably
+        for start in range(0, customers, BATCH_SIZE):
+            await _insert(db, """
+                INSERT INTO Customer(Username, Password, Name, Email, PhoneNumber)
+                VALUES (:u, :p, :name, :email, :phone)
+            """, [
+                {"u": customer_username(i), "p": password, "name": f"Bench Customer {i}",
+                 "email": f"{customer_username(i)}@bench.local", "phone": f"09{i:08d}"}
+                for i in range(start, min(start + BATCH_SIZE, customers))
+            ])
+        await db.execute(text("""
+            INSERT INTO StoreStaff(Username, Password, Name, Email, Position, Department, HiredDate, Status)
+            VALUES (:u, :p, 'Bench Staff', 'bench_staff@bench.local', 'Staff', 'Bench', CURDATE(), 'Active')
+        """), {"u": STAFF_USERNAME, "p": password})
+
+        rows = (await db.execute(
+            text("SELECT Id FROM Customer WHERE Username LIKE :p ORDER BY Id"), {"p": USER_PREFIX + "%"},
+        )).all()
+        customer_ids = [r[0] for r in rows]
+        await _insert(db, "INSERT INTO Cart(CustomerId) VALUES (:cid)", [{"cid": cid} for cid in customer_ids])
+        rows = (await db.execute(
+            text("SELECT c.CustomerId, MIN(c.CartId) FROM Cart c JOIN Customer u ON u.Id = c.CustomerId WHERE u.Username LIKE :p GROUP BY c.CustomerId"),
+            {"p": USER_PREFIX + "%"},
+        )).all()
+        carts = dict(rows)
+        await db.commit()
+
+        # Order rows one by one (their ids are needed for the lines), lines
+        # in multi-row batches, one commit per chunk
+        active = [p for p in product_rows if p["status"] == "Active"] or product_rows
+        now = datetime.now()
+        made = 0
+        while made < orders and customer_ids and active:
+            chunk = min(BATCH_SIZE, orders - made)
+            order_rows, line_sets = [], []
+            for _ in range(chunk):
+                cid = rng.choice(customer_ids)
+                lines = {p["pid"]: (rng.randrange(1, 4), p["price"]) for p in rng.sample(active, min(rng.randrange(1, 5), len(active)))}
+                total = sum(q * price for q, price in lines.values())
+                order_rows.append({
+                    "cid": cid, "cart": carts[cid],
+                    "date": now - timedelta(seconds=rng.randrange(0, 365 * 24 * 3600)),
+                    "status": rng.choice(ORDER_STATUSES), "total": total,
+                })
+                line_sets.append(lines)
+            order_ids = []
+            for row in order_rows:
+                res = await db.execute(text("""
+                    INSERT INTO `Order`(CustomerId, CartId, OrderDate, IntendedShipmentDate, RecipientName, ShipmentAddress, Status, Total)
+                    VALUES (:cid, :cart, :date, DATE(:date) + INTERVAL 2 DAY, 'Bench', 'Bench address', :status, :total)
+                """), row)
+                order_ids.append(int(res.lastrowid))
+            await _insert(db, "INSERT INTO OrderContainsProduct(OrderId, ProductId, Quantity, UnitPrice) VALUES (:oid, :pid, :q, :price)", [
+                {"oid": oid, "pid": pid, "q": q, "price": price}
+                for oid, lines in zip(order_ids, line_sets) for pid, (q, price) in lines.items()
+            ])
+            await db.commit()
+            made += chunk
+
+    elapsed = time.perf_counter() - started
+    print(f"Seeded {products} products, {customers} customers, {made} orders in {elapsed:.1f}s (seed {seed_value})")
+
+
+async def clean():
+    like = {"p": USER_PREFIX + "%", "pp": PRODUCT_PREFIX + "%"}
+    async with AsyncSessionLocal() as db:
+        customers = "SELECT Id FROM Customer WHERE Username LIKE :p"
+        orders = f"SELECT OrderId FROM `Order` WHERE CustomerId IN ({customers})"
+        for stmt in (
+            f"DELETE FROM OrderContainsProduct WHERE OrderId IN ({orders})",
+            f"DELETE FROM StockReservation WHERE OrderId IN ({orders})",
+            "DELETE FROM OrderContainsProduct WHERE ProductId LIKE :pp",
+            "DELETE FROM StockReservation WHERE ProductId LIKE :pp",
+            f"DELETE FROM `Order` WHERE CustomerId IN ({customers})",
+            "DELETE FROM CartContainsProduct WHERE ProductId LIKE :pp",
+            f"DELETE FROM CartContainsProduct WHERE CustomerId IN ({customers})",
+            f"DELETE FROM IdempotencyKey WHERE CustomerId IN ({customers})",
+            f"DELETE FROM Cart WHERE CustomerId IN ({customers})",
+            "DELETE FROM Customer WHERE Username LIKE :p",
+            "DELETE FROM StoreStaff WHERE Username LIKE :p",
+            "DELETE FROM Product WHERE ProductId LIKE :pp",
+        ):
+            await db.execute(text(stmt), like)
+        await db.commit()
+    print("Removed generated benchmark data")
+
+
+async def _run(args):
+    if args.clean and not args.schema:
+        await clean()
+    await seed(args.products, args.customers, args.orders, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark data")
+    parser.add_argument("--schema", action="store_true", help="recreate the database from db_creation.sql first (drops it)")
+    parser.add_argument("--clean", action="store_true", help="remove previously generated rows first")
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--customers", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.schema:
+        create_schema()
+        print(f"Created the database from {SCHEMA_FILE.name}")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
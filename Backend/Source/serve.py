@@ -0,0 +1,133 @@
+# Production entry point: the API under several worker processes.
+#
+#   python -m Backend.Source.serve [--workers 8] [--port 8000] [--gunicorn]
+#
+# Each worker is a separate process with its own connection pool
+# (DB_POOL_SIZE + DB_MAX_OVERFLOW), caches and background tasks, and only
+# starts taking requests once its lifespan warm-up in app.py is done.
+#
+# Workers default to WEB_CONCURRENCY, else to the number of cores when the
+# catalog cache is shared (PRODUCT_CACHE_REDIS_URL), else to 1. With the
+# in-process cache a worker never hears about another worker's product
+# write, so it serves the old product for up to PRODUCT_CACHE_TTL seconds.
+# Without RATE_LIMIT_REDIS_URL every worker applies the admission limits on
+# its own. The worker count is exported as WEB_CONCURRENCY, which sizes
+# HASH_WORKERS. With several workers, the image index is rescanned every
+# IMAGE_INDEX_POLL_SECONDS (default 30 here); each worker's search index
+# picks up other workers' edits every SEARCH_SYNC_SECONDS.
+#
+# On SIGTERM workers report 503 on /ready, wait DRAIN_SECONDS, then finish
+# in-flight requests for up to GRACEFUL_TIMEOUT seconds before exiting.
+#
+# uvicorn (in requirements.txt) runs the workers by default; --gunicorn uses
+# gunicorn's process manager with uvicorn workers (`pip install gunicorn`).
+
+import argparse
+import os
+import secrets
+import sys
+
+APP = "Backend.Source.app:app"
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# Multi-worker defaults, applied unless set
+MULTI_WORKER_ENV = {"IMAGE_INDEX_POLL_SECONDS": "30"}
+
+
+def _default_workers() -> int:
+    if os.getenv("WEB_CONCURRENCY"):
+        return int(os.environ["WEB_CONCURRENCY"])
+    return (os.cpu_count() or 1) if os.getenv("PRODUCT_CACHE_REDIS_URL") else 1
+
+
+def _worker_env(workers: int):
+    # Read by the workers at import: password_hashing, image_index
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    if workers < 2:
+        return
+    for name, value in MULTI_WORKER_ENV.items():
+        os.environ.setdefault(name, value)
+    if not os.getenv("PRODUCT_CACHE_REDIS_URL"):
+        print("PRODUCT_CACHE_REDIS_URL is not set: each worker caches the catalog on its own, and other "
+              "workers can serve a product for up to PRODUCT_CACHE_TTL seconds after it changed", file=sys.stderr)
+    if not os.getenv("RATE_LIMIT_REDIS_URL"):
+        print(f"RATE_LIMIT_REDIS_URL is not set: admission rate limits apply per worker ({workers}x per client)",
+              file=sys.stderr)
+
+
+def _shared_secret(workers: int):
+    # Tokens signed by one worker must verify on the others, so a development
+    # secret is generated once here rather than per worker
+    if workers > 1 and not os.getenv("JWT_SECRET") and os.getenv("JWT_DEV_SECRET", "0") in ("1", "true", "yes"):
+        os.environ["JWT_SECRET"] = secrets.token_urlsafe(32)
+        print("JWT_SECRET is not set: using a random secret shared by the workers until restart", file=sys.stderr)
+
+
+def _pool_note(workers: int):
+    pool = int(os.getenv("DB_POOL_SIZE", "10")) + int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    print(f"Starting {workers} worker(s), up to {workers * pool} database connections in total "
+          f"(check MySQL max_connections)", file=sys.stderr)
+
+
+def run_uvicorn(args):
+    import uvicorn
+
+    uvicorn.run(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        access_log=args.access_log,
+        proxy_headers=True,
+    )
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    try:
+        import uvicorn_worker  # noqa: F401  newer home of the worker class
+        worker_class = "uvicorn_worker.UvicornWorker"
+    except ImportError:
+        worker_class = "uvicorn.workers.UvicornWorker"
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in {
+                "bind": f"{args.host}:{args.port}",
+                "workers": args.workers,
+                "worker_class": worker_class,
+                "graceful_timeout": GRACEFUL_TIMEOUT,
+                "accesslog": "-" if args.access_log else None,
+                # Not preloaded: every worker must open its own pools and tasks
+                "preload_app": False,
+            }.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from .app import app
+            return app
+
+    Server().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=_default_workers())
+    parser.add_argument("--access-log", action="store_true", help="log every request (off: /metrics has the numbers)")
+    parser.add_argument("--gunicorn", action="store_true", help="use gunicorn as the process manager")
+    args = parser.parse_args()
+
+    _worker_env(args.workers)
+    _shared_secret(args.workers)
+    _pool_note(args.workers)
+    if args.gunicorn:
+        run_gunicorn(args)
+    else:
+        run_uvicorn(args)
+
+
+if __name__ == "__main__":
+    main()
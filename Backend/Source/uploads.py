@@ -0,0 +1,75 @@
+# Product image uploads.
+# Copies the upload in chunks into a temp file next to its destination,
+# enforcing MAX_IMAGE_BYTES and checking the real file type from its magic
+# bytes, then fsyncs and renames it into place so readers only ever see the
+# old file or the complete new one. Blocking; call through run_in_threadpool.
+
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO
+
+from fastapi import HTTPException
+
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(10 * 1024 * 1024)))
+CHUNK_SIZE = 1024 * 1024
+
+
+def sniff_image_ext(head: bytes) -> str | None:
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def _fsync_dir(folder: Path):
+    # Persist the rename itself (no-op where directories can't be opened)
+    try:
+        fd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def save_image_upload(src: BinaryIO, folder: Path, stem: str = "1", max_bytes: int = MAX_IMAGE_BYTES) -> Path:
+    folder.mkdir(parents=True, exist_ok=True)
+
+    chunk = src.read(CHUNK_SIZE)
+    ext = sniff_image_ext(chunk[:16])
+    if ext is None:
+        raise HTTPException(status_code=415, detail="Unsupported image type (JPEG, PNG or WebP expected)")
+
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=f".{stem}.", suffix=".part")
+    try:
+        size = 0
+        with os.fdopen(fd, "wb") as out:
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Image larger than {max_bytes // (1024 * 1024)} MB")
+                out.write(chunk)
+                chunk = src.read(CHUNK_SIZE)
+            out.flush()
+            os.fsync(out.fileno())
+
+        os.chmod(tmp, 0o644)
+        dest = folder / f"{stem}{ext}"
+        os.replace(tmp, dest)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+    _fsync_dir(folder)
+    return dest
+
@@ -0,0 +1,4 @@
+# Benchmarks for the changes in Backend.Source, one module per area:
+#   python -m Backend.benchmarks.<module> --help
+# They only use the public API of Backend.Source and configure it through
+# the same environment variables as the server (see README.md).
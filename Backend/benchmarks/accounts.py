@@ -0,0 +1,87 @@
+# Customer lookup latency: the old "Username = :u OR Email = :u" query
+# against the UNION probes of accounts.LOOKUP_SQL, for existing usernames,
+# existing emails and unknown names, plus unknown names answered by the
+# negative cache. bcrypt is timed separately since it dominates a
+# successful login. Needs MySQL with generated customers:
+#   python -m Backend.Source.seed_data --customers 1000000 --products 0 --orders 0
+#   python -m Backend.benchmarks.accounts -n 2000
+
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import text
+
+from Backend.Source import password_hashing
+from Backend.Source.accounts import LOOKUP_SQL, find_account
+from Backend.Source.database_connection import AsyncSessionLocal
+from Backend.Source.seed_data import BENCH_PASSWORD, USER_PREFIX, customer_username
+
+from .common import summarize
+
+OR_SQL = text("SELECT Id, Username, Password, Name, Email FROM Customer WHERE Username = :u OR Email = :u LIMIT 1")
+
+
+async def run(n: int):
+    union_sql = text(LOOKUP_SQL.format(table="Customer"))
+    rng = random.Random(1)
+
+    async with AsyncSessionLocal() as db:
+        total = (await db.execute(text("SELECT COUNT(*) FROM Customer"))).scalar()
+        seeded = (await db.execute(
+            text("SELECT COUNT(*) FROM Customer WHERE Username LIKE :p"), {"p": USER_PREFIX + "%"},
+        )).scalar()
+        if not seeded:
+            print("No generated customers; run seed_data first")
+            return
+        print(f"{total:,} customers ({seeded:,} generated), {n} lookups per case")
+
+        def names(kind):
+            for _ in range(n):
+                name = customer_username(rng.randrange(seeded))
+                if kind == "email":
+                    yield name + "@bench.local"
+                elif kind == "unknown":
+                    yield f"nobody{rng.randrange(10**9)}@example.com"
+                else:
+                    yield name
+
+        async def timed(label, lookup, kind):
+            timings = []
+            for name in names(kind):
+                started = time.perf_counter()
+                await lookup(name)
+                timings.append(time.perf_counter() - started)
+            r = summarize(timings)
+            print(f"{label:>24}: mean {r['mean_ms']:8.3f} ms  p99 {r['p99_ms']:8.3f} ms")
+
+        for kind in ("username", "email", "unknown"):
+            await timed(f"OR query / {kind}", lambda u: db.execute(OR_SQL, {"u": u}), kind)
+            await timed(f"UNION probes / {kind}", lambda u: db.execute(union_sql, {"u": u}), kind)
+
+        repeated = [f"nobody{i}@example.com" for i in range(100)]
+        for name in repeated:
+            await find_account(db, "customer", name)
+
+        async def cached(_):
+            await find_account(db, "customer", rng.choice(repeated))
+
+        await timed("negative cache / unknown", cached, "unknown")
+
+    hashed = await password_hashing.hash_password(BENCH_PASSWORD)
+    started = time.perf_counter()
+    for _ in range(20):
+        await password_hashing.verify_password(BENCH_PASSWORD, hashed)
+    print(f"{'bcrypt verify':>24}: mean {(time.perf_counter() - started) / 20 * 1000:8.3f} ms")
+    password_hashing.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login account lookups (needs MySQL)")
+    parser.add_argument("-n", type=int, default=2000)
+    asyncio.run(run(parser.parse_args().n))
+
+
+if __name__ == "__main__":
+    main()
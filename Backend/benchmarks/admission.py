@@ -0,0 +1,76 @@
+# Good-client latency under an abusive load, on a simulated connection pool
+# (no database needed): one abusive IP hammers checkout with `abusers`
+# concurrent loops while a well-behaved client browses and checks out at a
+# human pace, unprotected and behind AdmissionMiddleware:
+#   python -m Backend.benchmarks.admission --abusers 200 --duration 5
+
+import argparse
+import asyncio
+import time
+
+from Backend.Source.admission import LIMITS, AdmissionMiddleware, MemoryStore, request
+from Backend.Source.database_connection import MAX_OVERFLOW, POOL_SIZE
+
+from .common import summarize
+
+
+async def simulate(abusers: int, duration: float, service_ms: float, protected: bool) -> dict:
+    # The app holds one of POOL_SIZE + MAX_OVERFLOW simulated connections for service_ms
+    capacity = POOL_SIZE + MAX_OVERFLOW
+    pool = asyncio.Semaphore(capacity)
+
+    async def app(scope, receive, send):
+        async with pool:
+            await asyncio.sleep(service_ms / 1000)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    handler = AdmissionMiddleware(app, store=MemoryStore(), limits=dict(LIMITS), pool_capacity=capacity) if protected else app
+
+    deadline = time.monotonic() + duration
+    abuser_statuses: dict[int, int] = {}
+    good: list[tuple[float, int]] = []
+
+    async def abuser():
+        while time.monotonic() < deadline:
+            status, _ = await request(handler, "POST", "/buyer/orders/checkout", "10.0.0.66")
+            abuser_statuses[status] = abuser_statuses.get(status, 0) + 1
+            await asyncio.sleep(0.001)  # network round trip
+
+    async def well_behaved():
+        step = 0
+        while time.monotonic() < deadline:
+            path, method = ("/buyer/orders/checkout", "POST") if step % 5 == 4 else ("/buyer/products", "GET")
+            started = time.perf_counter()
+            status, _ = await request(handler, method, path, "10.0.0.7")
+            good.append((time.perf_counter() - started, status))
+            step += 1
+            await asyncio.sleep(0.1)
+
+    await asyncio.gather(well_behaved(), *(abuser() for _ in range(abusers)))
+
+    r = summarize([t for t, _ in good])
+    return {
+        "p50_ms": r["p50_ms"],
+        "p99_ms": r["p99_ms"],
+        "ok": sum(1 for _, s in good if s == 200),
+        "requests": len(good),
+        "abuser": dict(sorted(abuser_statuses.items())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Good-client latency under an abusive load, simulated pool")
+    parser.add_argument("--abusers", type=int, default=200, help="concurrent request loops of the abusive client")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--service-ms", type=float, default=20, help="time a request holds a pooled connection")
+    args = parser.parse_args()
+    for protected in (False, True):
+        r = asyncio.run(simulate(args.abusers, args.duration, args.service_ms, protected))
+        label = "with admission control" if protected else "unprotected"
+        print(f"{label:>24}: good client p50 {r['p50_ms']:7.1f} ms  p99 {r['p99_ms']:7.1f} ms  "
+              f"ok {r['ok']}/{r['requests']}  abuser {r['abuser']}")
+
+
+if __name__ == "__main__":
+    main()
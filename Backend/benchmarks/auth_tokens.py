@@ -0,0 +1,58 @@
+# Authentications per second: a cached token, a signature check (every
+# token new to the claims cache) and, with --db, the per-request account
+# lookup that token claims replace (needs MySQL):
+#   python -m Backend.benchmarks.auth_tokens -n 20000 [--db]
+
+import argparse
+import asyncio
+import os
+import time
+
+from sqlalchemy import text
+
+# Before Backend.Source is imported: tokens are signed with a throwaway secret
+os.environ.setdefault("JWT_DEV_SECRET", "1")
+
+
+def report(name: str, n: int, elapsed: float):
+    print(f"{name:>10}: {n / elapsed:,.0f} auth/s")
+
+
+async def db_lookups(n: int) -> float:
+    from Backend.Source.database_connection import AsyncSessionLocal
+
+    sql = text("SELECT Id, Username FROM Customer WHERE Id=:id")
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        for _ in range(n):
+            (await db.execute(sql, {"id": 1})).first()
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark token authentication")
+    parser.add_argument("-n", type=int, default=20_000)
+    parser.add_argument("--db", action="store_true", help="include the DB-lookup baseline (needs MySQL)")
+    args = parser.parse_args()
+
+    from Backend.Source.auth_tokens import create_access_token, decode_token
+
+    token = create_access_token(1, "customer", "bench")
+    started = time.perf_counter()
+    for _ in range(args.n):
+        decode_token(token)
+    report("cached", args.n, time.perf_counter() - started)
+
+    # Each token is decoded once, so every decode misses the cache
+    tokens = [create_access_token(i, "customer", "bench") for i in range(args.n)]
+    started = time.perf_counter()
+    for t in tokens:
+        decode_token(t)
+    report("uncached", args.n, time.perf_counter() - started)
+
+    if args.db:
+        report("db lookup", args.n, asyncio.run(db_lookups(args.n)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Cart mutation throughput: n quantity changes written one line per
+# statement and commit, against cart_store.set_items() for a whole cart at
+# a time, then summary latency cold and cached. The cart is emptied
+# afterwards. Needs MySQL; the customer and products default to the first
+# ones in the database:
+#   python -m Backend.benchmarks.cart_store [--customer 1] [--products PH_IP15_BLU,TV_SO50_4K]
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from Backend.Source import cart_store
+from Backend.Source.database_connection import AsyncSessionLocal
+
+
+async def run(customer_id: int | None, product_ids: list[str] | None, n: int):
+    async with AsyncSessionLocal() as db:
+        if customer_id is None:
+            customer_id = (await db.execute(text("SELECT MIN(Id) FROM Customer"))).scalar()
+        if not product_ids:
+            product_ids = (await db.execute(
+                text("SELECT ProductId FROM Product WHERE Status='Active' ORDER BY ProductId LIMIT 5")
+            )).scalars().all()
+        if customer_id is None or not product_ids:
+            raise SystemExit("Needs a customer and active products: load db_creation.sql first")
+
+        cart_id = await cart_store.get_or_create_cart(db, customer_id)
+        await db.commit()
+
+        started = time.perf_counter()
+        for i in range(n):
+            pid = product_ids[i % len(product_ids)]
+            await db.execute(cart_store.SET_SQL, {"pid": pid, "cid": customer_id, "cartid": cart_id, "q": i % 5 + 1})
+            await db.commit()
+        direct = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for i in range(0, n, len(product_ids)):
+            await cart_store.set_items(db, cart_id, customer_id, {pid: i % 5 + 1 for pid in product_ids})
+        batched = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await cart_store.summary(db, cart_id)
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        await cart_store.summary(db, cart_id)
+        warm = time.perf_counter() - started
+
+        await cart_store.clear(db, cart_id)
+
+    print(f"  per line: {n / direct:,.0f} changes/s")
+    print(f"  per cart: {n / batched:,.0f} changes/s ({len(product_ids)} lines per request)")
+    print(f"   summary: {cold * 1000:.2f} ms cold, {warm * 1000:.3f} ms cached")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cart mutations (needs MySQL)")
+    parser.add_argument("--customer", type=int, help="customer id (default: the first customer)")
+    parser.add_argument("--products", help="comma-separated product ids (default: the first 5 active products)")
+    parser.add_argument("-n", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.customer, args.products.split(",") if args.products else None, args.n))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# Stock taking at checkout, only the stock step (no order rows are written).
+# The stock of the products used is restored afterwards. Needs MySQL.
+#
+# Overlapping carts: several hundred simultaneous checkouts of `lines`
+# products each, drawn from the first `products` products, so carts overlap.
+# Compares carts/s, time spent in locking statements and the deadlocks /
+# lock wait timeouts MySQL reported:
+#   per-line     SELECT ... FOR UPDATE + UPDATE per line in cart order (the old checkout)
+#   batched      one SELECT ... IN (...) FOR UPDATE in ProductId order + one UPDATE
+#   conditional  inventory.decrement(): one UPDATE ... WHERE Quantity >= :q
+#   python -m Backend.benchmarks.checkout --carts 500 --lines 5 --products 50
+#
+# Hot product: every buyer wants one unit of the same product. Orders/s for
+# row locking, the conditional UPDATE and the in-memory ledger, and a check
+# that sold == stock taken (no oversell):
+#   python -m Backend.benchmarks.checkout --product PH_IP15_BLU --stock 500 --buyers 1000
+
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import OperationalError
+
+from Backend.Source import inventory
+from Backend.Source.database_connection import AsyncSessionLocal
+
+from .common import percentile
+
+QUANTITIES_SQL = text("SELECT ProductId, Quantity FROM Product WHERE ProductId IN :pids").bindparams(
+    bindparam("pids", expanding=True)
+)
+
+
+async def restore(quantities: dict[str, int]):
+    async with AsyncSessionLocal() as db, db.begin():
+        await db.execute(
+            text("UPDATE Product SET Quantity=:q WHERE ProductId=:pid"),
+            [{"q": q, "pid": pid} for pid, q in quantities.items()],
+        )
+
+
+async def per_line(db, wanted, waited):
+    for pid, qty in wanted.items():
+        started = time.perf_counter()
+        await db.execute(text("SELECT Quantity FROM Product WHERE ProductId=:pid FOR UPDATE"), {"pid": pid})
+        waited.append(time.perf_counter() - started)
+        await db.execute(text("UPDATE Product SET Quantity = Quantity - :q WHERE ProductId=:pid"), {"q": qty, "pid": pid})
+
+
+async def batched(db, wanted, waited):
+    ordered = sorted(wanted)
+    started = time.perf_counter()
+    await db.execute(
+        text("SELECT Quantity FROM Product WHERE ProductId IN :pids ORDER BY ProductId FOR UPDATE")
+        .bindparams(bindparam("pids", expanding=True)),
+        {"pids": ordered},
+    )
+    waited.append(time.perf_counter() - started)
+    cases = " ".join(f"WHEN :pid{i} THEN :q{i}" for i in range(len(ordered)))
+    params = {"pids": ordered}
+    for i, pid in enumerate(ordered):
+        params[f"pid{i}"] = pid
+        params[f"q{i}"] = wanted[pid]
+    await db.execute(
+        text(f"UPDATE Product SET Quantity = Quantity - CASE ProductId {cases} END WHERE ProductId IN :pids")
+        .bindparams(bindparam("pids", expanding=True)),
+        params,
+    )
+
+
+async def conditional(db, wanted, waited):
+    started = time.perf_counter()
+    await inventory.decrement(db, wanted)
+    waited.append(time.perf_counter() - started)
+
+
+async def overlapping_carts(carts: int, lines: int, products: int):
+    async with AsyncSessionLocal() as db:
+        pids = list((await db.execute(
+            text("SELECT ProductId FROM Product ORDER BY ProductId LIMIT :n"), {"n": products},
+        )).scalars())
+        original = dict((await db.execute(QUANTITIES_SQL, {"pids": pids})).all()) if pids else {}
+    if len(pids) < max(products, lines):
+        print(f"Only {len(pids)} products found, {max(products, lines)} needed")
+        return
+
+    rng = random.Random(1)
+    orders = [{pid: rng.randrange(1, 3) for pid in rng.sample(pids, lines)} for _ in range(carts)]
+
+    try:
+        for name, step in (("per-line", per_line), ("batched", batched), ("conditional", conditional)):
+            await restore(original)
+            waited: list[float] = []
+            errors = {"deadlocks": 0, "lock timeouts": 0}
+
+            async def checkout(wanted):
+                try:
+                    async with AsyncSessionLocal() as db, db.begin():
+                        await step(db, wanted, waited)
+                    return True
+                except OperationalError as e:
+                    code = e.orig.args[0] if e.orig and e.orig.args else None
+                    if code == 1213:
+                        errors["deadlocks"] += 1
+                    elif code == 1205:
+                        errors["lock timeouts"] += 1
+                    else:
+                        raise
+                    return False
+
+            started = time.perf_counter()
+            results = await asyncio.gather(*(checkout(wanted) for wanted in orders))
+            elapsed = time.perf_counter() - started
+            waited.sort()
+            print(f"{name:>11}: {sum(results)}/{carts} carts, {carts / elapsed:,.0f} carts/s, "
+                  f"lock wait total {sum(waited):.2f} s p99 {percentile(waited, 99) * 1000:.1f} ms, "
+                  f"{errors['deadlocks']} deadlocks, {errors['lock timeouts']} lock timeouts")
+    finally:
+        await restore(original)
+
+
+async def hot_product(product_id: str, stock: int, buyers: int):
+    async with AsyncSessionLocal() as db:
+        original = dict((await db.execute(QUANTITIES_SQL, {"pids": [product_id]})).all())
+    if not original:
+        print(f"Product {product_id} not found")
+        return
+
+    async def left() -> int:
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(text("SELECT Quantity FROM Product WHERE ProductId=:pid"), {"pid": product_id})).scalar_one()
+
+    async def buy_locked() -> bool:
+        async with AsyncSessionLocal() as db, db.begin():
+            qty = (await db.execute(text("SELECT Quantity FROM Product WHERE ProductId=:pid FOR UPDATE"), {"pid": product_id})).scalar_one()
+            if qty < 1:
+                return False
+            await db.execute(text("UPDATE Product SET Quantity = Quantity - 1 WHERE ProductId=:pid"), {"pid": product_id})
+            return True
+
+    async def buy_conditional() -> bool:
+        async with AsyncSessionLocal() as db, db.begin():
+            return await inventory.decrement(db, {product_id: 1})
+
+    ledger = inventory.StockLedger()
+    queue: list[int] = []
+
+    async def buy_ledger() -> bool:
+        # Reserve in memory; the reconciler below applies the batches
+        if ledger.reserve({product_id: 1}, {product_id: stock}) is not None:
+            return False
+        queue.append(1)
+        return True
+
+    async def reconciler(stop: asyncio.Event):
+        while True:
+            taken = len(queue)
+            del queue[:taken]
+            if taken:
+                async with AsyncSessionLocal() as db, db.begin():
+                    if not await inventory.decrement(db, {product_id: taken}):
+                        raise RuntimeError("ledger oversold")
+                ledger.settle({product_id: taken}, {product_id: await left()})
+            elif stop.is_set():
+                return
+            await asyncio.sleep(inventory.RECONCILE_SECONDS)
+
+    try:
+        for name, buy in (("lock", buy_locked), ("conditional", buy_conditional), ("ledger", buy_ledger)):
+            await restore({product_id: stock})
+            stop = asyncio.Event()
+            task = asyncio.create_task(reconciler(stop)) if name == "ledger" else None
+
+            started = time.perf_counter()
+            results = await asyncio.gather(*(buy() for _ in range(buyers)))
+            elapsed = time.perf_counter() - started
+            if task:
+                stop.set()
+                await task
+
+            remaining = await left()
+            sold = sum(results)
+            ok = remaining >= 0 and sold == stock - remaining and sold <= stock
+            print(f"{name:>11}: {sold} sold, {remaining} left, {buyers / elapsed:,.0f} orders/s, "
+                  f"{'no oversell' if ok else 'OVERSOLD'}")
+    finally:
+        await restore(original)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkout stock-taking benchmark (needs MySQL)")
+    parser.add_argument("--carts", type=int, help="overlapping multi-line carts")
+    parser.add_argument("--lines", type=int, default=5, help="products per cart (--carts)")
+    parser.add_argument("--products", type=int, default=50, help="products the carts draw from (--carts)")
+    parser.add_argument("--product", help="hot product id (single-product run)")
+    parser.add_argument("--stock", type=int, default=500)
+    parser.add_argument("--buyers", type=int, default=1000)
+    args = parser.parse_args()
+    if args.carts:
+        asyncio.run(overlapping_carts(args.carts, args.lines, args.products))
+    elif args.product:
+        asyncio.run(hot_product(args.product, args.stock, args.buyers))
+    else:
+        parser.error("--carts or --product is required")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# Helpers shared by the benchmarks
+
+import asyncio
+import math
+import os
+import subprocess
+import sys
+import time
+
+
+def require(module: str, package: str | None = None):
+    # Optional dependency of a benchmark: import it or exit with the pip hint
+    try:
+        return __import__(module)
+    except ImportError:
+        sys.exit(f"This benchmark needs {package or module}: pip install {package or module}")
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    # Nearest rank
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list[float], errors: int = 0, seconds: float = 0.0) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / seconds, 2) if seconds else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+    }
+
+
+async def loop_lag(until, interval: float = 0.01) -> list[float]:
+    # How late an `interval` timer fires, until `until()` is true: what every
+    # other request on the event loop waits
+    lags = []
+    while not until():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+    return lags
+
+
+def rerun(module: str, args: list[str], env: dict[str, str]):
+    # Runs a benchmark module again in a fresh interpreter, for settings that
+    # Backend.Source reads from the environment at import
+    subprocess.run([sys.executable, "-m", module, *args], env={**os.environ, **env}, check=True)
@@ -0,0 +1,131 @@
+# The same read endpoint served three ways to `clients` concurrent clients
+# through an in-process ASGI transport:
+#   sync in async def  blocking session inside an async handler (the old routers)
+#   sync in def        blocking session in FastAPI's thread pool
+#   async              AsyncSession on an async engine (the current routers)
+#
+# Without --url a temporary SQLite file stands in for MySQL, with
+# --latency-ms added per query (sleeping with the connection held) for the
+# network round trip a real server has. aiosqlite runs every connection on
+# its own thread, so the async numbers only mean much against MySQL.
+# "loop lag" is how late a 10 ms timer fires on the event loop. A blocked
+# loop also delays the clients before they start their timers, so for
+# "sync in async def" the loop lag, not the request latency, is what other
+# requests on the worker wait. Needs httpx:
+#   python -m Backend.benchmarks.database_connection --clients 500 [--url mysql+pymysql://...]
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from Backend.Source.database_connection import MAX_OVERFLOW, POOL_SIZE, async_url
+
+from .common import loop_lag, require, summarize
+
+SQL = text("SELECT ProductId, ProductName FROM Product ORDER BY ProductId LIMIT 20")
+
+
+def sqlite_database(path: str) -> str:
+    url = f"sqlite:///{path}"
+    setup = create_engine(url)
+    with setup.begin() as conn:
+        conn.execute(text("CREATE TABLE Product(ProductId VARCHAR(20) PRIMARY KEY, ProductName VARCHAR(100))"))
+        conn.execute(text("INSERT INTO Product VALUES (:pid, :name)"),
+                     [{"pid": f"P{i:05d}", "name": f"Product {i}"} for i in range(1000)])
+    setup.dispose()
+    return url
+
+
+def make_app(sync_sessions, async_sessions, delay: float) -> FastAPI:
+    def read_sync():
+        with sync_sessions() as db:
+            rows = [dict(r) for r in db.execute(SQL).mappings()]
+            if delay:
+                time.sleep(delay)
+            return rows
+
+    app = FastAPI()
+
+    @app.get("/sync-in-async")
+    async def sync_in_async():
+        return read_sync()
+
+    @app.get("/sync")
+    def sync_in_thread():
+        return read_sync()
+
+    @app.get("/async")
+    async def async_read():
+        async with async_sessions() as db:
+            rows = [dict(r) for r in (await db.execute(SQL)).mappings()]
+            if delay:
+                await asyncio.sleep(delay)
+            return rows
+
+    return app
+
+
+async def run(url: str, clients: int, duration: float, latency_ms: float):
+    httpx = require("httpx")
+    sync_engine = create_engine(url.replace("+aiomysql", "+pymysql"), pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW)
+    async_engine = create_async_engine(async_url(url), pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW)
+    app = make_app(sessionmaker(bind=sync_engine), async_sessionmaker(async_engine), latency_ms / 1000)
+
+    print(f"{clients} clients, {duration:.0f} s per stack, {url.split('://')[0]}, +{latency_ms:g} ms per query")
+    limits = httpx.Limits(max_connections=clients)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=120) as http:
+            for label, path in (("sync in async def", "/sync-in-async"), ("sync in def", "/sync"), ("async", "/async")):
+                latencies: list[float] = []
+                errors = 0
+                deadline = time.monotonic() + duration
+
+                async def client():
+                    nonlocal errors
+                    while time.monotonic() < deadline:
+                        started = time.perf_counter()
+                        try:
+                            ok = (await http.get(path)).status_code == 200
+                        except Exception:
+                            ok = False
+                        latencies.append(time.perf_counter() - started)
+                        errors += not ok
+
+                started = time.monotonic()
+                lags, *_ = await asyncio.gather(
+                    loop_lag(lambda: time.monotonic() >= deadline), *(client() for _ in range(clients)),
+                )
+                r = summarize(latencies, errors, time.monotonic() - started)
+                lag = summarize(lags)
+                print(f"{label:>18}: {r['rps']:8.1f} req/s  p50 {r['p50_ms']:8.1f} ms  "
+                      f"p99 {r['p99_ms']:8.1f} ms  loop lag p99 {lag['p99_ms']:8.1f} ms  errors {r['errors']}")
+    finally:
+        sync_engine.dispose()
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async database stack under concurrent clients")
+    parser.add_argument("--url", help="database to read from (default: a temporary SQLite file)")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--latency-ms", type=float, help="simulated round trip added per query (default 2 on SQLite, 0 otherwise)")
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run(args.url, args.clients, args.duration, args.latency_ms or 0))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        latency_ms = 2 if args.latency_ms is None else args.latency_ms
+        asyncio.run(run(sqlite_database(f"{tmp}/bench.db"), args.clients, args.duration, latency_ms))
+
+
+if __name__ == "__main__":
+    main()
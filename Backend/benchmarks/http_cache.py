@@ -0,0 +1,80 @@
+# Replayed catalog page views: bytes on the wire and server CPU per view.
+# A page view is one listing page plus `details` product pages, replayed
+# sequentially through the app in process (ASGI transport): plain identity
+# responses, compressed responses, and compressed responses revalidated with
+# the ETags of the previous view. CPU is the server's thread time around
+# each request (the replay is sequential, so no other request runs inside
+# it); bytes are response bodies as sent. Needs MySQL with products and httpx:
+#   python -m Backend.benchmarks.http_cache --views 200
+
+import argparse
+import asyncio
+import os
+import time
+
+from .common import require
+
+# Before Backend.Source is imported: one client replaying fast would hit the
+# per-IP listing limit
+os.environ["ADMISSION_ENABLED"] = "0"
+os.environ.setdefault("JWT_DEV_SECRET", "1")
+
+
+async def run(views: int, page: int, details: int):
+    httpx = require("httpx")
+    from Backend.Source.app import app
+
+    cpu = 0.0
+
+    async def timed_app(scope, receive, send):
+        nonlocal cpu
+        started = time.thread_time()
+        try:
+            await app(scope, receive, send)
+        finally:
+            cpu += time.thread_time() - started
+
+    transport = httpx.ASGITransport(app=timed_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        listing = f"/buyer/products?limit={page}"
+        first = await client.get(listing)
+        first.raise_for_status()
+        urls = [listing] + [f"/buyer/products/{p['productId']}" for p in first.json()[:details]]
+        print(f"{views} page views of {len(urls)} requests (listing of {page} + {len(urls) - 1} products)")
+
+        for label, encoding, revalidate in (
+            ("identity", "identity", False),
+            ("compressed", "gzip, br", False),
+            ("compressed + 304", "gzip, br", True),
+        ):
+            etags: dict[str, str] = {}
+            # One unmeasured view fills the caches and the ETags
+            for url in urls:
+                etags[url] = (await client.get(url, headers={"Accept-Encoding": encoding})).headers.get("etag", "")
+
+            cpu = 0.0
+            sent = 0
+            statuses: dict[int, int] = {}
+            for _ in range(views):
+                for url in urls:
+                    headers = {"Accept-Encoding": encoding}
+                    if revalidate and etags[url]:
+                        headers["If-None-Match"] = etags[url]
+                    response = await client.get(url, headers=headers)
+                    sent += response.num_bytes_downloaded
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            print(f"{label:>17}: {sent / views / 1024:9.1f} KiB/view  server CPU {cpu / views * 1000:7.2f} ms/view  "
+                  f"{dict(sorted(statuses.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay catalog page views: bytes and server CPU (needs MySQL)")
+    parser.add_argument("--views", type=int, default=200)
+    parser.add_argument("--page", type=int, default=100, help="listing page size")
+    parser.add_argument("--details", type=int, default=5, help="product pages per view")
+    args = parser.parse_args()
+    asyncio.run(run(args.views, args.page, args.details))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Idempotent checkout under a retry storm: `keys` distinct checkouts, each
+# sent `retries` times at once. The work is a stand-in that sleeps like a
+# checkout transaction and saves its response; the run checks it executed
+# once per key. Then the same requests are replayed from the table alone,
+# in a fresh interpreter with IDEMPOTENCY_CACHE_SIZE=0. Needs MySQL, and
+# removes its keys afterwards:
+#   python -m Backend.benchmarks.idempotency --customer 1 --keys 50 --retries 20
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import text
+
+from Backend.Source import idempotency
+from Backend.Source.database_connection import AsyncSessionLocal
+
+from .common import rerun
+
+
+def make_requests(customer_id: int, keys: int, retries: int, prefix: str) -> tuple[list, dict]:
+    executions = {"count": 0}
+
+    async def request(key: str):
+        async def execute(owner):
+            executions["count"] += 1
+            async with AsyncSessionLocal() as db:
+                await asyncio.sleep(0.05)
+                response = {"id": key}
+                await idempotency.save(db, customer_id, key, owner, response)
+                await db.commit()
+            return response
+        return await idempotency.run(customer_id, key, {"key": key}, execute)
+
+    return [request(f"{prefix}{k}") for k in range(keys) for _ in range(retries)], executions
+
+
+async def run(customer_id: int, keys: int, retries: int, args: list[str]):
+    prefix = f"bench-{uuid.uuid4().hex[:8]}-"
+    requests, executions = make_requests(customer_id, keys, retries, prefix)
+    try:
+        started = time.perf_counter()
+        results = await asyncio.gather(*requests)
+        elapsed = time.perf_counter() - started
+        consistent = all(r["id"].startswith(prefix) for r in results)
+        print(f"{len(results)} requests for {keys} keys in {elapsed:.2f}s ({len(results) / elapsed:,.0f} req/s)")
+        ok = executions["count"] == keys and consistent
+        print(f"executions: {executions['count']} (expected {keys}) {'OK' if ok else 'DUPLICATED'}", flush=True)
+
+        await asyncio.to_thread(rerun, __spec__.name, [*args, "--replay", prefix], {"IDEMPOTENCY_CACHE_SIZE": "0"})
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                text("DELETE FROM IdempotencyKey WHERE CustomerId=:cid AND IdemKey LIKE :p"),
+                {"cid": customer_id, "p": prefix + "%"},
+            )
+            await db.commit()
+
+
+async def replay(customer_id: int, keys: int, retries: int, prefix: str):
+    requests, executions = make_requests(customer_id, keys, retries, prefix)
+    started = time.perf_counter()
+    await asyncio.gather(*requests)
+    elapsed = time.perf_counter() - started
+    print(f"replay from the table (no cache): {keys * retries / elapsed:,.0f} req/s, "
+          f"{executions['count']} re-executed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Idempotent checkout retry-storm benchmark (needs MySQL)")
+    parser.add_argument("--customer", type=int, required=True)
+    parser.add_argument("--keys", type=int, default=50)
+    parser.add_argument("--retries", type=int, default=20)
+    parser.add_argument("--replay", help=argparse.SUPPRESS)  # key prefix of a finished storm
+    args = parser.parse_args()
+
+    if args.replay:
+        asyncio.run(replay(args.customer, args.keys, args.retries, args.replay))
+        return
+    shared = ["--customer", str(args.customer), "--keys", str(args.keys), "--retries", str(args.retries)]
+    asyncio.run(run(args.customer, args.keys, args.retries, shared))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# imageBaseUrl for a whole catalog listing: the old per-row Path.exists()
+# probing against image_index lookups, on a synthetic catalog in a temporary
+# directory (one in ten products has no image). No database needed:
+#   python -m Backend.benchmarks.image_index --products 10000
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark imageBaseUrl lookups for a listing (no database needed)")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--listings", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["PRODUCT_IMAGE_DIR"] = tmp
+        from Backend.Source import image_index
+
+        ids = [f"P{i:06d}" for i in range(args.products)]
+        for i, pid in enumerate(ids):
+            if i % 10:
+                (Path(tmp) / pid).mkdir()
+                (Path(tmp) / pid / f"1{image_index.IMAGE_EXTS[i % len(image_index.IMAGE_EXTS)]}").write_bytes(b"x")
+
+        def probe(product_id: str) -> str | None:
+            for ext in image_index.IMAGE_EXTS:
+                if (image_index.IMAGE_DIR / product_id / f"1{ext}").exists():
+                    return f"/product_images/{product_id}/1{ext}"
+            return None
+
+        started = time.perf_counter()
+        image_index.build_index()
+        built = time.perf_counter() - started
+
+        for label, lookup in (("Path.exists probing", probe), ("index lookup", image_index.get_product_image_url)):
+            started = time.perf_counter()
+            for _ in range(args.listings):
+                urls = [lookup(pid) for pid in ids]
+            elapsed = (time.perf_counter() - started) / args.listings
+            print(f"{label:>20}: {elapsed * 1000:9.2f} ms per {args.products:,}-product listing "
+                  f"({sum(1 for u in urls if u):,} images)")
+        print(f"{'index build':>20}: {built * 1000:9.2f} ms (once at startup)")
+
+
+if __name__ == "__main__":
+    main()
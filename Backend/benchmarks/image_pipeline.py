@@ -0,0 +1,96 @@
+# Image upload latency and listing page bytes on synthetic photos, in a
+# temporary PRODUCT_IMAGE_DIR. Upload latency is the original written
+# (uploads.save_image_upload) with derivatives made either inside the
+# request or queued with image_pipeline.submit(). Then the bytes a listing
+# page of `page` products downloads as full-size originals, against the
+# thumbnails in each format. Needs Pillow:
+#   python -m Backend.benchmarks.image_pipeline --products 40 --page 20
+
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import time
+
+from .common import percentile, require
+
+
+def synthetic_photo(image_module, i: int, width: int, height: int) -> bytes:
+    # A camera-sized JPEG with gradients and grain, so it compresses like a photo
+    base = image_module.linear_gradient("L").resize((width, height))
+    noise = image_module.effect_noise((width, height), 8 + i % 8)
+    img = image_module.merge("RGB", (base, noise, base.rotate(90 + i % 90).resize((width, height))))
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+async def run(products: int, page: int, width: int, height: int):
+    require("PIL", "pillow")
+    from PIL import Image
+
+    from Backend.Source import image_index, image_pipeline
+    from Backend.Source.uploads import save_image_upload
+
+    image_index.build_index()
+    photos = [synthetic_photo(Image, i, width, height) for i in range(min(products, 8))]
+    formats = image_pipeline.available_formats()
+    print(f"{products} uploads of {width}x{height} JPEG (~{sum(map(len, photos)) // len(photos) // 1024} KiB), "
+          f"formats {', '.join(formats)}, {image_pipeline.IMAGE_WORKERS} background worker(s)")
+
+    async def upload(pid: str, photo: bytes, inline: bool) -> float:
+        started = time.perf_counter()
+        await asyncio.to_thread(save_image_upload, io.BytesIO(photo), image_index.IMAGE_DIR / pid)
+        image_index.refresh_product(pid)
+        if inline:
+            await asyncio.to_thread(image_pipeline.process_product, pid, True)
+        else:
+            # Off the event loop: there is no database here for finished jobs
+            # to move the catalog version in
+            await asyncio.to_thread(image_pipeline.submit, pid)
+        return time.perf_counter() - started
+
+    background = [f"BG{i:05d}" for i in range(products)]
+    try:
+        for label, inline in (("derivatives inline", True), ("background (submit)", False)):
+            timings = sorted([
+                await upload(f"IN{i:05d}" if inline else background[i], photos[i % len(photos)], inline)
+                for i in range(products)
+            ])
+            print(f"{label:>20}: upload mean {sum(timings) / len(timings) * 1000:7.1f} ms  "
+                  f"p99 {percentile(timings, 99) * 1000:7.1f} ms")
+
+        started = time.perf_counter()
+        while not all(image_index.get_product_image_variants(pid) for pid in background):
+            await asyncio.sleep(0.05)
+        print(f"{'background drained':>20}: {time.perf_counter() - started:7.2f} s after the last upload")
+    finally:
+        image_pipeline.shutdown()
+
+    pids = background[:page]
+    originals = sum(image_index.image_path(image_index.get_product_image_url(pid)).stat().st_size for pid in pids)
+    print(f"listing page of {len(pids)} products:")
+    print(f"{'originals':>20}: {originals / 1024:9.1f} KiB")
+    for fmt in formats:
+        size = sum(image_index.image_path(image_index.get_product_image_variants(pid)["thumb"][fmt]).stat().st_size
+                   for pid in pids)
+        print(f"{'thumb ' + fmt:>20}: {size / 1024:9.1f} KiB ({size / originals:.2%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload latency and bytes per listing page on synthetic images")
+    parser.add_argument("--products", type=int, default=40)
+    parser.add_argument("--page", type=int, default=20, help="products per listing page")
+    parser.add_argument("--width", type=int, default=3000)
+    parser.add_argument("--height", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Read by image_index when Backend.Source is first imported, in run()
+        os.environ["PRODUCT_IMAGE_DIR"] = tmp
+        asyncio.run(run(args.products, args.page, args.width, args.height))
+
+
+if __name__ == "__main__":
+    main()
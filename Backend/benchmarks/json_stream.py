@@ -0,0 +1,58 @@
+# Encoder-only comparison on synthetic rows, no database: a ProductOut list
+# plus json.dumps, as the paged listings do, against json_stream.encode().
+# Time to the first byte, total time and peak traced memory:
+#   python -m Backend.benchmarks.json_stream --rows 50000
+
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from datetime import date
+
+from Backend.Source.json_stream import encode
+from Backend.Source.schemas.product import ProductOut
+
+
+def row(i: int) -> dict:
+    return {
+        "productId": f"SKU{i:06d}", "productName": f"Product {i}", "brand": "Brand", "price": 199.0 + i,
+        "color": "Black", "quantity": i % 50, "specification": "x" * 200, "warrantyPeriod": 12,
+        "releaseDate": date(2024, 1, 1), "status": "Active", "imageBaseUrl": f"/product_images/SKU{i:06d}/1.jpg",
+    }
+
+
+async def streamed(rows: int) -> float:
+    async def items():
+        for i in range(rows):
+            yield row(i)
+
+    first = None
+    async for _ in encode(items(), "json"):
+        if first is None:
+            first = time.perf_counter()
+    return first
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streamed vs materialized product serialization")
+    parser.add_argument("--rows", type=int, default=50_000)
+    rows = parser.parse_args().rows
+
+    for name in ("materialized", "streamed"):
+        tracemalloc.start()
+        started = time.perf_counter()
+        if name == "materialized":
+            models = [ProductOut(**row(i)) for i in range(rows)]
+            json.dumps([m.model_dump(mode="json") for m in models])
+            first = time.perf_counter()
+        else:
+            first = asyncio.run(streamed(rows))
+        total = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:>12}: first byte {(first - started) * 1000:.1f} ms, total {total:.2f}s, peak {peak / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
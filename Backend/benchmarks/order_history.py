@@ -0,0 +1,65 @@
+# Order history paging: inserts `orders` orders for one customer, then reads
+# every history page of `page` orders. Everything runs in one transaction
+# that is rolled back. Needs MySQL:
+#   python -m Backend.benchmarks.order_history --customer 1 --orders 10000
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from Backend.Source import cart_store
+from Backend.Source.catalog_query import decode_cursor
+from Backend.Source.database_connection import AsyncSessionLocal
+from Backend.Source.order_history import list_orders
+
+
+async def run(customer_id: int, orders: int, page: int):
+    async with AsyncSessionLocal() as db:
+        product_id = (await db.execute(text("SELECT ProductId FROM Product LIMIT 1"))).scalar_one()
+        try:
+            cart_id = await cart_store.get_or_create_cart(db, customer_id)
+            started = time.perf_counter()
+            order_ids = []
+            for i in range(orders):
+                res = await db.execute(
+                    text("""
+                        INSERT INTO `Order`(CustomerId, CartId, OrderDate, Status, Total)
+                        VALUES (:cid, :cartid, NOW() - INTERVAL :i MINUTE, 'Delivered', 100)
+                    """),
+                    {"cid": customer_id, "cartid": cart_id, "i": i},
+                )
+                order_ids.append(res.lastrowid)
+            await db.execute(
+                text("INSERT INTO OrderContainsProduct(OrderId, ProductId, Quantity, UnitPrice) VALUES (:oid, :pid, 1, 100)"),
+                [{"oid": oid, "pid": product_id} for oid in order_ids],
+            )
+            print(f"Inserted {orders} orders in {time.perf_counter() - started:.1f}s")
+
+            started = time.perf_counter()
+            pages = 0
+            cursor = None
+            while True:
+                _, next_cursor = await list_orders(db, customer_id, page, cursor)
+                pages += 1
+                if not next_cursor:
+                    break
+                cursor = decode_cursor(next_cursor)
+            elapsed = time.perf_counter() - started
+            print(f"Read {pages} pages of {page} in {elapsed:.2f}s ({elapsed / pages * 1000:.2f} ms/page)")
+        finally:
+            await db.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Order history benchmark (needs MySQL)")
+    parser.add_argument("--customer", type=int, required=True)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--page", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.customer, args.orders, args.page))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Checkout-side latency of post-order work: `handlers` stand-in handlers run
+# inline in the checkout transaction, against one outbox.publish() for a
+# worker to pick up later. Each stand-in handler does one database round
+# trip, like writing an audit row or reading stock for an alert. Every
+# "order" is rolled back. Needs MySQL:
+#   python -m Backend.benchmarks.outbox --handlers 3
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from Backend.Source.database_connection import AsyncSessionLocal
+from Backend.Source.outbox import publish
+
+from .common import summarize
+
+
+async def fake_handler(payload: dict, db: AsyncSession):
+    await db.execute(text("SELECT Quantity FROM Product WHERE ProductId=:pid"), {"pid": payload["productId"]})
+
+
+async def run(n_handlers: int, orders: int):
+    async with AsyncSessionLocal() as db:
+        product_id = (await db.execute(text("SELECT ProductId FROM Product LIMIT 1"))).scalar_one()
+        await db.rollback()
+
+        for mode in ("inline", "queued"):
+            latencies = []
+            for i in range(orders):
+                started = time.perf_counter()
+                payload = {"orderId": i, "productId": product_id}
+                if mode == "inline":
+                    for _ in range(n_handlers):
+                        await fake_handler(payload, db)
+                else:
+                    await publish(db, "bench", payload)
+                await db.rollback()
+                latencies.append(time.perf_counter() - started)
+            r = summarize(latencies)
+            print(f"{mode:>7}: p50 {r['p50_ms']:.2f} ms, p99 {r['p99_ms']:.2f} ms with {n_handlers} handlers")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkout-side latency, inline vs queued handlers (needs MySQL)")
+    parser.add_argument("--handlers", type=int, default=3)
+    parser.add_argument("--orders", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.handlers, args.orders))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Concurrent logins per second: `clients` login loops for `duration` seconds,
+# first with bcrypt on the event loop ("inline", the old handlers), then with
+# the password_hashing pool at 1, 2, 4 ... workers. Each setup runs in a
+# fresh interpreter with HASH_WORKERS set, as a server would. Rejected is
+# the 503s from HASH_MAX_PENDING; loop lag is how late a 10 ms timer fires,
+# which every other request on the worker would wait. No database needed:
+#   python -m Backend.benchmarks.password_hashing --clients 64 --duration 5
+
+import argparse
+import asyncio
+import os
+import time
+
+from fastapi import HTTPException
+
+from .common import loop_lag, percentile, rerun
+
+PASSWORD = "bench-password"
+
+
+async def run_setup(workers: int, clients: int, duration: float):
+    from Backend.Source import password_hashing
+
+    stored = password_hashing.hash_password_sync(PASSWORD)
+    if workers:
+        # Start the pool before timing
+        await asyncio.gather(*(password_hashing.verify_password("x", stored) for _ in range(workers)))
+
+    latencies: list[float] = []
+    rejected = 0
+    deadline = time.monotonic() + duration
+
+    async def client():
+        nonlocal rejected
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                if workers:
+                    await password_hashing.verify_password(PASSWORD, stored)
+                else:
+                    password_hashing.check_password_sync(PASSWORD, stored)
+                    await asyncio.sleep(0)
+            except HTTPException:
+                rejected += 1
+                await asyncio.sleep(0.05)
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.monotonic()
+    lags, *_ = await asyncio.gather(loop_lag(lambda: time.monotonic() >= deadline), *(client() for _ in range(clients)))
+    elapsed = time.monotonic() - started
+    password_hashing.shutdown()
+    latencies.sort()
+    lags.sort()
+    label = f"{workers} worker(s)" if workers else "inline"
+    print(f"{label:>12}: {len(latencies) / elapsed:7.1f} logins/s  p99 {percentile(latencies, 99) * 1000:8.1f} ms  "
+          f"rejected {rejected:5}  loop lag p99 {percentile(lags, 99) * 1000:8.1f} ms", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent bcrypt logins per second across worker counts")
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")))
+    parser.add_argument("--workers", default=None, help="comma-separated pool sizes (default 1,2,4,... up to the core count)")
+    parser.add_argument("--setup", type=int, help=argparse.SUPPRESS)  # one pool size, in this process
+    args = parser.parse_args()
+
+    if args.setup is not None:
+        asyncio.run(run_setup(args.setup, args.clients, args.duration))
+        return
+
+    if args.workers:
+        counts = [int(w) for w in args.workers.split(",")]
+    else:
+        counts = [1]
+        while counts[-1] * 2 <= (os.cpu_count() or 1):
+            counts.append(counts[-1] * 2)
+    print(f"bcrypt cost {args.rounds}, {args.clients} clients, {args.duration:.0f} s per setup, {os.cpu_count()} cores")
+    for workers in [0, *counts]:
+        rerun(__spec__.name, ["--clients", str(args.clients), "--duration", str(args.duration), "--setup", str(workers)],
+              {"HASH_WORKERS": str(workers or 1), "BCRYPT_ROUNDS": str(args.rounds)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Catalog read throughput with and without product_cache: `readers`
+# concurrent clients reading product details (80%) and the first listing
+# page (20%) through the buyer endpoints, over an in-process ASGI transport.
+# Each setup runs in a fresh interpreter, uncached with PRODUCT_CACHE_SIZE=0.
+# Needs MySQL and httpx:
+#   python -m Backend.benchmarks.product_cache --readers 32 --duration 5
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from sqlalchemy import text
+
+from .common import require, rerun, summarize
+
+# Set before Backend.Source is imported: requests here all come from one client
+BENCH_ENV = {"ADMISSION_ENABLED": "0", "JWT_DEV_SECRET": os.getenv("JWT_DEV_SECRET", "1")}
+
+
+async def run_setup(label: str, readers: int, duration: float, products: int):
+    httpx = require("httpx")
+    from Backend.Source import product_cache
+    from Backend.Source.app import app
+    from Backend.Source.database_connection import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        pids = (await db.execute(
+            text("SELECT ProductId FROM Product WHERE Status='Active' ORDER BY ProductId LIMIT :n"), {"n": products},
+        )).scalars().all()
+    if not pids:
+        raise SystemExit("No active products: load db_creation.sql or run seed_data first")
+
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as http:
+
+        async def reader(seed: int):
+            nonlocal errors
+            rng = random.Random(seed)
+            while time.monotonic() < deadline:
+                path = f"/buyer/products/{rng.choice(pids)}" if rng.random() < 0.8 else "/buyer/products?limit=20"
+                started = time.perf_counter()
+                ok = (await http.get(path)).status_code == 200
+                latencies.append(time.perf_counter() - started)
+                errors += not ok
+
+        started = time.monotonic()
+        await asyncio.gather(*(reader(i) for i in range(readers)))
+        r = summarize(latencies, errors, time.monotonic() - started)
+    print(f"{label:>9}: {r['rps']:9,.0f} reads/s  p99 {r['p99_ms']:7.1f} ms  errors {r['errors']}  "
+          f"{product_cache.stats()}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cached vs uncached catalog read throughput (needs MySQL)")
+    parser.add_argument("--readers", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--products", type=int, default=1000, help="distinct products read")
+    parser.add_argument("--setup", help=argparse.SUPPRESS)  # one setup, in this process
+    args = parser.parse_args()
+
+    if args.setup:
+        asyncio.run(run_setup(args.setup, args.readers, args.duration, args.products))
+        return
+
+    print(f"{args.readers} readers, up to {args.products} products, 80% detail / 20% first page")
+    for label, size in (("uncached", "0"), ("cached", os.getenv("PRODUCT_CACHE_SIZE", "2048"))):
+        rerun(__spec__.name, ["--setup", label, "--readers", str(args.readers), "--duration", str(args.duration),
+                              "--products", str(args.products)], {**BENCH_ENV, "PRODUCT_CACHE_SIZE": size})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Product search latency on a synthetic catalog: the in-process index against
+# the old LIKE '%q%' match evaluated in Python over the same rows. No
+# database needed; --db also times the LIKE scan and FULLTEXT against the
+# Product table in DATABASE_URL (load a catalog of the same size for a
+# like-for-like comparison):
+#   python -m Backend.benchmarks.product_search --products 100000 [--db]
+
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import text
+
+from Backend.Source import product_search
+
+QUERIES = ["samsung", "sams", "phone pro", "apple watch max", "lenovo laptop 4", "p0000012", "sony tv"]
+BRANDS = ["Samsung", "Apple", "Xiaomi", "Sony", "LG", "Asus", "Dell", "Lenovo", "Oppo", "Panasonic"]
+KINDS = ["Phone", "Laptop", "Tablet", "TV", "Headphones", "Monitor", "Speaker", "Watch", "Camera", "Router"]
+ADJECTIVES = ["Pro", "Max", "Lite", "Ultra", "Plus", "Mini", "Air", "Neo", "Prime", "Edge"]
+
+
+def synthetic_products(n: int, seed: int = 42) -> list[dict]:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        brand, kind = rng.choice(BRANDS), rng.choice(KINDS)
+        rows.append({
+            "ProductId": f"P{i:07d}",
+            "ProductName": f"{brand} {kind} {rng.choice(ADJECTIVES)} {i % 97}",
+            "Brand": brand,
+            "Specification": f"{kind} by {brand}, model year {2018 + i % 8}, {rng.choice(ADJECTIVES).lower()} edition",
+            "Status": "Active" if rng.random() < 0.95 else "Deactivated",
+        })
+    return rows
+
+
+def timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def time_mysql(repeat: int):
+    from Backend.Source.database_connection import AsyncSessionLocal
+
+    like_sql = text("""
+        SELECT ProductId FROM Product WHERE Status='Active'
+          AND (ProductId LIKE :q OR ProductName LIKE :q OR Brand LIKE :q) LIMIT 20
+    """)
+    fulltext_sql = text(f"""
+        SELECT ProductId FROM Product WHERE Status='Active'
+          AND MATCH({product_search.FULLTEXT_COLUMNS}) AGAINST (:q IN BOOLEAN MODE) LIMIT 20
+    """)
+    async with AsyncSessionLocal() as db:
+        count = (await db.execute(text("SELECT COUNT(*) FROM Product"))).scalar_one()
+        print(f"MySQL, {count:,} products:")
+        for q in QUERIES:
+            timings = {}
+            for label, sql, params in (("LIKE", like_sql, {"q": f"%{q}%"}),
+                                       ("FULLTEXT", fulltext_sql, {"q": product_search.fulltext_query(q)})):
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    (await db.execute(sql, params)).all()
+                timings[label] = (time.perf_counter() - started) / repeat * 1000
+            print(f"{q!r:>20}: MySQL LIKE {timings['LIKE']:8.2f} ms  FULLTEXT {timings['FULLTEXT']:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark product search latency")
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db", action="store_true", help="also time LIKE and FULLTEXT in MySQL")
+    args = parser.parse_args()
+
+    rows = synthetic_products(args.products)
+    started = time.perf_counter()
+    for row in rows:
+        product_search.index_product(row)
+    print(f"{args.products:,} products indexed in {(time.perf_counter() - started) * 1000:.0f} ms; "
+          f"{args.repeat} runs per query")
+
+    def like(q: str) -> list[str]:
+        needle = q.lower()
+        return [r["ProductId"] for r in rows if r["Status"] == "Active" and any(
+            needle in r[f].lower() for f in ("ProductId", "ProductName", "Brand"))]
+
+    for q in QUERIES:
+        index_ms = timed(lambda: product_search.search(q, limit=20), args.repeat)
+        like_ms = timed(lambda: like(q), args.repeat)
+        print(f"{q!r:>20}: index {index_ms:8.3f} ms ({len(product_search.search(q)):>6} hits)  "
+              f"LIKE scan {like_ms:8.2f} ms ({len(like(q)):>6} hits)")
+
+    if args.db:
+        asyncio.run(time_mysql(args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Sales report latency: the same reports from the SalesDaily rollup and from
+# the Order / OrderContainsProduct join it replaces. Needs MySQL; seed ~1M
+# order lines first (python -m Backend.Source.seed_data --orders 400000):
+#   python -m Backend.benchmarks.sales_rollup --repeat 5
+
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from Backend.Source.database_connection import AsyncSessionLocal
+from Backend.Source.sales_rollup import revenue
+
+
+async def run(repeat: int):
+    end = date.today()
+    week, year = end - timedelta(days=6), end - timedelta(days=364)
+    naive = {
+        "top products, 7 days": ("""
+            SELECT l.ProductId, SUM(l.Quantity) AS Units, SUM(l.Quantity * l.UnitPrice) AS Revenue
+            FROM `Order` o JOIN OrderContainsProduct l ON l.OrderId = o.OrderId JOIN Product p ON p.ProductId = l.ProductId
+            WHERE o.Status <> 'Cancelled' AND o.OrderDate >= :s
+            GROUP BY l.ProductId ORDER BY Revenue DESC LIMIT 10
+        """, {"s": week}),
+        "revenue by brand, 365 days": ("""
+            SELECT p.Brand, SUM(l.Quantity * l.UnitPrice) AS Revenue
+            FROM `Order` o JOIN OrderContainsProduct l ON l.OrderId = o.OrderId JOIN Product p ON p.ProductId = l.ProductId
+            WHERE o.Status <> 'Cancelled' AND o.OrderDate >= :s
+            GROUP BY p.Brand ORDER BY Revenue DESC
+        """, {"s": year}),
+        "revenue by day, 30 days": ("""
+            SELECT DATE(o.OrderDate) AS d, SUM(l.Quantity * l.UnitPrice) AS Revenue
+            FROM `Order` o JOIN OrderContainsProduct l ON l.OrderId = o.OrderId
+            WHERE o.Status <> 'Cancelled' AND o.OrderDate >= :s
+            GROUP BY DATE(o.OrderDate) ORDER BY d
+        """, {"s": end - timedelta(days=29)}),
+    }
+    rollup = {
+        "top products, 7 days": lambda db: revenue(db, "product", week, end, limit=10),
+        "revenue by brand, 365 days": lambda db: revenue(db, "brand", year, end),
+        "revenue by day, 30 days": lambda db: revenue(db, "day", end - timedelta(days=29), end),
+    }
+
+    async with AsyncSessionLocal() as db:
+        lines = (await db.execute(text("SELECT COUNT(*) FROM OrderContainsProduct"))).scalar_one()
+        print(f"{lines:,} order lines")
+        for name, (sql, params) in naive.items():
+            started = time.perf_counter()
+            for _ in range(repeat):
+                (await db.execute(text(sql), params)).all()
+            join_ms = (time.perf_counter() - started) / repeat * 1000
+            started = time.perf_counter()
+            for _ in range(repeat):
+                await rollup[name](db)
+            rollup_ms = (time.perf_counter() - started) / repeat * 1000
+            print(f"{name:>28}: join {join_ms:9.1f} ms, rollup {rollup_ms:7.2f} ms ({join_ms / max(rollup_ms, 1e-6):,.0f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sales report latency, rollup vs join (needs MySQL)")
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(run(parser.parse_args().repeat))
+
+
+if __name__ == "__main__":
+    main()
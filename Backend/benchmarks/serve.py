@@ -0,0 +1,83 @@
+# Cold start of a worker: the time to import the app and, with --lifespan,
+# to finish the warm-up in app.py, each in a fresh interpreter, plus the
+# slowest packages to import. --lifespan needs MySQL:
+#   python -m Backend.benchmarks.serve [--runs 5] [--lifespan]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+IMPORT_PROBE = """
+import time
+started = time.perf_counter()
+import Backend.Source.app
+print(time.perf_counter() - started)
+"""
+
+LIFESPAN_PROBE = """
+import asyncio, time
+started = time.perf_counter()
+from Backend.Source.app import app
+imported = time.perf_counter()
+
+async def main():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        print(imported - started, ready - started)
+
+asyncio.run(main())
+"""
+
+
+def probe(code: str, env: dict) -> list[float]:
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    return [float(x) for x in out.stdout.split()[-2:] if x]
+
+
+def slowest_imports(env: dict, top: int = 10) -> list[tuple[int, str]]:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import Backend.Source.app"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        name = parts[-1].strip()
+        # Third-party / stdlib packages, wherever they are first imported
+        if len(parts) == 3 and parts[1].strip().isdigit() and "." not in name and name != "Backend":
+            rows.append((int(parts[1]), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure worker cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--lifespan", action="store_true", help="include the lifespan warm-up (needs MySQL)")
+    args = parser.parse_args()
+
+    env = {"JWT_DEV_SECRET": "1", **os.environ, "LOG_LEVEL": "WARNING"}
+    code = LIFESPAN_PROBE if args.lifespan else IMPORT_PROBE
+    imports, readies = [], []
+    for _ in range(args.runs):
+        values = probe(code, env)
+        imports.append(values[0])
+        if args.lifespan:
+            readies.append(values[1])
+
+    def line(label, values):
+        print(f"{label:>18}: median {statistics.median(values) * 1000:8.1f} ms  "
+              f"min {min(values) * 1000:8.1f} ms  ({len(values)} runs)")
+
+    line("import app", imports)
+    if readies:
+        line("import + warm-up", readies)
+    print("slowest packages (cumulative import time):")
+    for us, name in slowest_imports(env):
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
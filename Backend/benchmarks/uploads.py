@@ -0,0 +1,88 @@
+# `uploads` concurrent uploads of `mb` MB each, spread over `products`
+# product folders (so uploads replace each other's files), run in threads
+# as run_in_threadpool would. Reader threads open every product's image the
+# whole time and count opens that fail or see a partial file. Loop lag is
+# how late a 10 ms timer fires while the uploads run. Temporary directory,
+# no database needed:
+#   python -m Backend.benchmarks.uploads --uploads 32 --mb 8
+
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from Backend.Source.uploads import save_image_upload
+
+from .common import loop_lag, summarize
+
+
+async def run(uploads: int, mb: int, products: int):
+    size = mb * 1024 * 1024
+    bodies = [b"\xff\xd8\xff\xe0" + bytes([i]) * (size - 4) for i in range(2)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        folders = [root / f"P{i}" for i in range(products)]
+        for folder in folders:
+            save_image_upload(io.BytesIO(bodies[0]), folder)
+
+        stop = threading.Event()
+        reads = {"ok": 0, "missing": 0, "partial": 0}
+
+        def reader():
+            while not stop.is_set():
+                for folder in folders:
+                    try:
+                        with open(folder / "1.jpg", "rb") as f:
+                            f.seek(0, os.SEEK_END)
+                            reads["ok" if f.tell() == size else "partial"] += 1
+                    except FileNotFoundError:
+                        reads["missing"] += 1
+
+        async def upload(i: int) -> float:
+            started = time.perf_counter()
+            await asyncio.to_thread(save_image_upload, io.BytesIO(bodies[i % 2]), folders[i % products])
+            return time.perf_counter() - started
+
+        readers = [threading.Thread(target=reader) for _ in range(2)]
+        for t in readers:
+            t.start()
+        done = False
+
+        async def all_uploads() -> list[float]:
+            nonlocal done
+            try:
+                return await asyncio.gather(*(upload(i) for i in range(uploads)))
+            finally:
+                done = True
+
+        started = time.perf_counter()
+        lags, timings = await asyncio.gather(loop_lag(lambda: done), all_uploads())
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for t in readers:
+            t.join()
+
+        leftovers = [p.name for folder in folders for p in folder.iterdir() if p.name != "1.jpg"]
+        r = summarize(timings)
+        lag = summarize(lags)
+        print(f"{uploads} uploads of {mb} MB into {products} folder(s): {uploads * mb / elapsed:,.0f} MB/s, "
+              f"upload p50 {r['p50_ms']:.0f} ms p99 {r['p99_ms']:.0f} ms, loop lag p99 {lag['p99_ms']:.1f} ms")
+        print(f"reader opens: {reads}, leftover temp files: {len(leftovers)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent large image uploads with readers (no database needed)")
+    parser.add_argument("--uploads", type=int, default=32)
+    parser.add_argument("--mb", type=int, default=8)
+    parser.add_argument("--products", type=int, default=4, help="folders the uploads replace images in")
+    args = parser.parse_args()
+    asyncio.run(run(args.uploads, args.mb, args.products))
+
+
+if __name__ == "__main__":
+    main()
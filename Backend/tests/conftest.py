@@ -0,0 +1,69 @@
+# Tests that need MySQL take the `mysql_db` fixture and are skipped unless
+# TEST_DATABASE_URL points at a server (sync pymysql URL). The database named
+# in it is dropped and recreated from db_creation.sql for every such test.
+
+import os
+from pathlib import Path
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "")
+SCHEMA_FILE = Path(__file__).resolve().parents[1] / "Database" / "db_creation.sql"
+
+# Before Backend.Source is imported: the engines are created from these
+os.environ.setdefault("JWT_SECRET", "test-secret")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ.pop("DATABASE_REPLICA_URLS", None)
+
+
+def _statements(sql: str):
+    # db_creation.sql has no procedures or triggers: statements end with ";" at end of line
+    buf = []
+    for line in sql.splitlines():
+        if not line.strip() or line.strip().startswith("--"):
+            continue
+        buf.append(line)
+        if line.rstrip().endswith(";"):
+            stmt = "\n".join(buf).strip()
+            buf = []
+            if stmt.rstrip(";").strip():
+                yield stmt
+
+
+def _create_schema(url: str):
+    import pymysql
+    from sqlalchemy.engine import make_url
+
+    url = make_url(url)
+    sql = SCHEMA_FILE.read_text(encoding="utf-8").replace("oss_demo", url.database)
+    conn = pymysql.connect(
+        host=url.host or "localhost", port=url.port or 3306,
+        user=url.username, password=url.password or "", charset="utf8mb4",
+    )
+    try:
+        with conn.cursor() as cur:
+            for stmt in _statements(sql):
+                cur.execute(stmt)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def mysql_schema():
+    # A fresh schema with the sample data from db_creation.sql
+    if not TEST_DATABASE_URL:
+        pytest.skip("needs MySQL: set TEST_DATABASE_URL")
+    _create_schema(TEST_DATABASE_URL)
+
+
+@pytest.fixture
+async def mysql_db(mysql_schema):
+    # Yields the async engine's session factory
+    from Backend.Source import database_connection
+
+    yield database_connection.AsyncSessionLocal
+    # Pooled connections belong to this test's event loop
+    await database_connection.async_engine.dispose()
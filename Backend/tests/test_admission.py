@@ -0,0 +1,62 @@
+import asyncio
+
+from Backend.Source import admission
+from Backend.Source.admission import AdmissionMiddleware, Limit, MemoryStore
+from Backend.benchmarks.admission import simulate
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def test_over_the_rate_limit_gets_429_with_retry_after():
+    now = [1000.0]
+    handler = AdmissionMiddleware(
+        ok_app, store=MemoryStore(clock=lambda: now[0]), limits={"checkout": Limit(rate=0.5, burst=2, share=0.5)},
+    )
+
+    statuses = [(await admission.request(handler, "POST", "/buyer/orders/checkout", "10.0.0.1"))[0] for _ in range(2)]
+    status, headers = await admission.request(handler, "POST", "/buyer/orders/checkout", "10.0.0.1")
+
+    assert statuses == [200, 200]
+    assert status == 429
+    assert int(headers["retry-after"]) == 2  # one token at 0.5/s
+
+    # Other clients keep their own bucket, and the token comes back in time
+    assert (await admission.request(handler, "POST", "/buyer/orders/checkout", "10.0.0.2"))[0] == 200
+    now[0] += 2
+    assert (await admission.request(handler, "POST", "/buyer/orders/checkout", "10.0.0.1"))[0] == 200
+
+
+async def test_full_gate_gets_503_with_retry_after():
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        await release.wait()
+        await ok_app(scope, receive, send)
+
+    # Gate of one slot (2 x 0.5), waiting at most 50 ms for it
+    handler = AdmissionMiddleware(
+        slow_app, store=MemoryStore(), limits={"checkout": Limit(rate=100, burst=100, share=0.5)},
+        pool_capacity=2, queue_seconds=0.05,
+    )
+
+    first = asyncio.create_task(admission.request(handler, "POST", "/buyer/orders/checkout", "10.0.0.1"))
+    await asyncio.sleep(0.01)
+    status, headers = await admission.request(handler, "POST", "/buyer/orders/checkout", "10.0.0.2")
+    release.set()
+
+    assert status == 503
+    assert int(headers["retry-after"]) >= 1
+    assert (await first)[0] == 200
+
+
+async def test_good_client_p99_stays_bounded_under_a_flood():
+    service_ms = 20
+    result = await simulate(abusers=200, duration=2, service_ms=service_ms, protected=True)
+
+    # Unprotected, the good client queues behind the whole flood (~7x service time)
+    assert result["ok"] == result["requests"]
+    assert result["p99_ms"] < 4 * service_ms
+    assert result["abuser"].get(429, 0) > result["abuser"].get(200, 0)
@@ -0,0 +1,52 @@
+import pytest
+from fastapi import HTTPException
+
+from Backend.Source import auth_tokens
+
+
+def test_cached_access_token_is_not_a_refresh_token():
+    token = auth_tokens.create_access_token(1, "customer", "alice")
+    assert auth_tokens.decode_token(token).type == "access"  # now cached
+
+    with pytest.raises(HTTPException) as e:
+        auth_tokens.decode_token(token, "refresh")
+    assert e.value.status_code == 401
+
+
+def test_refresh_token_is_not_an_access_token():
+    token = auth_tokens.create_refresh_token(1, "customer", "alice")
+    assert auth_tokens.decode_token(token, "refresh").type == "refresh"
+
+    with pytest.raises(HTTPException):
+        auth_tokens.decode_token(token)
+
+
+async def test_refresh_token_is_spent_once_across_workers(mysql_db, monkeypatch):
+    user = auth_tokens.decode_token(auth_tokens.create_refresh_token(1, "customer", "alice"), "refresh")
+    async with mysql_db() as db:
+        assert await auth_tokens.revoke(db, user)
+        # Another worker: its in-memory denylist has not seen the revocation
+        monkeypatch.setattr(auth_tokens, "_denylist", auth_tokens.Denylist())
+        assert not await auth_tokens.revoke(db, user)
+
+    monkeypatch.setattr(auth_tokens, "_denylist", auth_tokens.Denylist())
+    monkeypatch.setattr(auth_tokens, "_synced_until", None)
+    await auth_tokens.sync_denylist()
+    assert user.jti in auth_tokens._denylist
+
+
+def test_internal_stats_need_an_admin_token():
+    from fastapi.testclient import TestClient
+
+    from Backend.Source.app import app
+
+    # Without the lifespan: no database needed for these routes
+    client = TestClient(app)
+    admin = {"Authorization": f"Bearer {auth_tokens.create_access_token(1, 'admin', 'root')}"}
+    customer = {"Authorization": f"Bearer {auth_tokens.create_access_token(2, 'customer', 'alice')}"}
+
+    assert client.get("/health").status_code == 200
+    for path in ("/metrics", "/cache/stats", "/auth/stats"):
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers=customer).status_code == 403
+        assert client.get(path, headers=admin).status_code == 200
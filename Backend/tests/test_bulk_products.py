@@ -0,0 +1,46 @@
+import io
+
+from sqlalchemy import text
+
+from Backend.Source import bulk_products
+from Backend.Source.schemas.product import ProductCreate
+
+FULL_CSV = """productId,productName,brand,price,color,quantity,specification,warrantyPeriod,releaseDate,status
+T1,Phone One,Acme,100,Black,5,6.1 inch,12,2024-01-01,Deactivated
+"""
+PARTIAL_CSV = """productId,productName,price
+T1,Phone One,120
+"""
+
+
+def test_partial_row_writes_only_its_columns():
+    record = next(bulk_products.iter_records(io.StringIO(PARTIAL_CSV), "csv"))[1]
+    params = bulk_products.row_params(ProductCreate(**record))
+
+    assert list(params) == ["ProductId", "ProductName", "Price"]
+    sql = str(bulk_products.upsert_sql(tuple(params)))
+    update = sql.split("ON DUPLICATE KEY UPDATE")[1]
+    assert "Price=VALUES(Price)" in update
+    assert "Status" not in sql and "Brand" not in sql
+
+
+def test_empty_cell_in_a_present_column_clears_it():
+    csv_text = "productId,productName,brand\nT1,Phone One,\n"
+    record = next(bulk_products.iter_records(io.StringIO(csv_text), "csv"))[1]
+
+    assert bulk_products.row_params(ProductCreate(**record))["Brand"] is None
+
+
+async def test_partial_reimport_keeps_the_other_columns(mysql_db):
+    async with mysql_db() as db:
+        report = await bulk_products.import_products(db, io.StringIO(FULL_CSV), "csv")
+        assert report["upserted"] == 1
+        report = await bulk_products.import_products(db, io.StringIO(PARTIAL_CSV), "csv")
+        assert report["upserted"] == 1
+
+        row = (await db.execute(text("SELECT * FROM Product WHERE ProductId='T1'"))).mappings().one()
+    assert float(row["Price"]) == 120
+    assert row["Brand"] == "Acme"
+    assert row["Quantity"] == 5
+    assert row["Specification"] == "6.1 inch"
+    assert row["Status"] == "Deactivated"
@@ -0,0 +1,34 @@
+from sqlalchemy import text
+
+from Backend.Source import cart_store
+
+
+async def test_summary_sees_a_change_made_by_another_worker(mysql_db):
+    async with mysql_db() as db:
+        cart_id = await cart_store.get_or_create_cart(db, 1)
+        await db.commit()
+        await cart_store.clear(db, cart_id)
+        assert (await cart_store.summary(db, cart_id))["items"] == []  # now cached here
+        product_id = (await db.execute(text("SELECT ProductId FROM Product WHERE Status='Active' LIMIT 1"))).scalar_one()
+        await db.commit()
+
+    # Another worker writes the cart; this process's cache is not told
+    async with mysql_db() as other:
+        await other.execute(cart_store.SET_SQL, {"pid": product_id, "cid": 1, "cartid": cart_id, "q": 2})
+        await cart_store.bump_version(other, cart_id)
+        await other.commit()
+
+    async with mysql_db() as db:
+        items = (await cart_store.summary(db, cart_id))["items"]
+    assert [(i["productId"], i["quantity"]) for i in items] == [(product_id, 2)]
+
+
+async def test_set_items_is_committed_before_returning(mysql_db):
+    async with mysql_db() as db:
+        cart_id = await cart_store.get_or_create_cart(db, 1)
+        await db.commit()
+        product_id = (await db.execute(text("SELECT ProductId FROM Product WHERE Status='Active' LIMIT 1"))).scalar_one()
+        await cart_store.set_items(db, cart_id, 1, {product_id: 3})
+
+    async with mysql_db() as other:
+        assert await cart_store.load_quantities(other, cart_id) == {product_id: 3}
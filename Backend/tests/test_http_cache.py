@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+
+from Backend.Source import http_cache
+from Backend.Source.middleware import CompressionMiddleware
+
+
+def test_etag_is_strong_and_matches_any_coding():
+    etag = http_cache.make_etag("20260101000000000000", "buyer-product", "P1")
+
+    assert etag.startswith('"')
+    assert http_cache.etag_matches(etag, etag)
+    assert http_cache.etag_matches(f"W/{etag}", etag)
+    assert http_cache.etag_matches(f'"other", {etag[:-1]}-gzip"', etag)
+    assert http_cache.etag_matches(f'{etag[:-1]}-br"', etag)
+    assert not http_cache.etag_matches(http_cache.make_etag("20260101000000000001", "buyer-product", "P1"), etag)
+
+
+def test_compressed_response_tag_carries_the_coding():
+    etag = http_cache.make_etag("1", "x")
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"etag", etag.encode())]})
+        await send({"type": "http.response.body", "body": b"x" * 4096})
+
+    client = TestClient(CompressionMiddleware(app))
+    assert client.get("/", headers={"Accept-Encoding": "gzip"}).headers["etag"] == f'{etag[:-1]}-gzip"'
+    assert client.get("/", headers={"Accept-Encoding": "identity"}).headers["etag"] == etag
+
+
+def test_not_modified_echoes_the_coded_tag():
+    etag = http_cache.make_etag("1", "x")
+    coded = f'{etag[:-1]}-gzip"'
+
+    assert http_cache.not_modified(etag, f'"other", {coded}').headers["etag"] == coded
+    assert http_cache.not_modified(etag).headers["etag"] == etag
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from Backend.Source import idempotency
+from Backend.Source.api.buyer_orders import _place_order
+from Backend.Source.schemas.order import OrderItemIn, PlaceOrderRequest
+
+
+class _NotShared(dict):
+    # Each request as if in its own worker process: no in-process waiting
+    def __setitem__(self, key, value):
+        pass
+
+
+async def _payload(db) -> PlaceOrderRequest:
+    product_id = (await db.execute(text("SELECT ProductId FROM Product WHERE Status='Active' AND Quantity > 10 LIMIT 1"))).scalar_one()
+    return PlaceOrderRequest(
+        customerName="Test", customerEmail="t@example.com", customerPhone="0900000000",
+        recipientName="Test", recipientPhone="0900000000", address="Somewhere",
+        items=[OrderItemIn(productId=product_id, quantity=1)],
+    )
+
+
+async def _orders(db) -> int:
+    return (await db.execute(text("SELECT COUNT(*) FROM `Order` WHERE CustomerId=1"))).scalar_one()
+
+
+async def test_concurrent_identical_checkouts_place_one_order(mysql_db, monkeypatch):
+    monkeypatch.setattr(idempotency, "_inflight", _NotShared())
+    monkeypatch.setattr(idempotency, "_results", idempotency.LRUCache(1, 1))
+    async with mysql_db() as db:
+        payload = await _payload(db)
+        before = await _orders(db)
+
+    async def checkout():
+        async with mysql_db() as db:
+            return await idempotency.run(
+                1, "same-key", payload.model_dump(mode="json"),
+                lambda owner: _place_order(db, 1, payload, "same-key", owner),
+            )
+
+    responses = await asyncio.gather(*(checkout() for _ in range(10)))
+
+    assert len({r["id"] for r in responses}) == 1
+    async with mysql_db() as db:
+        assert await _orders(db) == before + 1
+
+
+async def test_taken_over_attempt_cannot_place_a_second_order(mysql_db, monkeypatch):
+    monkeypatch.setattr(idempotency, "_inflight", _NotShared())
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_WAIT", 1.0)
+    async with mysql_db() as db:
+        payload = await _payload(db)
+        before = await _orders(db)
+    body = payload.model_dump(mode="json")
+
+    async def slow_first():
+        # Stalls past IDEMPOTENCY_WAIT before it runs, then tries to save
+        async def execute(owner):
+            await asyncio.sleep(4)
+            async with mysql_db() as db:
+                return await _place_order(db, 1, payload, "slow-key", owner)
+        return await idempotency.run(1, "slow-key", body, execute)
+
+    async def retry():
+        await asyncio.sleep(0.2)
+        async with mysql_db() as db:
+            return await idempotency.run(1, "slow-key", body, lambda owner: _place_order(db, 1, payload, "slow-key", owner))
+
+    first, second = await asyncio.gather(slow_first(), retry(), return_exceptions=True)
+
+    assert isinstance(first, HTTPException) and first.status_code == 409
+    assert not isinstance(second, BaseException)
+    async with mysql_db() as db:
+        assert await _orders(db) == before + 1
+        # The winner's response is what later retries get
+        monkeypatch.setattr(idempotency, "_results", idempotency.LRUCache(1, 1))
+        assert (await idempotency.run(1, "slow-key", body, pytest.fail))["id"] == second["id"]
@@ -0,0 +1,106 @@
+import io
+import os
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException, Response, UploadFile
+from sqlalchemy import text
+
+from Backend.Source import image_index
+from Backend.Source.api import staff_products
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 64
+JPEG = b"\xff\xd8\xff\xe0" + b"\0" * 64
+
+
+@pytest.fixture
+def image_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_index, "IMAGE_DIR", tmp_path)
+    monkeypatch.setattr(staff_products, "IMAGE_DIR", tmp_path)
+    image_index.build_index()
+    yield tmp_path
+    image_index.build_index()
+
+
+def _upload(data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename="upload")
+
+
+def test_concurrent_replacements_never_serve_a_missing_file(image_dir):
+    staff_products._save_image("P1", _upload(JPEG))
+    # Another worker's index, built before the replacements
+    other_worker_url = image_index.get_product_image_url("P1")
+
+    stop = threading.Event()
+    missing = []
+
+    def reader():
+        while not stop.is_set():
+            for url in (image_index.get_product_image_url("P1"), other_worker_url):
+                if not image_index.image_path(url).exists():
+                    missing.append(url)
+
+    def uploader(data):
+        for _ in range(20):
+            staff_products._save_image("P1", _upload(data), replace=True)
+
+    threads = [threading.Thread(target=reader)] + [threading.Thread(target=uploader, args=(d,)) for d in (PNG, JPEG)]
+    for t in threads:
+        t.start()
+    for t in threads[1:]:
+        t.join()
+    stop.set()
+    threads[0].join()
+
+    assert missing == []
+    # Every worker converges on the newest original
+    url = image_index.get_product_image_url("P1")
+    image_index.build_index()
+    assert image_index.get_product_image_url("P1") == url
+
+
+def test_rescan_prunes_originals_replaced_before_the_grace_period(image_dir, monkeypatch):
+    staff_products._save_image("P1", _upload(JPEG))
+    staff_products._save_image("P1", _upload(PNG), replace=True)
+    assert image_index.get_product_image_url("P1") == "/product_images/P1/1.png"
+
+    # Within the grace period both files stay
+    image_index.build_index()
+    assert {p.name for p in (image_dir / "P1").iterdir()} == {"1.jpg", "1.png"}
+
+    old = time.time() - image_index.REPLACED_IMAGE_GRACE - 10
+    os.utime(image_dir / "P1" / "1.jpg", (old - 1, old - 1))
+    os.utime(image_dir / "P1" / "1.png", (old, old))
+    image_index.build_index()
+
+    assert {p.name for p in (image_dir / "P1").iterdir()} == {"1.png"}
+    assert image_index.get_product_image_url("P1") == "/product_images/P1/1.png"
+
+
+async def _create(db, product_id: str, data: bytes):
+    with pytest.raises(HTTPException) as e:
+        await staff_products.staff_create_product(
+            Response(), productId=product_id, productName="New", brand="Brand", price=1.0, quantity=1,
+            specification=None, status="Active", image=_upload(data), db=db,
+        )
+    return e.value.status_code
+
+
+async def test_rejected_image_leaves_no_product_or_folder(image_dir, mysql_db):
+    async with mysql_db() as db:
+        assert await _create(db, "NEW_P1", b"GIF89a" + b"\0" * 64) == 415
+        assert (await db.execute(text("SELECT 1 FROM Product WHERE ProductId='NEW_P1'"))).first() is None
+
+    assert not (image_dir / "NEW_P1").exists()
+    assert image_index.get_product_image_url("NEW_P1") is None
+
+
+async def test_duplicate_id_keeps_the_existing_image(image_dir, mysql_db):
+    async with mysql_db() as db:
+        product_id = (await db.execute(text("SELECT ProductId FROM Product LIMIT 1"))).scalar_one()
+        staff_products._save_image(product_id, _upload(JPEG))
+
+        assert await _create(db, product_id, PNG) == 400
+
+    assert {p.name for p in (image_dir / product_id).iterdir()} == {"1.jpg"}
@@ -0,0 +1,70 @@
+import asyncio
+import contextvars
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from Backend.Source import inventory
+from Backend.Source.api.buyer_orders import _place_order
+from Backend.Source.schemas.order import OrderItemIn, PlaceOrderRequest
+
+STOCK = 5
+BUYERS = 20
+
+_worker = contextvars.ContextVar("worker", default=0)
+
+
+class _PerWorkerLedger:
+    # Stands in for inventory.ledger: each simulated worker process has its own
+    def __init__(self, workers: int):
+        self.ledgers = [inventory.StockLedger() for _ in range(workers)]
+
+    def __getattr__(self, name):
+        return getattr(self.ledgers[_worker.get()], name)
+
+
+async def _checkout(session_factory, product_id: str, worker: int) -> bool:
+    _worker.set(worker)
+    payload = PlaceOrderRequest(
+        customerName="Test", customerEmail="t@example.com", customerPhone="0900000000",
+        recipientName="Test", recipientPhone="0900000000", address="Somewhere",
+        items=[OrderItemIn(productId=product_id, quantity=1)],
+    )
+    async with session_factory() as db:
+        try:
+            await _place_order(db, 1, payload)
+            return True
+        except HTTPException as e:
+            assert e.status_code == 400
+            return False
+
+
+@pytest.mark.parametrize("mode, workers", [("conditional", 1), ("ledger", 1), ("ledger", 2)])
+async def test_concurrent_checkouts_do_not_oversell(mysql_db, monkeypatch, mode, workers):
+    monkeypatch.setattr(inventory, "STOCK_MODE", mode)
+    monkeypatch.setattr(inventory, "ledger", _PerWorkerLedger(workers))
+    async with mysql_db() as db:
+        product_id = (await db.execute(text("SELECT ProductId FROM Product WHERE Status='Active' LIMIT 1"))).scalar_one()
+        await db.execute(text("UPDATE Product SET Quantity=:q WHERE ProductId=:pid"), {"q": STOCK, "pid": product_id})
+        await db.commit()
+
+    placed = await asyncio.gather(*(_checkout(mysql_db, product_id, i % workers) for i in range(BUYERS)))
+    if mode == "ledger":
+        # Applies every queued order; a short product cancels the late ones
+        await inventory.reconcile()
+
+    async with mysql_db() as db:
+        left = (await db.execute(text("SELECT Quantity FROM Product WHERE ProductId=:pid"), {"pid": product_id})).scalar_one()
+        kept = (await db.execute(text("""
+            SELECT COALESCE(SUM(l.Quantity), 0) FROM OrderContainsProduct l
+            JOIN `Order` o ON o.OrderId = l.OrderId
+            WHERE l.ProductId=:pid AND o.Status <> 'Cancelled'
+        """), {"pid": product_id})).scalar_one()
+
+    assert left >= 0
+    assert kept == STOCK - left
+    assert STOCK <= sum(placed)
+    if workers == 1:
+        # A single ledger or the conditional UPDATE never over-confirms
+        assert sum(placed) == STOCK
@@ -0,0 +1,23 @@
+from Backend.Source import product_cache
+
+
+async def test_detail_loaded_across_a_write_is_not_served():
+    # Reader: version read, then a slow database load of the old row
+    version = await product_cache.catalog_version()
+    stale = {"productId": "P1", "price": 100.0}
+
+    # Writer commits and invalidates while the reader is still loading
+    await product_cache.invalidate_product("P1")
+
+    # The reader stores the old row after the invalidation
+    await product_cache.set_product("P1", version, stale)
+
+    current = await product_cache.catalog_version()
+    assert await product_cache.get_product("P1", current) is product_cache.MISSING
+
+
+async def test_detail_is_served_while_the_catalog_is_unchanged():
+    version = await product_cache.catalog_version()
+    await product_cache.set_product("P2", version, {"productId": "P2"})
+
+    assert await product_cache.get_product("P2", version) == {"productId": "P2"}
@@ -0,0 +1,19 @@
+from sqlalchemy import text
+
+from Backend.Source import product_search
+
+
+async def test_sync_picks_up_a_rename_made_by_another_worker(mysql_db):
+    async with mysql_db() as db:
+        await product_search.build_index(db)
+        product_id = (await db.execute(text("SELECT ProductId FROM Product WHERE Status='Active' LIMIT 1"))).scalar_one()
+
+    # Another worker's write: nothing in this process is told about it
+    async with mysql_db() as db:
+        await db.execute(text("UPDATE Product SET ProductName='Zyxwv Gadget' WHERE ProductId=:pid"), {"pid": product_id})
+        await db.commit()
+    assert product_search.search("zyxwv") == []
+
+    async with mysql_db() as db:
+        assert await product_search.sync_index(db) >= 1
+    assert product_search.search("zyxwv") == [product_id]
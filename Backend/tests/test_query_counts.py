@@ -0,0 +1,94 @@
+# SQL statements per request, read from the Server-Timing header that
+# metrics.MetricsMiddleware adds, against the sample data in db_creation.sql.
+# These catch N+1 regressions: the counts must not grow with the number of
+# items in a request or page.
+
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+from Backend.Source import auth_tokens, http_cache, product_cache
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def db_queries(response) -> int:
+    assert response.status_code < 400, response.text
+    return int(_QUERIES.search(response.headers["server-timing"]).group(1))
+
+
+@pytest.fixture
+def client(mysql_schema, monkeypatch):
+    from Backend.Source.app import app
+
+    # Counts below exclude the catalog version read, made at most once per TTL
+    monkeypatch.setattr(http_cache, "CATALOG_VERSION_TTL", 3600)
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def customer():
+    return {"Authorization": f"Bearer {auth_tokens.create_access_token(1, 'customer', 'kh001')}"}
+
+
+def _in_stock(client, n: int) -> list[str]:
+    products = client.get("/buyer/products").json()
+    return [p["productId"] for p in products if (p.get("quantity") or 0) >= 10][:n]
+
+
+def _checkout(client, headers, product_ids: list[str]):
+    return client.post("/buyer/orders/checkout", headers=headers, json={
+        "customerName": "Test", "customerEmail": "t@example.com", "customerPhone": "0900000000",
+        "recipientName": "Test", "recipientPhone": "0900000000", "address": "Somewhere",
+        "items": [{"productId": pid, "quantity": 1} for pid in product_ids],
+    })
+
+
+def test_listing_page_is_one_query_then_cached(client):
+    client.get("/buyer/products?limit=1")
+    product_cache._backend.cache.clear()
+    small = db_queries(client.get("/buyer/products?limit=2"))
+    large = db_queries(client.get("/buyer/products?limit=50"))
+
+    assert small == large == 1
+    assert db_queries(client.get("/buyer/products?limit=50")) == 0
+
+
+def test_product_detail_is_one_query_then_cached(client):
+    product_id = _in_stock(client, 1)[0]
+    product_cache._backend.cache.clear()
+
+    assert db_queries(client.get(f"/buyer/products/{product_id}")) == 1
+    assert db_queries(client.get(f"/buyer/products/{product_id}")) == 0
+
+
+def test_revalidation_is_304_without_queries(client):
+    etag = client.get("/buyer/products?limit=5").headers["etag"]
+    response = client.get("/buyer/products?limit=5", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert db_queries(response) == 0
+
+
+def test_unknown_product_is_404_and_not_cached(client):
+    product_cache._backend.cache.clear()
+    response = client.get("/buyer/products/NO_SUCH_PRODUCT")
+
+    assert response.status_code == 404
+    assert product_cache.stats()["size"] == 0
+
+
+def test_checkout_query_count_does_not_grow_with_items(client, customer):
+    products = _in_stock(client, 5)
+    assert len(products) == 5
+    _checkout(client, customer, products[:1])  # caches the customer's cart id
+
+    one = db_queries(_checkout(client, customer, products[:1]))
+    five = db_queries(_checkout(client, customer, products))
+
+    assert one == five
+    assert one <= 8
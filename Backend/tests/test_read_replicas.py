@@ -0,0 +1,78 @@
+import sqlite3
+import time
+
+import pytest
+from fastapi import Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.requests import Request
+
+from Backend.Source import database_connection as dbc
+
+
+@pytest.fixture
+async def primary(tmp_path, monkeypatch):
+    path = tmp_path / "primary.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE Product(ProductId TEXT PRIMARY KEY, ProductName TEXT)")
+    conn.execute("INSERT INTO Product VALUES ('P1', 'Phone')")
+    conn.commit()
+    conn.close()
+
+    engine = create_async_engine(dbc.async_url(f"sqlite:///{path}"))
+    monkeypatch.setattr(dbc, "AsyncSessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def replica(tmp_path, monkeypatch):
+    # An empty database: every query on it fails with OperationalError
+    sqlite3.connect(tmp_path / "replica.db").close()
+    replica = dbc.Replica("replica1", f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(dbc, "replicas", [replica])
+    yield replica
+    await replica.engine.dispose()
+
+
+def _request(cookie: str | None = None) -> Request:
+    headers = [(b"cookie", f"{dbc.STICKY_COOKIE}={cookie}".encode())] if cookie else []
+    return Request({"type": "http", "headers": headers})
+
+
+async def test_failed_replica_query_is_retried_on_the_primary(primary, replica):
+    async with replica.sessions() as db:
+        name = (await db.execute(text("SELECT ProductName FROM Product WHERE ProductId='P1'"))).scalar_one()
+        assert dbc.on_primary(db)
+
+    assert name == "Phone"
+    assert not replica.healthy
+    assert dbc._pick_replica() is None
+
+
+async def test_only_the_writing_client_sticks_to_the_primary(replica, monkeypatch):
+    monkeypatch.setattr(dbc, "_written_at", -float("inf"))
+    response = Response()
+    dbc.stick_to_primary(response)
+
+    cookie = response.headers["set-cookie"].split(";")[0].split("=", 1)[1]
+    assert dbc.wants_primary(_request(cookie))
+    assert not dbc.wants_primary(_request())
+    assert dbc._pick_replica(dbc.wants_primary(_request())) is replica
+
+    # Expired, or further out than the server ever sets
+    assert not dbc.wants_primary(_request(str(int((time.time() - 1) * 1000))))
+    assert not dbc.wants_primary(_request(str(int((time.time() + 3600) * 1000))))
+
+
+async def test_replica_reads_after_a_write_do_not_refill_caches(replica, monkeypatch):
+    monkeypatch.setattr(dbc, "_written_at", -float("inf"))
+    async with replica.sessions() as db:
+        assert not dbc.may_be_stale(db)
+        dbc.stick_to_primary()
+        assert dbc.may_be_stale(db)
+
+
+def test_sqlite_urls_use_the_async_driver():
+    assert dbc.async_url("sqlite:///primary.db") == "sqlite+aiosqlite:///primary.db"
+    assert dbc.async_url("mysql+pymysql://u@h/db") == "mysql+aiomysql://u@h/db"
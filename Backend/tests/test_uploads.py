@@ -0,0 +1,56 @@
+import io
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from Backend.Source.uploads import CHUNK_SIZE, save_image_upload
+
+SIZE = 3 * CHUNK_SIZE + 17
+
+
+def _jpeg(fill: int) -> bytes:
+    return b"\xff\xd8\xff\xe0" + bytes([fill]) * (SIZE - 4)
+
+
+def test_concurrent_large_uploads_leave_one_complete_file(tmp_path):
+    bodies = [_jpeg(i) for i in range(8)]
+    stop = threading.Event()
+    seen = []
+
+    def reader():
+        while not stop.is_set():
+            try:
+                seen.append(len((tmp_path / "1.jpg").read_bytes()))
+            except FileNotFoundError:
+                pass
+
+    save_image_upload(io.BytesIO(bodies[0]), tmp_path)
+    threads = [threading.Thread(target=reader)]
+    threads += [threading.Thread(target=save_image_upload, args=(io.BytesIO(b), tmp_path)) for b in bodies]
+    for t in threads:
+        t.start()
+    for t in threads[1:]:
+        t.join()
+    stop.set()
+    threads[0].join()
+
+    assert set(seen) <= {SIZE}
+    assert [p.name for p in tmp_path.iterdir()] == ["1.jpg"]
+    assert (tmp_path / "1.jpg").read_bytes() in bodies
+
+
+def test_oversized_upload_is_rejected_without_leftovers(tmp_path):
+    with pytest.raises(HTTPException) as e:
+        save_image_upload(io.BytesIO(_jpeg(1)), tmp_path, max_bytes=2 * CHUNK_SIZE)
+
+    assert e.value.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_non_image_upload_is_rejected(tmp_path):
+    with pytest.raises(HTTPException) as e:
+        save_image_upload(io.BytesIO(b"GIF89a" + b"\0" * 64), tmp_path)
+
+    assert e.value.status_code == 415
+    assert list(tmp_path.iterdir()) == []
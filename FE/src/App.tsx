@@ -34,15 +34,59 @@ import { Button } from './components/ui/button';
 
 const API_BASE = 'http://localhost:8000';
 
-async function apiFetch<T>(path: string, options: RequestInit = {}): Promise<T> {
-  const token = localStorage.getItem('oss_token') || '';
-  const headers: Record<string, string> = {
-    'Content-Type': 'application/json',
-    ...(options.headers as any),
+// Access tokens are short-lived: on a 401 the stored refresh token is traded
+// for a new pair once and the request is retried. Refresh tokens are single
+// use, so concurrent 401s share one /auth/refresh call.
+let refreshing: Promise<boolean> | null = null;
+
+function refreshTokens(): Promise<boolean> {
+  if (!refreshing) {
+    refreshing = (async () => {
+      const refreshToken = localStorage.getItem('oss_refresh_token');
+      if (!refreshToken) return false;
+      try {
+        const res = await fetch(`${API_BASE}/auth/refresh`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ refresh_token: refreshToken }),
+        });
+        if (!res.ok) {
+          localStorage.removeItem('oss_token');
+          localStorage.removeItem('oss_refresh_token');
+          return false;
+        }
+        const data = await res.json();
+        localStorage.setItem('oss_token', data.access_token);
+        localStorage.setItem('oss_refresh_token', data.refresh_token);
+        return true;
+      } catch {
+        return false;
+      }
+    })().finally(() => { refreshing = null; });
+  }
+  return refreshing;
+}
+
+async function authFetch(path: string, options: RequestInit = {}): Promise<Response> {
+  const send = () => {
+    const token = localStorage.getItem('oss_token') || '';
+    const headers: Record<string, string> = { ...(options.headers as any) };
+    if (token) headers.Authorization = `Bearer ${token}`;
+    return fetch(`${API_BASE}${path}`, { ...options, headers });
   };
-  if (token) headers.Authorization = `Bearer ${token}`;
 
-  const res = await fetch(`${API_BASE}${path}`, { ...options, headers });
+  const res = await send();
+  if (res.status === 401 && localStorage.getItem('oss_refresh_token') && await refreshTokens()) {
+    return send();
+  }
+  return res;
+}
+
+async function apiFetch<T>(path: string, options: RequestInit = {}): Promise<T> {
+  const res = await authFetch(path, {
+    ...options,
+    headers: { 'Content-Type': 'application/json', ...(options.headers as any) },
+  });
   
   let data: any = null;
   try { data = await res.json(); } catch {}
@@ -196,12 +240,8 @@ useEffect(() => {
 
   const addStaffProduct = async (formData: FormData) => {
     try {
-      const token = localStorage.getItem('oss_token') || '';
-      const res = await fetch(`${API_BASE}/staff/products`, {
+      const res = await authFetch('/staff/products', {
         method: 'POST',
-        headers: {
-          'Authorization': `Bearer ${token}`
-        },
         body: formData
       });
 
@@ -223,13 +263,8 @@ useEffect(() => {
 
   const updateStaffProduct = async (id: string, formData: FormData) => {
     try {
-      const token = localStorage.getItem('oss_token') || '';
-      
-      const res = await fetch(`${API_BASE}/staff/products/${id}`, {
+      const res = await authFetch(`/staff/products/${id}`, {
         method: 'PUT', 
-        headers: {
-          'Authorization': `Bearer ${token}`
-        },
         body: formData
       });
 
@@ -355,6 +390,7 @@ useEffect(() => {
     try {
       const resp = await login(email, pass, role);
       if (resp.access_token) localStorage.setItem('oss_token', resp.access_token);
+      if (resp.refresh_token) localStorage.setItem('oss_refresh_token', resp.refresh_token);
       
       if (resp.role === 'buyer') {
         setUser({ name: resp.name || resp.username, email: resp.username, role: 'buyer' });
@@ -375,11 +411,19 @@ useEffect(() => {
   };
 
   const handleLogout = () => {
+    const refreshToken = localStorage.getItem('oss_refresh_token');
+    if (localStorage.getItem('oss_token')) {
+      apiFetch('/auth/logout', {
+        method: 'POST',
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      }).catch(() => {});
+    }
     setUser(null);
     setIsStaffLoggedIn(false);
     setIsAdminLoggedIn(false);
     setCart([]);
     localStorage.removeItem('oss_token');
+    localStorage.removeItem('oss_refresh_token');
     toast.info("You have been logged out");
     navigate('/');
   };
@@ -2,6 +2,7 @@ const API_BASE = 'http://localhost:8000';
 
 export interface LoginResponse {
   access_token: string;
+  refresh_token: string;
   role: 'buyer' | 'staff' | 'admin';
   userId: number;
   username: string;